@@ -0,0 +1,151 @@
+"""
+Compare the binary TLV codec with the bracket delimited text format (f-string encoding,
+regex decoding) for Interest and Data payloads, with and without session key encryption.
+
+Usage: python3 bench_codec.py [iterations] [data_size]
+"""
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "ndn_app"))
+
+import crypto
+import tlv
+
+FIELDS = re.compile(r"\[([^\]]+)\]")
+
+
+def text_interest(data_address, request_id, retry_index):
+    encoded = f"[{data_address}][{request_id}][{retry_index}]"
+    fields = FIELDS.findall(encoded)
+    return fields[0], fields[1], int(fields[2])
+
+
+def tlv_interest(data_address, request_id, retry_index):
+    encoded = tlv.encode_elements(
+        ((tlv.NAME, data_address), (tlv.REQUEST_ID, request_id), (tlv.RETRY_INDEX, retry_index))
+    )
+    elements = tlv.decode_elements(encoded)
+    return (
+        tlv.get_string(elements, tlv.NAME),
+        tlv.get_string(elements, tlv.REQUEST_ID),
+        tlv.get_number(elements, tlv.RETRY_INDEX),
+    )
+
+
+def text_data(key, data_address, data):
+    header = f"[1][7][0.0]"
+    payload = crypto.session_encrypt_data(key, f"[{data_address}][abcde][0][{data}]", header)
+    packet = f"{header}[{payload}]".encode("utf-8")
+
+    fields = FIELDS.findall(str(packet, "utf-8"))
+    decrypted = crypto.session_decrypt_data(key, fields[3], f"[{fields[0]}][{fields[1]}][{fields[2]}]")
+    return FIELDS.findall(decrypted)[3]
+
+
+def tlv_data(key, data_address, data):
+    payload = tlv.encode_elements(
+        ((tlv.NAME, data_address), (tlv.REQUEST_ID, "abcde"), (tlv.RETRY_INDEX, 0), (tlv.CONTENT, data))
+    )
+    associated_data = tlv.session_associated_data(1, 7, "0.0")
+    packet = tlv.encode_packet(
+        1,
+        (
+            (tlv.LABEL, 7),
+            (tlv.KEY_ID, "0.0"),
+            (tlv.PAYLOAD, crypto.session_encrypt_bytes(key, payload, associated_data)),
+        ),
+    )
+
+    _, value = tlv.decode_packet(memoryview(packet))
+    elements = tlv.decode_elements(value)
+    decrypted = crypto.session_decrypt_bytes(
+        key,
+        elements[tlv.PAYLOAD],
+        tlv.session_associated_data(1, tlv.get_number(elements, tlv.LABEL), "0.0"),
+    )
+    return tlv.get_string(tlv.decode_elements(decrypted), tlv.CONTENT)
+
+
+def text_hello_key(public_key_string):
+    return crypto.get_public_key_from_string(public_key_string)
+
+
+def tlv_hello_key(public_key_bytes):
+    return crypto.get_public_key_from_bytes(public_key_bytes)
+
+
+def timed(function, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        function()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    data_size = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    key = os.urandom(32)
+    _, public_key = crypto.generate_keys(2048)
+    public_key_string = crypto.b64_public_key(public_key)
+    public_key_bytes = crypto.public_key_bytes(public_key)
+    data_address = "/data/3/heartrate/ecg"
+    data = '{"value": ' + "1" * data_size + "}"
+
+    # sizes on the wire
+    text_size = len(
+        f"[1][7][0.0][{crypto.session_encrypt_data(key, f'[{data_address}][abcde][0][{data}]', '')}]"
+    )
+    tlv_size = len(
+        tlv.encode_packet(
+            1,
+            (
+                (tlv.LABEL, 7),
+                (tlv.KEY_ID, "0.0"),
+                (
+                    tlv.PAYLOAD,
+                    crypto.session_encrypt_bytes(
+                        key,
+                        tlv.encode_elements(
+                            (
+                                (tlv.NAME, data_address),
+                                (tlv.REQUEST_ID, "abcde"),
+                                (tlv.RETRY_INDEX, 0),
+                                (tlv.CONTENT, data),
+                            )
+                        ),
+                        b"",
+                    ),
+                ),
+            ),
+        )
+    )
+
+    print(f"{iterations} iterations, {len(data)} byte data\n")
+    print(f"{'case':<36}{'us/op':>10}")
+    for case, function in (
+        ("interest fields, text + regex", lambda: text_interest(data_address, "abcde", 1)),
+        ("interest fields, TLV", lambda: tlv_interest(data_address, "abcde", 1)),
+        ("session data packet, text + base64", lambda: text_data(key, data_address, data)),
+        ("session data packet, TLV", lambda: tlv_data(key, data_address, data)),
+        ("hello public key, base64 PEM", lambda: text_hello_key(public_key_string)),
+        ("hello public key, DER", lambda: tlv_hello_key(public_key_bytes)),
+    ):
+        print(f"{case:<36}{timed(function, iterations):>10.2f}")
+
+    print(f"\ndata packet size: text {text_size} bytes, TLV {tlv_size} bytes")
+    print(
+        f"hello public key size: text {len(public_key_string)} bytes, "
+        f"TLV {len(public_key_bytes)} bytes"
+    )
+
+    # JSON with "]" can't be carried in the text format
+    nested = '{"values": [1, 2, 3]}'
+    print(f"nested JSON round trip: text {text_data(key, data_address, nested) == nested}, "
+          f"TLV {tlv_data(key, data_address, nested) == nested}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Cost of one hello round (hello to every one of k neighbors) when the hello is formatted per
+send (get_string, signatures already cached) versus sending the pre-serialized packet
+(get_packet).
+
+Usage: python3 bench_hello.py [k] [rounds]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "ndn_app"))
+
+import crypto
+from node import HelloMessage
+
+
+def per_send_format(hello, private_key, member_private_key, k):
+    for _ in range(k):
+        hello.get_string(
+            private_key=private_key, member_private_key=member_private_key
+        ).encode("utf-8")
+
+
+def per_send_format_tlv(hello, private_key, member_private_key, k):
+    for _ in range(k):
+        hello.get_bytes(private_key=private_key, member_private_key=member_private_key)
+
+
+def pre_serialized(hello, private_key, member_private_key, k, use_tlv=False):
+    for _ in range(k):
+        hello.get_packet(
+            use_tlv=use_tlv,
+            private_key=private_key,
+            member_private_key=member_private_key,
+        )
+
+
+def timed(function, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        function()
+    return (time.perf_counter() - start) / rounds * 1e6
+
+
+def main():
+    k = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+
+    private_key, public_key = crypto.generate_keys(2048)
+    member_private_key, _ = crypto.generate_keys(2048)
+    hello = HelloMessage(label=1, ip="192.168.1.10", port=5001, cert="ULTRA_CERT")
+    hello.public_key = public_key
+    _, session_public_key = crypto.generate_session_keys()
+    hello.set_session_key(0, session_public_key)
+
+    print(f"hello round to {k} neighbors, {rounds} rounds\n")
+    print(f"{'case':<32}{'us/round':>10}")
+    for case, function in (
+        ("text, formatted per send", lambda: per_send_format(hello, private_key, member_private_key, k)),
+        ("text, pre-serialized", lambda: pre_serialized(hello, private_key, member_private_key, k)),
+        ("TLV, encoded per send", lambda: per_send_format_tlv(hello, private_key, member_private_key, k)),
+        ("TLV, pre-serialized", lambda: pre_serialized(hello, private_key, member_private_key, k, True)),
+    ):
+        print(f"{case:<32}{timed(function, rounds):>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Compare k-nearest neighbor discovery with GridIndex against sorting the distances to all
+other nodes (what every Network did at startup before).
+
+Building a topology means one query per node. Sorting is O(N) per query, so it is only timed
+on a sample of queries and extrapolated to all nodes. Results of both methods are compared on
+the sampled queries.
+
+Usage: python3 bench_knn.py [k] [num_nodes ...]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "ndn_app"))
+
+from spatial_index import GridIndex, euclidean_distance
+
+GRID = 1000
+SAMPLE = 200
+
+
+def sorted_nearest(points, label, k):
+    distances = [
+        (other, euclidean_distance(points[label], xy))
+        for other, xy in points.items()
+        if other != label
+    ]
+    return sorted(distances, key=lambda x: x[1])[:k]
+
+
+def run(num_nodes, k):
+    rng = random.Random(1)
+    points = {
+        label: (rng.randint(0, GRID + 1), rng.randint(0, GRID + 1))
+        for label in range(num_nodes)
+    }
+    sample = rng.sample(list(points), min(SAMPLE, num_nodes))
+
+    start = time.perf_counter()
+    index = GridIndex.from_points(points)
+    build = time.perf_counter() - start
+    start = time.perf_counter()
+    grid_results = {
+        label: index.nearest(xy, k, exclude=(label,)) for label, xy in points.items()
+    }
+    grid_total = build + time.perf_counter() - start
+
+    start = time.perf_counter()
+    sorted_results = {label: sorted_nearest(points, label, k) for label in sample}
+    sorted_total = (time.perf_counter() - start) / len(sample) * num_nodes
+
+    mismatches = sum(sorted_results[label] != grid_results[label] for label in sample)
+    return grid_total, sorted_total, build, mismatches
+
+
+def main():
+    k = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    sizes = [int(arg) for arg in sys.argv[2:]] or [1000, 10000, 100000]
+
+    print(f"k = {k}, sorting extrapolated from {SAMPLE} queries\n")
+    print(f"{'nodes':>8}{'grid s':>10}{'(build s)':>11}{'sorting s':>12}{'speedup':>9}{'diff':>6}")
+    for num_nodes in sizes:
+        grid_total, sorted_total, build, mismatches = run(num_nodes, k)
+        print(
+            f"{num_nodes:>8}{grid_total:>10.3f}{build:>11.3f}{sorted_total:>12.1f}"
+            f"{sorted_total / grid_total:>9.0f}{mismatches:>6}"
+        )
+
+
+if __name__ == "__main__":
+    main()
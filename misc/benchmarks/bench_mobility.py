@@ -0,0 +1,104 @@
+"""
+Cost of a movement tick with incremental k-nearest updates (NeighborTracker) against
+recomputing the k nearest of every node, and how quickly links created by mobility are
+discovered and routed in the simulator.
+
+Nodes move with random waypoint mobility at MOBILITY_SPEED, one tick is MOBILITY_TICK seconds.
+Each size runs with all nodes mobile and with MOBILE_SHARE of them mobile (the rest static).
+Results of both methods are compared after every tick. The simulation runs with faster nodes
+so links change within the run.
+
+Usage: python3 bench_mobility.py [k] [num_nodes ...]
+"""
+import os
+import random
+import sys
+import time
+
+NDN_APP = os.path.join(os.path.dirname(__file__), "..", "..", "ndn_app")
+sys.path.insert(0, NDN_APP)
+
+import constants
+from mobility import NeighborTracker, RandomWaypoint
+from simulator import Simulation, simulated_nodes
+from spatial_index import GridIndex
+
+TICKS = 20
+MOBILE_SHARE = 0.1
+SIM_NODES = 60
+SIM_SECONDS = 40
+SIM_SPEED = (5, 15)
+
+
+def run(num_nodes, k, share):
+    nodes = simulated_nodes(num_nodes, 1)
+    mobile = random.Random(1).sample(sorted(nodes), round(num_nodes * share))
+    index = GridIndex.from_nodes(nodes)
+    tracker = NeighborTracker(index, k)
+    mobility = RandomWaypoint(
+        nodes,
+        constants.GRID_DIMENSIONS,
+        constants.MOBILITY_SPEED,
+        constants.MOBILITY_PAUSE,
+        1,
+        mobile=mobile,
+    )
+
+    incremental = full = 0.0
+    changed = mismatches = 0
+    for tick in range(1, TICKS + 1):
+        moves = mobility.positions(tick * constants.MOBILITY_TICK)
+        start = time.perf_counter()
+        changed += len(tracker.update(moves))
+        incremental += time.perf_counter() - start
+
+        # positions are already moved in the index, only the queries are timed
+        start = time.perf_counter()
+        nearest = {
+            label: [neighbor for neighbor, _ in index.nearest(xy, k, exclude=(label,))]
+            for label, xy in index.points.items()
+        }
+        full += time.perf_counter() - start
+        mismatches += sum(nearest[label] != tracker.nearest[label] for label in nearest)
+
+    counters = tracker.counters
+    return (
+        incremental / TICKS * 1000,
+        full / TICKS * 1000,
+        counters["recomputed"] / counters["ticks"],
+        changed / TICKS,
+        mismatches,
+    )
+
+
+def main():
+    k = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    sizes = [int(arg) for arg in sys.argv[2:]] or [1000, 5000, 10000]
+
+    print(
+        f"k = {k}, {TICKS} ticks of {constants.MOBILITY_TICK} s, "
+        f"speed {constants.MOBILITY_SPEED} units/s\n"
+    )
+    print(
+        f"{'nodes':>8}{'mobile':>8}{'incr ms':>10}{'full ms':>10}{'recomputed':>12}"
+        f"{'changed':>9}{'diff':>6}"
+    )
+    for num_nodes in sizes:
+        for share in (1, MOBILE_SHARE):
+            incremental, full, recomputed, changed, mismatches = run(num_nodes, k, share)
+            print(
+                f"{num_nodes:>8}{share:>8.0%}{incremental:>10.2f}{full:>10.2f}{recomputed:>12.0f}"
+                f"{changed:>9.1f}{mismatches:>6}"
+            )
+
+    # the simulation loads the member key relative to ndn_app
+    os.chdir(NDN_APP)
+    constants.MOBILITY_SPEED = SIM_SPEED
+    report = Simulation(SIM_NODES, k, mobility="random_waypoint").run(SIM_SECONDS)
+    print(f"\n{SIM_NODES} nodes simulated for {SIM_SECONDS} s, speed {SIM_SPEED} units/s")
+    for name, value in report["mobility"].items():
+        print(f"  {name:<20}{value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Compare NameTrie longest prefix match with the substring scanning used before
+(`prefix in data_address` over every registered prefix).
+
+Usage: python3 bench_name_trie.py [num_prefixes] [num_lookups]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "ndn_app"))
+
+from name_trie import NameTrie
+
+SENSORS = ["heartrate/ecg", "heartrate/ppg", "glucose", "temperature/celsius", "eeg"]
+
+
+def scan_substring(prefixes, data_address):
+    for prefix in prefixes:
+        if prefix in data_address:
+            return prefixes[prefix]
+    return None
+
+
+def scan_longest(prefixes, data_address):
+    best, longest = None, -1
+    for prefix in prefixes:
+        if data_address.startswith(prefix) and len(prefix) > longest:
+            best, longest = prefixes[prefix], len(prefix)
+    return best
+
+
+def timed(function, names):
+    start = time.perf_counter()
+    for name in names:
+        function(name)
+    return (time.perf_counter() - start) / len(names) * 1e6
+
+
+def main():
+    num_prefixes = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    num_lookups = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    random.seed(1)
+
+    prefixes = {f"/data/{i}/": i for i in range(num_prefixes)}
+    trie = NameTrie()
+    for prefix, value in prefixes.items():
+        trie.insert(prefix, value)
+
+    names = [
+        f"/data/{random.randrange(num_prefixes * 2)}/{random.choice(SENSORS)}"
+        for _ in range(num_lookups)
+    ]
+
+    print(f"{num_prefixes} prefixes, {num_lookups} lookups (half of them miss)\n")
+    print(f"{'method':<28}{'us/lookup':>12}")
+    for method, function in (
+        ("substring scan", lambda name: scan_substring(prefixes, name)),
+        ("startswith longest scan", lambda name: scan_longest(prefixes, name)),
+        ("NameTrie longest prefix", trie.longest_prefix_match),
+    ):
+        print(f"{method:<28}{timed(function, names):>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Startup time of all nodes of a host: every node generating its RSA keys and loading the shared
+keys (what main.py did before) against main.create_nodes with the key store, once with an
+empty store (keys generated in the foreground and in the background) and once with a filled
+one. Nodes run on 127.0.0.1, "ready" is when all of them answer a management call.
+
+Usage: python3 bench_startup.py [num_nodes]
+"""
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+NDN_APP = os.path.join(os.path.dirname(__file__), "..", "..", "ndn_app")
+sys.path.insert(0, NDN_APP)
+
+import constants
+import sensor_data
+from main import create_nodes
+from mgmt import MgmtClient
+from node import Node
+
+
+def configure(num_nodes):
+    base_port = 48000 + (os.getpid() % 100) * 100
+    constants.NUM_NODES = num_nodes
+    constants.NODES = {
+        label: {
+            "server_ip": "127.0.0.1",
+            "server_port": base_port + label,
+            "client_port": 0,
+            "xy": (label * 10, 0),
+        }
+        for label in range(num_nodes)
+    }
+
+
+def create_nodes_per_node(labels, replies):
+    """
+    Nodes built the old way: keys generated, shared keys and Faker loaded by every node.
+    """
+    started = time.perf_counter()
+    nodes = {}
+    for i in labels:
+        sensor_data._faker = None
+        nodes[i] = Node(
+            constants.NODES[i]["xy"][0],
+            constants.NODES[i]["xy"][1],
+            i,
+            f"/data/{i}/",
+            constants.NODES[i]["server_ip"],
+            constants.NODES[i]["server_port"],
+            constants.NODES,
+            constants.MINIMUM_NEIGHBORS,
+            constants.HELLO_DELAY,
+            multiprocessing.Queue(maxsize=constants.MGMT_QUEUE_SIZE),
+            constants.MEMBER_KEY_PATH,
+            i == constants.GW_NODE_LABEL,
+            constants.GW_KEY,
+            constants.GW_DETAILS,
+            mgmt_replies=replies,
+        )
+    return nodes, {"build nodes": time.perf_counter() - started}
+
+
+def start(nodes, replies, timings):
+    started = time.perf_counter()
+    for node in nodes.values():
+        node.start()
+    timings["start processes"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    client = MgmtClient({label: node.mgmt for label, node in nodes.items()}, replies, 1)
+    waiting = set(nodes)
+    while waiting:
+        results, _ = client.broadcast("comms", labels=sorted(waiting))
+        waiting -= set(results)
+    timings["until ready"] = time.perf_counter() - started
+
+    for node in nodes.values():
+        node.terminate()
+        node.join()
+
+
+def main():
+    num_nodes = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    # keys are loaded relative to ndn_app
+    os.chdir(NDN_APP)
+    configure(num_nodes)
+    constants.KEY_STORE_PATH = tempfile.mkdtemp(prefix="ndn-keys-")
+    labels = range(num_nodes)
+
+    runs = {}
+    replies = multiprocessing.Queue()
+    nodes, runs["per node"] = create_nodes_per_node(labels, replies)
+    start(nodes, replies, runs["per node"])
+    for name in ("empty store", "filled store"):
+        sensor_data._faker = None
+        replies = multiprocessing.Queue()
+        nodes, runs[name] = create_nodes(labels, None, replies)
+        start(nodes, replies, runs[name])
+
+    phases = list(dict.fromkeys(phase for timings in runs.values() for phase in timings))
+    print(f"{num_nodes} nodes, ms per startup phase\n")
+    print(f"{'phase':<18}" + "".join(f"{name:>14}" for name in runs))
+    for phase in phases + ["total"]:
+        row = f"{phase:<18}"
+        for timings in runs.values():
+            seconds = sum(timings.values()) if phase == "total" else timings.get(phase)
+            row += f"{'-' if seconds is None else f'{seconds * 1000:.1f}':>14}"
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
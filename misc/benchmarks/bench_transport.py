@@ -0,0 +1,83 @@
+"""
+Compare packets/sec and forwarding latency of the thread and asyncio communication engines.
+
+Three comm objects run in this process: source -> forwarder -> sink. The forwarder sends every
+packet it receives on to the sink (like an NDN node forwarding an Interest), the sink records
+the latency from the timestamp embedded in the packet.
+
+Usage: python3 bench_transport.py [num_packets]
+"""
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "ndn_app"))
+
+from node import create_comm
+
+BASE_PORT = 36000
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def run(engine, num_packets, base_port):
+    source = create_comm("127.0.0.1", base_port, engine)
+    forwarder = create_comm("127.0.0.1", base_port + 1, engine)
+    sink = create_comm("127.0.0.1", base_port + 2, engine)
+
+    latencies = []
+    done = threading.Event()
+
+    # callbacks get memoryview frames of the receive buffer, only valid during the call
+    def forward(data):
+        forwarder.send("127.0.0.1", base_port + 2, bytes(data))
+
+    def receive(data):
+        latencies.append(time.perf_counter() - float(bytes(data).decode().split("][")[1]))
+        if len(latencies) == num_packets:
+            done.set()
+
+    forwarder.packet_callback = forward
+    sink.packet_callback = receive
+    for comm in (source, forwarder, sink):
+        comm.listen()
+
+    # warm up connections
+    source.send("127.0.0.1", base_port + 1, f"[2][{time.perf_counter()}][warmup]")
+    time.sleep(0.5)
+    latencies.clear()
+
+    start = time.perf_counter()
+    for i in range(num_packets):
+        source.send("127.0.0.1", base_port + 1, f"[2][{time.perf_counter()}][{i}]")
+    done.wait(timeout=60)
+    elapsed = time.perf_counter() - start
+
+    return {
+        "engine": engine,
+        "received": len(latencies),
+        "pps": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+def main():
+    num_packets = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    print(f"Forwarding {num_packets} packets source -> forwarder -> sink\n")
+    print(f"{'engine':<10}{'received':>10}{'pkt/s':>12}{'p50 ms':>10}{'p99 ms':>10}")
+    for i, engine in enumerate(("thread", "asyncio")):
+        result = run(engine, num_packets, BASE_PORT + i * 10)
+        print(
+            f"{result['engine']:<10}{result['received']:>10}{result['pps']:>12.0f}"
+            f"{result['p50_ms']:>10.3f}{result['p99_ms']:>10.3f}"
+        )
+    os._exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,13 @@
+import os
+import sys
 import networkx as nx
 from random import randint, seed
 import matplotlib.pyplot as plt
-from math import sqrt
+
+# shared with the nodes, appended so this directory's constants module still wins
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "..", "ndn_app"))
+
+from spatial_index import GridIndex
 
 
 class Node:
@@ -31,9 +37,6 @@ class Graph:
         self.grid_size = grid_size
         self.k = k
 
-    def _distance(self, p1, p2):
-        return sqrt((p1[0] - p2[0]) ** 2 + (p1[1] - p2[1]) ** 2)
-
     def nodes_pos(self):
         return {
             label: (self.nodes[label].x, self.nodes[label].y)
@@ -66,25 +69,18 @@ class Graph:
 
     def connect_nodes(self):
         self.add_pending_nodes()
+        node_index = GridIndex.from_points(
+            {label: self.nodes[label].xy() for label in self.nodes}
+        )
 
         for label_n1 in self.nodes:
             if len(self.nodes[label_n1].neighbors) < self.k:
-                potential_neighbors = []
-
-                for label_n2 in self.nodes:
-                    if (
-                        label_n1 != label_n2
-                        and label_n2 not in self.nodes[label_n1].neighbors
-                    ):
-                        d = self._distance(
-                            self.nodes[label_n1].xy(), self.nodes[label_n2].xy()
-                        )
-                        potential_neighbors.append((label_n2, d))
-
                 remaining_neighbor_slots = self.k - len(self.nodes[label_n1].neighbors)
-                neighbors = sorted(potential_neighbors, key=lambda x: x[1])[
-                    :remaining_neighbor_slots
-                ]
+                neighbors = node_index.nearest(
+                    self.nodes[label_n1].xy(),
+                    remaining_neighbor_slots,
+                    exclude=self.nodes[label_n1].neighbors | {label_n1},
+                )
                 for neighbor in neighbors:
                     self._graph.add_edges_from([(label_n1, neighbor[0])])
                     self.nodes[label_n1].neighbors.add(neighbor[0])
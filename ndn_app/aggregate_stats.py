@@ -1,41 +1,276 @@
 import os
 import json
+import socket
 import sys
-from time import sleep
+import threading
+import time
+import constants
+from collections import deque
+from metrics import render_prometheus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from state_export import apply_delta, read_state, write_atomic
 
 
 DIRECTORY_PATH = "stats"
 
+_encode = json.JSONEncoder(separators=(",", ":")).encode
 
-def main():
+
+class StatsAggregator:
+    """
+    Merged state of all nodes on this host, kept in memory.
+
+    Nodes push every snapshot and delta they export (see StateExporter) as UDP datagrams. A delta
+    is applied if it follows the last known version of the node, after a gap (lost datagram,
+    aggregator started late) the node's state is reloaded from its stats file. Updates are kept
+    as numbered events for streaming clients, the merged snapshot is only re-encoded for nodes
+    which changed since the last request.
+    """
+
+    def __init__(self, directory, history) -> None:
+        self.directory = directory
+        # label -> state / version / encoded state (None if changed since encoded)
+        self.states = {}
+        self.versions = {}
+        self.encoded = {}
+        # (sequence, event name, data) for streaming clients
+        self.events = deque(maxlen=history)
+        self.sequence = 0
+        self.snapshot_cache = (None, b"{}")
+        self.condition = threading.Condition()
+        self.counters = {
+            "snapshots": 0,
+            "deltas": 0,
+            "stale": 0,
+            "recovered": 0,
+            "invalid": 0,
+        }
+
+    def _publish(self, event, data):
+        self.sequence += 1
+        self.events.append((self.sequence, event, data))
+        self.condition.notify_all()
+
+    def _set_state(self, label, version, state, data):
+        self.states[label] = state
+        self.versions[label] = version
+        self.encoded[label] = None
+        self._publish("node", data)
+
+    def _load(self, label):
+        """
+        (Re)load state of label from its stats file, returns False if there is none.
+        """
+        try:
+            label, version, state = read_state(os.path.join(self.directory, str(label)))
+        except (OSError, ValueError, KeyError):
+            return False
+        if version > self.versions.get(label, 0):
+            self._set_state(
+                label,
+                version,
+                state,
+                _encode({"label": label, "version": version, "state": state}),
+            )
+        return True
+
+    def load(self):
+        """
+        Load all nodes which exported their state before the aggregator started.
+        """
+        with self.condition:
+            for file_name in os.listdir(self.directory):
+                if not file_name.endswith((".delta", ".tmp")):
+                    self._load(file_name)
+
+    def handle_record(self, data):
+        """
+        Apply snapshot or delta record pushed by a node.
+        """
+        try:
+            record = json.loads(data)
+            label, version = record["label"], record["version"]
+        except (ValueError, KeyError, TypeError):
+            self.counters["invalid"] += 1
+            return
+
+        with self.condition:
+            known_version = self.versions.get(label, 0)
+            if "state" in record:
+                # versions start over when a node restarts, snapshots always replace the state
+                self.counters["snapshots"] += 1
+                self._set_state(label, version, record["state"], data.decode("utf-8"))
+            elif version <= known_version:
+                self.counters["stale"] += 1
+            elif version == known_version + 1 and label in self.states:
+                self.counters["deltas"] += 1
+                apply_delta(self.states[label], record)
+                self.versions[label] = version
+                self.encoded[label] = None
+                self._publish("delta", data.decode("utf-8").rstrip("\n"))
+            elif self._load(label):
+                self.counters["recovered"] += 1
+            else:
+                self.counters["invalid"] += 1
+
+    def snapshot(self):
+        """
+        (sequence, merged state of all nodes as JSON bytes).
+        """
+        with self.condition:
+            if self.snapshot_cache[0] != self.sequence:
+                for label, encoded in self.encoded.items():
+                    if encoded is None:
+                        self.encoded[label] = _encode(self.states[label])
+                merged = ",".join(
+                    f'"{label}":{self.encoded[label]}' for label in sorted(self.encoded)
+                )
+                self.snapshot_cache = (self.sequence, f"{{{merged}}}".encode("utf-8"))
+            return self.snapshot_cache
+
+    def prometheus(self):
+        """
+        Latency histograms of all nodes in Prometheus text format.
+        """
+        with self.condition:
+            return render_prometheus(
+                [
+                    ({"node": label}, self.states[label].get("metrics", {}))
+                    for label in sorted(self.states)
+                ]
+            ).encode("utf-8")
+
+    def wait_events(self, after, timeout):
+        """
+        Events newer than sequence after, waits up to timeout for the first one. Returns None
+        if some of them already left the history (client has to start from a snapshot).
+        """
+        with self.condition:
+            if after > self.sequence:
+                # event ID of an earlier aggregator run
+                return None
+            self.condition.wait_for(lambda: self.sequence > after, timeout)
+            if self.events and self.events[0][0] > after + 1:
+                return None
+            return [event for event in self.events if event[0] > after]
+
+    def stats(self):
+        with self.condition:
+            return dict(self.counters, nodes=len(self.states), sequence=self.sequence)
+
+
+class StatsRequestHandler(BaseHTTPRequestHandler):
+    """
+    GET /state: merged state of all nodes, GET /events: server-sent events, a "snapshot" of the
+    merged state followed by "node" (full state of one node) and "delta" (changes of one node,
+    see StateExporter) events. Clients reconnecting with Last-Event-ID only get missed events.
+    GET /metrics: latency histograms of all nodes in Prometheus text format.
+    """
+
+    def _send_headers(self, content_type, length=None):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.send_header("Cache-Control", "no-cache")
+        if length is not None:
+            self.send_header("Content-Length", str(length))
+        self.end_headers()
+
+    def do_GET(self):
+        aggregator = self.server.aggregator
+        path = self.path.split("?")[0]
+
+        if path == "/state":
+            sequence, data = aggregator.snapshot()
+            self._send_headers("application/json", len(data))
+            self.wfile.write(data)
+        elif path == "/metrics":
+            data = aggregator.prometheus()
+            self._send_headers("text/plain; version=0.0.4", len(data))
+            self.wfile.write(data)
+        elif path == "/stats":
+            data = _encode(aggregator.stats()).encode("utf-8")
+            self._send_headers("application/json", len(data))
+            self.wfile.write(data)
+        elif path == "/events":
+            self._stream_events(aggregator)
+        else:
+            self.send_error(404)
+
+    def _stream_events(self, aggregator):
+        self._send_headers("text/event-stream")
+        last_event_id = self.headers.get("Last-Event-ID")
+        last = int(last_event_id) if last_event_id and last_event_id.isdigit() else None
+        try:
+            while True:
+                events = None if last is None else aggregator.wait_events(last, 15)
+                if events is None:
+                    last, data = aggregator.snapshot()
+                    events = [(last, "snapshot", data.decode("utf-8"))]
+                if not events:
+                    # keeps proxies from closing the stream, detects gone clients
+                    self.wfile.write(b": keepalive\n\n")
+                for sequence, event, data in events:
+                    self.wfile.write(
+                        f"id: {sequence}\nevent: {event}\ndata: {data}\n\n".encode("utf-8")
+                    )
+                    last = sequence
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+
+def receive_updates(aggregator, address):
+    """
+    Receive state records pushed by the nodes.
+    """
+    server = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    server.bind(address)
     while True:
-        file_contents = {}
-
-        files = [
-            f
-            for f in os.listdir(DIRECTORY_PATH)
-            if os.path.isfile(os.path.join(DIRECTORY_PATH, f))
-        ]
-
-        failure = False
-        for file_name in files:
-            file_path = os.path.join(DIRECTORY_PATH, file_name)
-            try:
-                with open(file_path, "r") as file:
-                    content = file.read()
-                    content_dict = json.loads(content)
-                    key = next(iter(content_dict))
-                    file_contents[key] = content_dict[key]
-            except:
-                failure = True
-                break
-        if failure:
-            sleep(0.5)
-            continue
-
-        with open(sys.argv[1], "w") as file:
-            file.write(json.dumps(file_contents, indent=2))
-        sleep(0.5)
+        data, _ = server.recvfrom(65535)
+        aggregator.handle_record(data)
+
+
+def write_output(aggregator, output_path, interval):
+    """
+    Keep writing the merged state to output_path (at most every interval seconds) for consumers
+    reading the stats from a file.
+    """
+    written = None
+    while True:
+        sequence, data = aggregator.snapshot()
+        if sequence != written:
+            write_atomic(output_path, data)
+            written = sequence
+        aggregator.wait_events(sequence, None)
+        time.sleep(interval)
+
+
+def main():
+    if not os.path.exists(DIRECTORY_PATH):
+        os.makedirs(DIRECTORY_PATH)
+    aggregator = StatsAggregator(DIRECTORY_PATH, constants.STATS_EVENT_HISTORY)
+    aggregator.load()
+
+    threading.Thread(
+        target=receive_updates,
+        args=(aggregator, constants.STATS_AGGREGATOR_ADDRESS),
+        daemon=True,
+    ).start()
+    if len(sys.argv) > 1:
+        threading.Thread(
+            target=write_output, args=(aggregator, sys.argv[1], 0.5), daemon=True
+        ).start()
+
+    server = ThreadingHTTPServer(constants.STATS_HTTP_ADDRESS, StatsRequestHandler)
+    server.daemon_threads = True
+    server.aggregator = aggregator
+    host, port = constants.STATS_HTTP_ADDRESS
+    print(f"Serving stats on http://{host}:{port}/state and /events")
+    server.serve_forever()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,253 @@
+from connection_pool import PeerHealth
+from framing import FrameError, FrameReader, encode_frame
+
+import asyncio
+import socket
+import threading
+import time
+import constants
+import metrics
+import tlv
+
+
+class AsyncConnectionPool:
+    """
+    asyncio version of ConnectionPool. send() never blocks the event loop: frames to a
+    destination which is still connecting are queued and flushed once the connection is up.
+    """
+
+    class Connection:
+        def __init__(self, now):
+            self.writer = None
+            self.pending = []
+            self.last_used = now
+
+    def __init__(
+        self,
+        connect_timeout,
+        send_timeout,
+        idle_timeout,
+        backoff_base,
+        backoff_max,
+        max_write_buffer=256 * 1024,
+    ) -> None:
+        self.connect_timeout = connect_timeout
+        self.send_timeout = send_timeout
+        self.idle_timeout = idle_timeout
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_write_buffer = max_write_buffer
+
+        self.connections = {}
+        self.health = {}
+        self.counters = {
+            "hit": 0,
+            "miss": 0,
+            "reconnect": 0,
+            "evicted": 0,
+            "failed": 0,
+            "backoff_skip": 0,
+        }
+
+    def get_health(self, dest):
+        if dest not in self.health:
+            self.health[dest] = PeerHealth()
+        return self.health[dest]
+
+    def _close(self, dest):
+        connection = self.connections.pop(dest, None)
+        if connection and connection.writer:
+            connection.writer.close()
+
+    def _fail(self, dest, connection):
+        if self.connections.get(dest) is connection:
+            self._close(dest)
+        self.counters["failed"] += 1
+        self.get_health(dest).mark_failure(
+            time.monotonic(), self.backoff_base, self.backoff_max
+        )
+
+    async def _connect(self, dest, connection):
+        try:
+            _, writer = await asyncio.wait_for(
+                asyncio.open_connection(*dest), self.connect_timeout
+            )
+        except (OSError, asyncio.TimeoutError):
+            self._fail(dest, connection)
+            return
+
+        if self.connections.get(dest) is not connection:
+            # evicted while connecting
+            writer.close()
+            return
+        writer.get_extra_info("socket").setsockopt(
+            socket.IPPROTO_TCP, socket.TCP_NODELAY, 1
+        )
+        connection.writer = writer
+        writer.writelines(connection.pending)
+        connection.pending.clear()
+        self.get_health(dest).mark_success(time.monotonic())
+        self._check_write_buffer(dest, connection)
+
+    async def _drain(self, dest, connection):
+        try:
+            await asyncio.wait_for(connection.writer.drain(), self.send_timeout)
+        except (OSError, asyncio.TimeoutError):
+            self._fail(dest, connection)
+
+    def _check_write_buffer(self, dest, connection):
+        # slow peer, wait for the buffer to drain but give up after send_timeout
+        if connection.writer.transport.get_write_buffer_size() > self.max_write_buffer:
+            asyncio.get_running_loop().create_task(self._drain(dest, connection))
+
+    def send(self, dest, data):
+        """
+        Queue bytes for destination. Must be called from the event loop thread.
+        """
+        now = time.monotonic()
+        health = self.get_health(dest)
+        if health.in_backoff(now):
+            self.counters["backoff_skip"] += 1
+            return False
+
+        connection = self.connections.get(dest)
+        if connection and connection.writer and connection.writer.is_closing():
+            # peer closed the connection -> reconnect
+            self._close(dest)
+            self.counters["reconnect"] += 1
+            connection = None
+        elif connection:
+            self.counters["hit"] += 1
+        else:
+            self.counters["miss"] += 1
+
+        if connection is None:
+            connection = self.Connection(now)
+            self.connections[dest] = connection
+            asyncio.get_running_loop().create_task(self._connect(dest, connection))
+
+        connection.last_used = now
+        if connection.writer:
+            connection.writer.write(data)
+            self._check_write_buffer(dest, connection)
+        else:
+            connection.pending.append(data)
+        return True
+
+    async def evict_idle(self):
+        """
+        Periodically close connections which were not used for idle_timeout seconds.
+        """
+        while True:
+            await asyncio.sleep(self.idle_timeout / 2)
+            now = time.monotonic()
+            for dest in list(self.connections):
+                if now - self.connections[dest].last_used > self.idle_timeout:
+                    self._close(dest)
+                    self.counters["evicted"] += 1
+
+
+class AsyncSocketCommunication:
+    """
+    asyncio engine for TCP server and clients. Same interface as SocketCommunication
+    (send, packet_callback, gateway_callback, comms_enabled, counters, get_health) but all I/O
+    runs on a single event loop instead of a thread per connection.
+    """
+
+    def __init__(self, address, port) -> None:
+        self.address = address
+        self.port = port
+        self.packet_callback = None
+        self.gateway_callback = None
+        self.comms_enabled = True
+        # replaced by the metrics of the node
+        self.metrics = metrics.DISABLED
+        self.pool = AsyncConnectionPool(
+            constants.CONNECT_TIMEOUT,
+            constants.SEND_TIMEOUT,
+            constants.IDLE_CONNECTION_TIMEOUT,
+            constants.RECONNECT_BACKOFF,
+            constants.MAX_RECONNECT_BACKOFF,
+        )
+        self.counters = self.pool.counters
+        self.counters["packet_errors"] = 0
+        self.loop = None
+        self.loop_thread_id = None
+        self.server = None
+
+    def get_health(self, dest):
+        return self.pool.get_health(dest)
+
+    def send(self, dest_address, dest_port, data):
+        with self.metrics.time(metrics.SEND_SECONDS, (("transport", "tcp"),)):
+            return self._send(dest_address, dest_port, data)
+
+    def _send(self, dest_address, dest_port, data):
+        if self.comms_enabled:
+            if isinstance(data, str):
+                data = data.encode("utf-8")
+            frame = encode_frame(data)
+            if threading.get_ident() == self.loop_thread_id:
+                return self.pool.send((dest_address, dest_port), frame)
+            self.loop.call_soon_threadsafe(
+                self.pool.send, (dest_address, dest_port), frame
+            )
+            return True
+        return False
+
+    def _handle_packet(self, data):
+        try:
+            # If gateway packet, execute gateway callback
+            if tlv.is_gateway_packet(data):
+                self.gateway_callback(data)
+            # Else, hand over to packet dispatcher
+            else:
+                self.packet_callback(data)
+        except Exception:
+            # malformed packet, must not end the connection it came in on
+            self.counters["packet_errors"] += 1
+
+    async def _handle_connection(self, reader, writer):
+        """
+        Reads length prefixed frames from a peer connection until it is closed.
+        """
+        frame_reader = FrameReader(
+            constants.MAX_FRAME_SIZE, constants.RECEIVE_BUFFER_SIZE
+        )
+        try:
+            while self.comms_enabled:
+                received = await reader.read(constants.RECEIVE_BUFFER_SIZE)
+                if not received:
+                    break
+                frame_reader.feed(received)
+                for frame in frame_reader.frames():
+                    self._handle_packet(frame)
+        except (OSError, FrameError):
+            # oversized or garbage frame, drop the connection
+            ...
+        finally:
+            writer.close()
+
+    async def start(self):
+        """
+        Start TCP server on the running event loop.
+        """
+        self.loop = asyncio.get_running_loop()
+        self.loop_thread_id = threading.get_ident()
+        self.server = await asyncio.start_server(
+            self._handle_connection,
+            self.address,
+            self.port,
+            backlog=constants.SERVER_BACKLOG,
+            reuse_address=True,
+        )
+        self.loop.create_task(self.pool.evict_idle())
+
+    def listen(self):
+        """
+        Start a private event loop in a background thread and run the server on it. Used when
+        the caller doesn't run its own event loop.
+        """
+        loop = asyncio.new_event_loop()
+        threading.Thread(target=loop.run_forever, daemon=True).start()
+        asyncio.run_coroutine_threadsafe(self.start(), loop).result()
@@ -0,0 +1,106 @@
+import base64
+import itertools
+import time
+
+
+class PacketCapture:
+    """
+    Ring buffer of captured packets.
+
+    Records are tuples (timestamp, direction, packet type, neighbor, message, wire) stored in a
+    preallocated list, message is the decoded/plain message object and wire the packet as sent
+    (both by reference) or only its size. Names, sizes and the plaintext are only formatted when
+    the ring is viewed. Every sample_every-th packet which passes the filters (packet types,
+    directions, name prefix, None for all) is captured.
+    """
+
+    def __init__(
+        self, size, sample_every=1, packet_types=None, directions=None, name_prefix=None
+    ) -> None:
+        self.size = size
+        self.slots = [None] * size
+        # total records written, slot = index % size
+        self.written = itertools.count()
+        self.last = -1
+        self.seen = itertools.count()
+        self.configure(sample_every, packet_types, directions, name_prefix)
+
+    def configure(self, sample_every=1, packet_types=None, directions=None, name_prefix=None):
+        self.sample_every = max(int(sample_every), 1)
+        self.packet_types = None if packet_types is None else frozenset(packet_types)
+        self.directions = None if directions is None else frozenset(directions)
+        self.name_prefix = name_prefix
+        # matched by name components, "/data/1" doesn't match "/data/10"
+        if name_prefix is not None:
+            self.prefix_name = name_prefix.rstrip("/")
+            self.prefix_children = self.prefix_name + "/"
+        self.enabled = self.size > 0
+
+    def record(self, direction, packet_type, message, wire=None, neighbor=None):
+        if not self.enabled:
+            return
+        if self.packet_types is not None and packet_type not in self.packet_types:
+            return
+        if self.directions is not None and direction not in self.directions:
+            return
+        if self.name_prefix is not None:
+            name = str(getattr(message, "data_address", ""))
+            if name != self.prefix_name and not name.startswith(self.prefix_children):
+                return
+        if self.sample_every > 1 and next(self.seen) % self.sample_every:
+            return
+
+        index = next(self.written)
+        self.slots[index % self.size] = (
+            time.time(),
+            direction,
+            packet_type,
+            neighbor,
+            message,
+            wire,
+        )
+        self.last = index
+
+    @staticmethod
+    def _format(record):
+        timestamp, direction, packet_type, neighbor, message, wire = record
+        # plaintext of Interest/Data, other messages need keys to be formatted
+        plain = message.get_string() if hasattr(message, "data_address") else None
+        if isinstance(wire, int):
+            wire_size, wire = wire, None
+        elif isinstance(wire, bytes):
+            wire_size = len(wire)
+            wire = base64.b64encode(wire).decode("ascii")
+        else:
+            wire_size = len(wire) if wire is not None else None
+        return {
+            "time": round(timestamp, 3),
+            "direction": direction,
+            "type": packet_type,
+            "neighbor": neighbor if neighbor is not None else getattr(message, "label", None),
+            "name": getattr(message, "data_address", None),
+            "request_id": getattr(message, "request_id", None),
+            "retry_index": getattr(message, "retry_index", None),
+            "plain_size": len(plain) if plain is not None else None,
+            "wire_size": wire_size,
+            "plain": plain,
+            "wire": wire,
+        }
+
+    def view(self, limit=None):
+        """
+        Formatted records, oldest first, at most limit (most recent) ones.
+        """
+        last = self.last
+        count = min(last + 1, self.size)
+        if limit is not None:
+            count = min(count, limit)
+        records = [self.slots[index % self.size] for index in range(last - count + 1, last + 1)]
+        return [self._format(record) for record in records if record is not None]
+
+    def stats(self):
+        return {
+            "size": self.size,
+            "captured": self.last + 1,
+            "sample_every": self.sample_every,
+        }
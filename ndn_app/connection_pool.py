@@ -0,0 +1,165 @@
+import socket
+import threading
+import time
+
+
+class PeerHealth:
+    """
+    Health of the link to one destination. Shared with the FIB rows so the data plane can see
+    which neighbors are currently unreachable.
+    """
+
+    def __init__(self):
+        self.failures = 0
+        self.backoff_until = 0
+        self.last_success = None
+        self.last_failure = None
+
+    def __repr__(self) -> str:
+        return f"(failures={self.failures} healthy={self.healthy})"
+
+    @property
+    def healthy(self):
+        return self.failures == 0
+
+    def in_backoff(self, now):
+        return now < self.backoff_until
+
+    def mark_success(self, now):
+        self.failures = 0
+        self.backoff_until = 0
+        self.last_success = now
+
+    def mark_failure(self, now, backoff_base, backoff_max):
+        self.failures += 1
+        self.last_failure = now
+        self.backoff_until = now + min(
+            backoff_base * 2 ** (self.failures - 1), backoff_max
+        )
+
+
+class ConnectionPool:
+    """
+    Long lived TCP connections, one per destination (ip, port).
+
+    * Connections are reused until they fail or stay idle for idle_timeout seconds
+    * Failed destinations are skipped for an exponentially growing backoff period
+    * Connect and send are bounded by timeouts so a dead neighbor can't block the sender
+    """
+
+    def __init__(
+        self,
+        connect_timeout,
+        send_timeout,
+        idle_timeout,
+        backoff_base,
+        backoff_max,
+    ) -> None:
+        self.connect_timeout = connect_timeout
+        self.send_timeout = send_timeout
+        self.idle_timeout = idle_timeout
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        # dest -> [socket, last used]
+        self.connections = {}
+        self.health = {}
+        self.dest_locks = {}
+        self.lock = threading.Lock()
+        self.last_eviction = time.monotonic()
+
+        self.counters = {
+            "hit": 0,
+            "miss": 0,
+            "reconnect": 0,
+            "evicted": 0,
+            "failed": 0,
+            "backoff_skip": 0,
+        }
+
+    def get_health(self, dest):
+        with self.lock:
+            if dest not in self.health:
+                self.health[dest] = PeerHealth()
+            return self.health[dest]
+
+    def _dest_lock(self, dest):
+        with self.lock:
+            if dest not in self.dest_locks:
+                self.dest_locks[dest] = threading.Lock()
+            return self.dest_locks[dest]
+
+    def _connect(self, dest):
+        client_socket = socket.create_connection(dest, timeout=self.connect_timeout)
+        client_socket.settimeout(self.send_timeout)
+        client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return client_socket
+
+    def _close(self, dest):
+        connection = self.connections.pop(dest, None)
+        if connection:
+            try:
+                connection[0].close()
+            except OSError:
+                ...
+
+    def send(self, dest, data):
+        """
+        Send bytes to destination over pooled connection. Returns True if data was handed to the
+        socket, False if destination is in backoff or unreachable.
+        """
+        now = time.monotonic()
+        if now - self.last_eviction > self.idle_timeout / 2:
+            self.evict_idle()
+
+        health = self.get_health(dest)
+        with self._dest_lock(dest):
+            if health.in_backoff(now):
+                self.counters["backoff_skip"] += 1
+                return False
+
+            connection = self.connections.get(dest)
+            if connection:
+                try:
+                    connection[0].sendall(data)
+                except OSError:
+                    # stale connection, peer went away -> reconnect below
+                    self._close(dest)
+                    self.counters["reconnect"] += 1
+                else:
+                    connection[1] = now
+                    self.counters["hit"] += 1
+                    health.mark_success(now)
+                    return True
+            else:
+                self.counters["miss"] += 1
+
+            try:
+                client_socket = self._connect(dest)
+                client_socket.sendall(data)
+            except OSError:
+                self.counters["failed"] += 1
+                health.mark_failure(now, self.backoff_base, self.backoff_max)
+                return False
+
+            self.connections[dest] = [client_socket, now]
+            health.mark_success(now)
+            return True
+
+    def evict_idle(self):
+        """
+        Close connections which were not used for idle_timeout seconds.
+        """
+        now = time.monotonic()
+        self.last_eviction = now
+        for dest in list(self.connections):
+            with self._dest_lock(dest):
+                connection = self.connections.get(dest)
+                if connection and now - connection[1] > self.idle_timeout:
+                    self._close(dest)
+                    self.counters["evicted"] += 1
+
+    def close_all(self):
+        for dest in list(self.connections):
+            with self._dest_lock(dest):
+                self._close(dest)
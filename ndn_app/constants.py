@@ -51,6 +51,46 @@ NODES_2 = {
 NODES = copy(NODES_1)
 NODES.update(NODES_2)
 
+### HELLO VERIFICATION CACHE ###
+# verified hellos kept to skip key parsing and signature checks of repeated hellos, one entry
+# per neighbor is needed
+HELLO_CACHE_SIZE = 256
+
+### COMMUNICATION ###
+# "tcp" or "udp", can be overridden per node with a "transport" key in NODES or in main.py.
+# Neighbors have to use the same transport.
+TRANSPORT = "tcp"
+# TCP only: "thread": listener thread + one thread per connection, "asyncio": one event loop
+COMM_ENGINE = "thread"
+SERVER_BACKLOG = 128
+# "tlv": binary TLV packets to neighbors (and gateway peer) which announced support, text
+# packets to the others. "text": only the bracket delimited text format.
+# TLV packets are smaller (no base64, eg. 292 instead of 381 bytes for a session encrypted
+# Data) and carry any data, but the pure Python codec costs more CPU than the regex parser
+# (bench_codec: 3.0 vs 1.7 us for the interest fields, 15.5 vs 12.9 us per session Data), so
+# text stays the default. Use TLV where bandwidth matters more than CPU.
+WIRE_FORMAT = "text"
+
+### UDP ###
+MAX_DATAGRAM_SIZE = 1200  # bytes incl. fragment header, stays below common path MTUs
+REASSEMBLY_TIMEOUT = 2  # seconds to wait for missing fragments
+REASSEMBLY_HISTORY = 4096  # delivered message ids remembered for late fragment detection
+# incomplete messages buffered per sender and in total, fragments of further ones are dropped
+MAX_REASSEMBLIES_PER_SENDER = 16
+MAX_REASSEMBLIES = 256
+MAX_QUEUED_DATAGRAMS = 1024
+
+### CONNECTION POOL ###
+CONNECT_TIMEOUT = 1.0
+SEND_TIMEOUT = 1.0
+IDLE_CONNECTION_TIMEOUT = 30
+RECONNECT_BACKOFF = 0.5  # doubles on each failure
+MAX_RECONNECT_BACKOFF = 8
+
+### FRAMING ###
+MAX_FRAME_SIZE = 1024 * 1024
+RECEIVE_BUFFER_SIZE = 64 * 1024
+
 ### NEIGHBOR DISCOVERY ###
 MINIMUM_NEIGHBORS = 3
 HELLO_DELAY = 1
@@ -58,8 +98,121 @@ HELLO_TIMEOUT = 3
 MAX_HELLO_COUNT = 5
 MEMBER_KEY_PATH = "member.pem"
 
+### KEY STORE ###
+# RSA node key pairs are kept in KEY_STORE_PATH (one PEM per label) instead of being generated
+# on every start, missing ones are generated in the background (python3 key_store.py <nodes>
+# fills it ahead of time).
+KEY_STORE = True
+KEY_STORE_PATH = "keys"
+
+### SESSION KEYS ###
+# Interest/Data payloads are encrypted with per neighbor AES-GCM keys agreed over Hello (X25519)
+# instead of RSA-OAEP. Neighbors without a session key still get RSA encrypted packets.
+SESSION_KEYS = True
+SESSION_KEY_ROTATION = 300  # seconds
+
+### ROUTING ###
+# Link state routing: interests are unicast towards the nearest producer of the longest matching
+# prefix, interests without a route (and retries) are flooded like before.
+LINK_STATE_ROUTING = True
+LSA_REFRESH_INTERVAL = 30  # seconds between periodic LSA refreshes
+LSA_MAX_AGE = 90  # LSAs not refreshed for this long are removed
+
+### MAIN LOOP ###
+FIB_AGING_HELLO_INTERVALS = 2  # hello counts are decremented once per this many hello intervals
+STATS_EXPORT_INTERVAL = 1  # seconds between writes of the stats file
+
+### METRICS ###
+# latency histograms per pipeline stage and packet type, per send and per prefix RTT, exported
+# in the node stats ("metrics") and by the stats aggregator in Prometheus text format
+METRICS_ENABLED = True
+# bucket upper bounds in seconds
+STAGE_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1)
+RTT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+### PACKET CAPTURE ###
+CAPTURE_SIZE = 64  # packets kept in the capture ring, 0 disables capture
+CAPTURE_SAMPLE_EVERY = 1  # capture every n-th packet passing the filters
+# filters, None captures all: packet types (incoming: packet names, outgoing: the "out" counter
+# names), directions ("in", "out") and data address prefix
+CAPTURE_PACKET_TYPES = (
+    "interest",
+    "data",
+    "interest_org",
+    "interest_fwd",
+    "data_org",
+    "data_fwd",
+    "data_cache",
+)
+CAPTURE_DIRECTIONS = None
+CAPTURE_NAME_PREFIX = None
+
+### STATE EXPORT ###
+STATE_EXPORT_DELTAS = True  # append changes to stats/<label>.delta between full snapshots
+# seconds, periodic snapshots refresh timings and histograms of nodes whose other state didn't
+# change. None: they are only refreshed with the snapshots written for changes, the mgmt calls
+# always return current values.
+STATE_SNAPSHOT_INTERVAL = None
+
+### STATS AGGREGATOR ###
+# nodes push their state exports to the aggregator (aggregate_stats.py) on this host
+STATS_AGGREGATOR_ADDRESS = ("127.0.0.1", 33900)
+# /state snapshot and /events stream of the aggregator, local only by default. The state is not
+# authenticated, use ("0.0.0.0", 8080) to serve it to other hosts.
+STATS_HTTP_ADDRESS = ("127.0.0.1", 8080)
+STATS_EVENT_HISTORY = 1024  # events kept for reconnecting stream clients
+
+### MGMT ###
+MGMT_QUEUE_SIZE = 64  # pending management calls per node
+MGMT_TIMEOUT = 2  # seconds the CLI waits for nodes to answer a call
+
+### TABLE EXPIRY ###
+INTEREST_LIFETIME = 4  # seconds before unanswered PIT/GPIT/client request entries expire
+TIMER_TICK = 0.1
+TIMER_SLOTS = 512  # one wheel revolution = TIMER_TICK * TIMER_SLOTS seconds
+
+### RETRANSMISSION ###
+# Originated interests are retransmitted (same request id, increasing retry index) when no data
+# arrived within the RTO of their prefix, RTO is doubled on every retry up to MAX_RTO.
+MAX_RETRIES = 3
+INITIAL_RTO = 1  # seconds, used until the first RTT sample of a prefix
+MIN_RTO = 0.2
+MAX_RTO = 4
+RTT_PREFIX_COMPONENTS = 2  # RTT is tracked per prefix of this many components, eg. /data/3/
+RTT_HISTORY = 1024  # latency samples kept for percentiles
+
+### CONTENT STORE ###
+CS_MAX_ENTRIES = 512
+CS_MAX_BYTES = 1024 * 1024
+CS_DEFAULT_TTL = 2  # seconds a cached Data packet stays fresh
+# freshness per data address prefix (longest prefix wins), eg. {"/data/3/patientinfo": 60}
+CS_PREFIX_TTLS = {}
+
+### MOBILITY ###
+# None (fixed positions), "random_waypoint" or the path of a CSV trace "time,label,x,y".
+# Every MOBILITY_TICK seconds positions are updated and the k nearest of the nodes which moved
+# (or got a new node in range) are recomputed, new neighbors get a hello right away.
+MOBILITY = None
+MOBILITY_TICK = 1  # seconds
+MOBILITY_SPEED = (0.5, 1.5)  # grid units per second, random waypoint
+MOBILITY_PAUSE = 30  # max seconds a node stays at a waypoint
+MOBILITY_SEED = COORDINATE_SEED
+
+### SIMULATION ###
+# in-process simulator (simulator.py): link delay = SIM_LINK_DELAY + SIM_LINK_DELAY_PER_UNIT
+# * euclidean distance, so 1000 grid units add 20ms
+SIM_LINK_DELAY = 0.002  # seconds
+SIM_LINK_DELAY_PER_UNIT = 0.00002
+SIM_KEY_POOL = 8  # RSA node key pairs shared by all simulated nodes
+SIM_CHECK_INTERVAL = 0.1  # virtual seconds between convergence checks
+SIM_LINK_CHECK_INTERVAL = 0.01  # virtual seconds between checks of links created by mobility
+
 ### PACKAGE STRUCTURE ###
 HELLO_ID = 0
 HELLO_ACK_ID = 4
 DATA_ID = 1
 INTEREST_ID = 2
+LSA_ID = 5
+# binary wire format only, text gateway packets are prefixed with "EG|" / "EG_REPLY|"
+EG_ID = 6
+EG_REPLY_ID = 7
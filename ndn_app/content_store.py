@@ -0,0 +1,95 @@
+from collections import OrderedDict
+from name_trie import NameTrie
+
+import threading
+import time
+
+
+class ContentStore:
+    """
+    Cache of Data packets by data address.
+
+    * LRU eviction once max_entries or max_bytes is exceeded
+    * Freshness: entries older than the TTL of their longest matching prefix are treated as
+      misses and removed, prefixes without a TTL use default_ttl
+    """
+
+    class Entry:
+        def __init__(self, data, size, expires):
+            self.data = data
+            self.size = size
+            self.expires = expires
+
+    def __init__(
+        self, max_entries, max_bytes, default_ttl, prefix_ttls=None, clock=time.monotonic
+    ) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.prefix_ttls = NameTrie()
+        for prefix, ttl in (prefix_ttls or {}).items():
+            self.prefix_ttls.insert(prefix, ttl)
+        self.clock = clock
+
+        self.entries = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+        self.counters = {
+            "hit": 0,
+            "miss": 0,
+            "stale": 0,
+            "inserted": 0,
+            "evicted": 0,
+        }
+
+    def __len__(self):
+        return len(self.entries)
+
+    def ttl_for(self, data_address):
+        """
+        TTL of the longest configured prefix of data_address.
+        """
+        match = self.prefix_ttls.longest_prefix_match(data_address)
+        return match[1] if match else self.default_ttl
+
+    def _remove(self, data_address):
+        entry = self.entries.pop(data_address)
+        self.size -= entry.size
+
+    def insert(self, data_address, data):
+        ttl = self.ttl_for(data_address)
+        size = len(data_address) + len(data)
+        if ttl <= 0 or self.max_entries <= 0 or size > self.max_bytes:
+            return
+
+        with self.lock:
+            if data_address in self.entries:
+                self._remove(data_address)
+            self.entries[data_address] = self.Entry(data, size, self.clock() + ttl)
+            self.size += size
+            self.counters["inserted"] += 1
+
+            while len(self.entries) > self.max_entries or self.size > self.max_bytes:
+                self._remove(next(iter(self.entries)))
+                self.counters["evicted"] += 1
+
+    def lookup(self, data_address):
+        """
+        Fresh cached data for data_address or None.
+        """
+        with self.lock:
+            entry = self.entries.get(data_address)
+            if entry is None:
+                self.counters["miss"] += 1
+                return None
+            if self.clock() >= entry.expires:
+                self._remove(data_address)
+                self.counters["stale"] += 1
+                self.counters["miss"] += 1
+                return None
+            self.entries.move_to_end(data_address)
+            self.counters["hit"] += 1
+            return entry.data
+
+    def stats(self):
+        return dict(self.counters, entries=len(self.entries), bytes=self.size)
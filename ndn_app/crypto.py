@@ -1,5 +1,11 @@
 from cryptography.hazmat.primitives import serialization
 from cryptography.hazmat.primitives.asymmetric import rsa, padding
+from cryptography.hazmat.primitives.asymmetric.x25519 import (
+    X25519PrivateKey,
+    X25519PublicKey,
+)
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
 from cryptography.hazmat.primitives import hashes
 from cryptography.exceptions import InvalidSignature
 from cryptography.hazmat.backends import default_backend
@@ -7,6 +13,10 @@ from cryptography import x509
 from cryptography.x509 import load_pem_x509_certificate
 from cryptography.x509.oid import NameOID
 from base64 import b64encode, b64decode
+import binascii
+import os
+
+SESSION_NONCE_SIZE = 12
 
 
 def generate_keys(key_size=2048):
@@ -26,6 +36,22 @@ def b64_public_key(key_object):
     ).decode("utf-8")
 
 
+def public_key_bytes(key_object):
+    """
+    DER encoding of the public key, used by the binary wire format.
+    """
+    return key_object.public_bytes(
+        encoding=serialization.Encoding.DER,
+        format=serialization.PublicFormat.SubjectPublicKeyInfo,
+    )
+
+
+def get_public_key_from_bytes(public_key_bytes):
+    return serialization.load_der_public_key(
+        bytes(public_key_bytes), backend=default_backend()
+    )
+
+
 def str_public_key(key_object):
     return key_object.public_bytes(
         encoding=serialization.Encoding.PEM,
@@ -41,49 +67,59 @@ def str_private_key(key_object):
     ).decode("utf-8")
 
 
-def encrypt_data(data, recipient_public_key):
-    encrypted = recipient_public_key.encrypt(
-        data.encode("utf-8"),
+def encrypt_bytes(data, recipient_public_key):
+    return recipient_public_key.encrypt(
+        bytes(data),
         padding.OAEP(
             mgf=padding.MGF1(algorithm=hashes.SHA256()),
             algorithm=hashes.SHA256(),
             label=None,
         ),
     )
-    return b64encode(encrypted).decode("utf-8")
 
 
-def decrypt_data(private_key, encrypted_data):
+def decrypt_bytes(private_key, encrypted_data):
     try:
-        decrypted = private_key.decrypt(
-            b64decode(encrypted_data),
+        return private_key.decrypt(
+            bytes(encrypted_data),
             padding.OAEP(
                 mgf=padding.MGF1(algorithm=hashes.SHA256()),
                 algorithm=hashes.SHA256(),
                 label=None,
             ),
         )
-        return decrypted.decode("utf-8")
     except Exception:
         return None
 
 
-def sign_data(private_key, data):
-    signature = private_key.sign(
-        data.encode("utf-8"),
+def encrypt_data(data, recipient_public_key):
+    encrypted = encrypt_bytes(data.encode("utf-8"), recipient_public_key)
+    return b64encode(encrypted).decode("utf-8")
+
+
+def decrypt_data(private_key, encrypted_data):
+    try:
+        decrypted = decrypt_bytes(private_key, b64decode(encrypted_data))
+        return decrypted.decode("utf-8") if decrypted is not None else None
+    except Exception:
+        return None
+
+
+def sign_bytes(private_key, data):
+    return private_key.sign(
+        data,
         padding.PSS(
             mgf=padding.MGF1(hashes.SHA256()), salt_length=padding.PSS.MAX_LENGTH
         ),
         hashes.SHA256(),
     )
-    return b64encode(signature).decode("utf-8")
 
 
-def verify_signature(public_key, data, signature):
+def verify_bytes(public_key, data, signature):
     try:
         public_key.verify(
-            b64decode(signature),
-            data.encode("utf-8"),
+            signature,
+            data,
             padding.PSS(
                 mgf=padding.MGF1(hashes.SHA256()), salt_length=padding.PSS.MAX_LENGTH
             ),
@@ -94,16 +130,133 @@ def verify_signature(public_key, data, signature):
         return False
 
 
+def sign_data(private_key, data):
+    signature = sign_bytes(private_key, data.encode("utf-8"))
+    return b64encode(signature).decode("utf-8")
+
+
+def verify_signature(public_key, data, signature):
+    try:
+        signature = b64decode(signature)
+    except (binascii.Error, ValueError):
+        # malformed signature from a peer, rejected like a wrong one
+        return False
+    return verify_bytes(public_key, data.encode("utf-8"), signature)
+
+
 def get_public_key_from_string(public_key_string):
     return serialization.load_pem_public_key(
         b64decode(public_key_string), backend=default_backend()
     )
 
 
-def load_private_key_from_disk(key_path):
+def load_private_key_from_disk(key_path, validate=True):
+    """
+    validate=False skips the RSA consistency checks, which cost as much as generating the key.
+    Only for keys this application wrote itself (key store).
+    """
     with open(key_path, "rb") as file:
         key_data = file.read()
-        private_key = serialization.load_pem_private_key(
-            key_data, password=None, backend=default_backend()
+    if not validate:
+        try:
+            return serialization.load_pem_private_key(
+                key_data, password=None, unsafe_skip_rsa_key_validation=True
+            )
+        except TypeError:
+            # cryptography < 39 has no option to skip them
+            pass
+    return serialization.load_pem_private_key(
+        key_data, password=None, backend=default_backend()
+    )
+
+
+def same_public_key(key, other):
+    """
+    True if two RSA or X25519 public keys are the same key, not only the same object.
+    """
+    if key is other:
+        return True
+    if key is None or other is None:
+        return False
+    if isinstance(key, X25519PublicKey):
+        return isinstance(other, X25519PublicKey) and session_public_key_bytes(
+            key
+        ) == session_public_key_bytes(other)
+    return public_key_bytes(key) == public_key_bytes(other)
+
+
+def generate_session_keys():
+    """
+    Ephemeral X25519 key pair used to agree symmetric session keys with neighbors.
+    """
+    private_key = X25519PrivateKey.generate()
+    return private_key, private_key.public_key()
+
+
+def session_public_key_bytes(key_object):
+    return key_object.public_bytes(
+        encoding=serialization.Encoding.Raw,
+        format=serialization.PublicFormat.Raw,
+    )
+
+
+def get_session_public_key_from_bytes(public_key_bytes):
+    return X25519PublicKey.from_public_bytes(bytes(public_key_bytes))
+
+
+def b64_session_public_key(key_object):
+    return b64encode(session_public_key_bytes(key_object)).decode("utf-8")
+
+
+def get_session_public_key_from_string(public_key_string):
+    return get_session_public_key_from_bytes(b64decode(public_key_string))
+
+
+def derive_session_key(private_key, peer_public_key, info):
+    """
+    X25519 exchange followed by HKDF-SHA256, returns a 256 bit AES-GCM key.
+    """
+    shared_secret = private_key.exchange(peer_public_key)
+    return HKDF(
+        algorithm=hashes.SHA256(),
+        length=32,
+        salt=None,
+        info=info.encode("utf-8"),
+        backend=default_backend(),
+    ).derive(shared_secret)
+
+
+def session_encrypt_bytes(key, data, associated_data):
+    """
+    AES-GCM encrypt, returns nonce + ciphertext.
+    """
+    nonce = os.urandom(SESSION_NONCE_SIZE)
+    return nonce + AESGCM(key).encrypt(nonce, data, associated_data)
+
+
+def session_decrypt_bytes(key, encrypted_data, associated_data):
+    try:
+        return AESGCM(key).decrypt(
+            encrypted_data[:SESSION_NONCE_SIZE],
+            encrypted_data[SESSION_NONCE_SIZE:],
+            associated_data,
         )
-    return private_key
+    except Exception:
+        return None
+
+
+def session_encrypt_data(key, data, associated_data):
+    encrypted = session_encrypt_bytes(
+        key, data.encode("utf-8"), associated_data.encode("utf-8")
+    )
+    return b64encode(encrypted).decode("utf-8")
+
+
+def session_decrypt_data(key, encrypted_data, associated_data):
+    try:
+        decrypted = session_decrypt_bytes(
+            key, b64decode(encrypted_data), associated_data.encode("utf-8")
+        )
+        return decrypted.decode("utf-8") if decrypted is not None else None
+    except Exception:
+        return None
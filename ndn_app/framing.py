@@ -0,0 +1,92 @@
+import struct
+
+# 4 byte big endian payload length in front of every frame
+FRAME_HEADER = struct.Struct("!I")
+
+
+class FrameError(Exception):
+    """
+    Raised when a peer announces a frame bigger than the allowed maximum.
+    """
+
+
+def encode_frame(payload):
+    return FRAME_HEADER.pack(len(payload)) + payload
+
+
+class FrameReader:
+    """
+    Reusable receive buffer for one stream connection.
+
+    Data is read straight into a preallocated bytearray (recv_into) and complete frames are
+    handed out as memoryview slices of it, so no per read concatenation is needed. A frame view
+    is only valid until the next read on the same reader.
+    """
+
+    def __init__(self, max_frame_size, buffer_size=65536) -> None:
+        self.max_frame_size = max_frame_size
+        self.buffer = bytearray(buffer_size)
+        self.view = memoryview(self.buffer)
+        # unconsumed data lives in buffer[start:end]
+        self.start = 0
+        self.end = 0
+
+    def _reserve(self, size):
+        """
+        Make sure a chunk of size bytes fits in the buffer starting at self.start.
+        """
+        pending = self.end - self.start
+        if self.start + size <= len(self.buffer) and self.end < len(self.buffer):
+            return
+
+        if size <= len(self.buffer) and pending < len(self.buffer):
+            # move pending bytes to the front
+            self.buffer[:pending] = self.buffer[self.start : self.end]
+        else:
+            # buffer is exported through memoryviews so it is replaced instead of resized
+            new_buffer = bytearray(max(size, len(self.buffer) * 2))
+            new_buffer[:pending] = self.buffer[self.start : self.end]
+            self.buffer = new_buffer
+            self.view = memoryview(self.buffer)
+        self.start, self.end = 0, pending
+
+    def recv_from(self, connection):
+        """
+        Read once from the socket into the buffer. Returns number of bytes read, 0 on EOF.
+        """
+        if self.end == len(self.buffer):
+            self._reserve(self.end - self.start + 1)
+        received = connection.recv_into(self.view[self.end :])
+        self.end += received
+        return received
+
+    def feed(self, data):
+        """
+        Append already received bytes (for transports which don't read from a socket).
+        """
+        self._reserve(self.end - self.start + len(data))
+        self.buffer[self.end : self.end + len(data)] = data
+        self.end += len(data)
+
+    def frames(self):
+        """
+        Yield all complete frames in the buffer as memoryviews.
+        """
+        header_size = FRAME_HEADER.size
+        while self.end - self.start >= header_size:
+            (length,) = FRAME_HEADER.unpack_from(self.buffer, self.start)
+            if length > self.max_frame_size:
+                raise FrameError(
+                    f"frame of {length} bytes exceeds maximum of {self.max_frame_size}"
+                )
+            if self.end - self.start < header_size + length:
+                # partial frame, make room for the rest of it
+                self._reserve(header_size + length)
+                break
+
+            frame_start = self.start + header_size
+            self.start = frame_start + length
+            yield self.view[frame_start : self.start]
+
+        if self.start == self.end:
+            self.start = self.end = 0
@@ -0,0 +1,99 @@
+from collections import OrderedDict
+
+import hashlib
+import threading
+
+
+class HelloVerificationCache:
+    """
+    Bounded LRU cache of hellos whose signatures were already verified.
+
+    Nodes resend identical hello bytes every round, so the parsed public keys and the
+    verification result are kept under a digest of (signed body, public key, signatures). Only
+    successfully verified hellos are cached. A neighbor has at most one entry: a new verified
+    hello of the same label (rotated session or RSA key) replaces the old one.
+    """
+
+    def __init__(self, max_entries) -> None:
+        self.max_entries = max_entries
+        # digest -> (label, value)
+        self.entries = OrderedDict()
+        # label -> digest of its current entry
+        self.labels = {}
+        self.lock = threading.Lock()
+        self.verify_seconds = 0.0
+        self.counters = {
+            "hit": 0,
+            "miss": 0,
+            "verified": 0,
+            "invalidated": 0,
+            "evicted": 0,
+        }
+
+    def __len__(self):
+        return len(self.entries)
+
+    @staticmethod
+    def digest(*parts):
+        """
+        SHA-256 over length prefixed parts (str or bytes-like).
+        """
+        hasher = hashlib.sha256()
+        for part in parts:
+            if isinstance(part, str):
+                part = part.encode("utf-8")
+            hasher.update(len(part).to_bytes(4, "big"))
+            hasher.update(part)
+        return hasher.digest()
+
+    def lookup(self, digest):
+        with self.lock:
+            entry = self.entries.get(digest)
+            if entry is None:
+                self.counters["miss"] += 1
+                return None
+            self.entries.move_to_end(digest)
+            self.counters["hit"] += 1
+            return entry[1]
+
+    def insert(self, label, digest, value, verify_seconds):
+        """
+        Cache verified hello of label, verify_seconds is the parse and verification time the
+        miss cost.
+        """
+        with self.lock:
+            self.verify_seconds += verify_seconds
+            self.counters["verified"] += 1
+            previous = self.labels.get(label)
+            if previous is not None and previous != digest:
+                self.entries.pop(previous, None)
+                self.counters["invalidated"] += 1
+            self.entries[digest] = (label, value)
+            self.labels[label] = digest
+
+            while len(self.entries) > self.max_entries:
+                evicted_label, _ = self.entries.popitem(last=False)[1]
+                self.labels.pop(evicted_label, None)
+                self.counters["evicted"] += 1
+
+    def invalidate(self, label):
+        """
+        Drop entry of a neighbor, eg. after it was removed from the FIB.
+        """
+        with self.lock:
+            digest = self.labels.pop(label, None)
+            if digest is not None and self.entries.pop(digest, None) is not None:
+                self.counters["invalidated"] += 1
+
+    def stats(self):
+        lookups = self.counters["hit"] + self.counters["miss"]
+        verifications = self.counters["verified"] or 1
+        # every hit saves one average miss
+        saved_ms = self.counters["hit"] * self.verify_seconds / verifications * 1000
+        return dict(
+            self.counters,
+            entries=len(self.entries),
+            hit_ratio=round(self.counters["hit"] / lookups, 4) if lookups else None,
+            verify_ms=round(self.verify_seconds * 1000, 2),
+            saved_ms=round(saved_ms, 2),
+        )
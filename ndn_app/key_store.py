@@ -0,0 +1,94 @@
+import os
+import sys
+import threading
+
+import constants
+import crypto
+
+
+class KeyStore:
+    """
+    RSA node key pairs on disk, one PEM per label (node-<label>.pem), so starting nodes loads
+    keys instead of generating them. Keys are generated and saved the first time a label is
+    asked for, or ahead of time by fill() (optionally in a background thread, generation
+    releases the GIL, so it runs next to the rest of the startup).
+    """
+
+    def __init__(self, path, key_size=2048) -> None:
+        self.path = path
+        self.key_size = key_size
+        # label -> lock held while checking for and generating its key, so a label never gets
+        # two keys while different labels are generated in parallel
+        self.locks = {}
+        self.lock = threading.Lock()
+        self.counters = {"loaded": 0, "generated": 0}
+        self.filler = None
+
+    def key_path(self, label):
+        return os.path.join(self.path, f"node-{label}.pem")
+
+    def _save(self, label, private_key):
+        os.makedirs(self.path, exist_ok=True)
+        path = self.key_path(label)
+        # written next to the final file and renamed, readers never see half a key
+        temporary = f"{path}.{os.getpid()}.tmp"
+        fd = os.open(temporary, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as file:
+            file.write(crypto.str_private_key(private_key))
+        os.replace(temporary, path)
+
+    def _count(self, counter):
+        with self.lock:
+            self.counters[counter] += 1
+
+    def _generate(self, label):
+        with self.lock:
+            label_lock = self.locks.setdefault(label, threading.Lock())
+        with label_lock:
+            if os.path.exists(self.key_path(label)):
+                return None
+            private_key, public_key = crypto.generate_keys(self.key_size)
+            self._save(label, private_key)
+        self._count("generated")
+        return private_key, public_key
+
+    def get(self, label):
+        """
+        (private key, public key) of label, generated and saved if the store has none.
+        """
+        keys = self._generate(label)
+        if keys is not None:
+            return keys
+        private_key = crypto.load_private_key_from_disk(self.key_path(label), validate=False)
+        self._count("loaded")
+        return private_key, private_key.public_key()
+
+    def missing(self, labels):
+        return [label for label in labels if not os.path.exists(self.key_path(label))]
+
+    def fill(self, labels, background=False):
+        """
+        Generate the keys of labels which are not in the store yet. The background thread starts
+        from the last label, so it meets get() calls going through labels in order halfway.
+        """
+        missing = self.missing(labels)
+        if not background:
+            for label in missing:
+                self._generate(label)
+            return
+        if missing:
+            self.filler = threading.Thread(
+                target=self.fill, args=(missing[::-1],), name="key-store-fill", daemon=True
+            )
+            self.filler.start()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Format: python3 key_store.py <num_nodes>")
+        exit(1)
+
+    store = KeyStore(constants.KEY_STORE_PATH)
+    labels = range(int(sys.argv[1]))
+    print(f"Generating {len(store.missing(labels))} node keys in {store.path}/")
+    store.fill(labels)
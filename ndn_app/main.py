@@ -1,10 +1,14 @@
 import os
 from node import Node
-import time
 import constants
+import crypto
 import multiprocessing
 import sys
+import time
+from key_store import KeyStore
+from mgmt import MgmtClient
 from prettytable import PrettyTable
+from sensor_data import shared_faker
 
 
 def clear_screen():
@@ -27,154 +31,274 @@ def show_help():
     table.add_row(["show counters <node>", "Print Node packet Counters"])
     table.add_row(["send interest <node> <data-address>", "Send interest packet"])
     table.add_row(["show key member <node>", "Print member private key"])
-    table.add_row(["show key gateway <node>", "Print member private key"])
-    table.add_row(["show key priv <node>", "Print node public key"])
-    table.add_row(["show key pub <node>", "Print node private key"])
-    table.add_row(["show packets <node>", "Print last 10 packets"])
+    table.add_row(["show key gateway <node>", "Print gateway private key"])
+    table.add_row(["show key priv <node>", "Print node private key"])
+    table.add_row(["show key pub <node>", "Print node public key"])
+    table.add_row(["show packets <node>", "Print captured packets"])
     table.add_row(["show knn <node>", "Print k-nearest"])
+    table.add_row(["show routes <node>", "Print link state routes"])
     table.add_row(["show state <node>", "Print current state of node"])
-    table.add_row(["show gateway", "Print current state of node"])
+    table.add_row(["show gateway", "Print gateway state"])
     table.add_row(["pause <node>", "Pause node"])
     table.add_row(["unpause <node>", "Unpause node"])
     print("\nSUPPORTED COMMANDS\n")
+    print("<node> can be 'all' to run the command on every node of this Pi.\n")
     print(table, "\n")
 
 
-def parse_input_prefix2(prefix, user_input, nodes):
-    try:
-        user_input = user_input.replace(prefix, "")
-        label, data_address = user_input.split(" ")[:2]
-        label = int(label)
-        if label in nodes:
-            return label, data_address
-        else:
-            print(f"Node {label} not found on this Pi!")
-            return None, None
-    except:
-        print("Invalid input!")
-        return None, None
-
-
-def parse_input_prefix(prefix, user_input, nodes):
-    try:
-        label = int(user_input.replace(prefix, ""))
-        if label in nodes:
-            return label
+def parse_label(label, nodes):
+    """
+    Node label from user input, None for 'all'. Raises ValueError for unknown nodes.
+    """
+    if label == "all":
+        return None
+    label = int(label)
+    if label not in nodes:
+        raise ValueError(f"Node {label} not found on this Pi!")
+    return label
+
+
+def counter_table(name, counters):
+    table = PrettyTable()
+    table.field_names = [name, "Count"]
+    table.align[name] = "l"
+    table.align["Count"] = "l"
+    for counter, value in counters.items():
+        table.add_row([counter.upper(), value])
+    return table
+
+
+def print_fib(fib):
+    table = PrettyTable()
+    table.field_names = ["Label", "TCP IP", "TCP Port", "Link"]
+    for row in fib:
+        table.add_row([row["label"], row["ip"], row["port"], row["link"]])
+    print("FIB")
+    print(table)
+
+
+def print_pit(pit):
+    table = PrettyTable()
+    table.field_names = ["Label", "Data address", "Request ID", "Retry"]
+    for row in pit:
+        table.add_row(
+            [row["label"], row["data_address"], row["request_id"], row["retry_index"]]
+        )
+    print("PIT")
+    print(table)
+
+
+def print_routes(routes):
+    table = PrettyTable()
+    table.field_names = ["Origin", "Distance", "Next hops", "Prefixes"]
+    for row in routes:
+        table.add_row(
+            [
+                row["origin"],
+                "-" if row["distance"] is None else row["distance"],
+                ", ".join(str(label) for label in row["next_hops"]),
+                ", ".join(row["prefixes"]),
+            ]
+        )
+    print("ROUTES")
+    print(table)
+
+
+def print_counters(counters):
+    print("INPUT")
+    print(counter_table("Packet", counters["in"]))
+    print("\nOUTPUT")
+    print(counter_table("Packet", counters["out"]))
+    print("\nTRANSPORT")
+    print(counter_table("Transport", counters["transport"]))
+    print("\nCONTENT STORE")
+    print(counter_table("Content Store", counters["content_store"]))
+
+
+def print_knn(knn):
+    table = PrettyTable()
+    table.field_names = ["Label", "TCP IP", "TCP Port"]
+    for row in knn:
+        table.add_row([row["label"], row["ip"], row["port"]])
+    print("KNN")
+    print(table)
+
+
+def print_packets(packets):
+    print(f"LAST {len(packets)} captured packets")
+    for packet in packets:
+        peer = "from" if packet["direction"] == "in" else "to"
+        print(
+            f"\n[{packet['direction'].upper()} {packet['type'].upper()}] {peer} "
+            f"{packet['neighbor']} {packet['name']} request {packet['request_id']} "
+            f"retry {packet['retry_index']}, plain {packet['plain_size']} B, "
+            f"wire {packet['wire_size']} B"
+        )
+        print(f"PLAIN: {packet['plain']}")
+        if packet["wire"] is not None:
+            print(f"WIRE: {packet['wire']}")
+
+
+def print_gateway(gateway):
+    print(f"Gateway = {gateway['gateway']}, peer = {gateway['peer_connection']}")
+
+
+def printer(title):
+    def print_result(result):
+        print(title)
+        print(result)
+
+    return print_result
+
+
+# command prefix -> (mgmt call, result printer)
+COMMANDS = {
+    "show fib ": ("fib", print_fib),
+    "show pit ": ("pit", print_pit),
+    "show knn ": ("knn", print_knn),
+    "show routes ": ("routes", print_routes),
+    "show counters ": ("counters", print_counters),
+    "show packets ": ("packets", print_packets),
+    "show key member ": ("member_private_key", printer("MEMBERSHIP KEY")),
+    "show key gateway ": ("gateway_private_key", printer("GATEWAY KEY")),
+    "show key priv ": ("private_key", printer("NODE PRIVATE KEY")),
+    "show key pub ": ("public_key", printer("NODE PUBLIC KEY")),
+    "unpause ": ("start_comms", lambda enabled: print(f"Comms enabled = {enabled}")),
+    "pause ": ("stop_comms", lambda enabled: print(f"Comms enabled = {enabled}")),
+    "show state ": ("comms", lambda enabled: print(f"State = {enabled}")),
+}
+
+
+def run_command(client, label, call, args, print_result):
+    """
+    Run call on one node (or all for label None) and print results per node.
+    """
+    results, errors = client.broadcast(
+        call, *args, labels=None if label is None else [label]
+    )
+    for node_label in sorted(set(results) | set(errors)):
+        print(f"\n[Node {node_label}]")
+        if node_label in errors:
+            print(f"Error: {errors[node_label]}")
         else:
-            print(f"Node {label} not found on this Pi!")
-    except:
-        print("Invalid input!")
+            print_result(results[node_label])
+
+
+def create_nodes(labels, transport, replies):
+    """
+    Build the nodes of labels. Shared keys and Faker are loaded once here and inherited by the
+    node processes, node keys come from the key store. Returns the nodes and the seconds spent
+    in every startup phase.
+    """
+    timings = {}
+    started = time.perf_counter()
+    member_private_key = crypto.load_private_key_from_disk(constants.MEMBER_KEY_PATH)
+    gateway_private_key = None
+    if constants.GW_NODE_LABEL in labels:
+        gateway_private_key = crypto.load_private_key_from_disk(constants.GW_KEY)
+    shared_faker()
+    timings["shared resources"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    node_keys = {label: None for label in labels}
+    if constants.KEY_STORE:
+        key_store = KeyStore(constants.KEY_STORE_PATH)
+        # missing keys are generated from both ends, here and in the background
+        key_store.fill(labels, background=True)
+        node_keys = {label: key_store.get(label) for label in labels}
+        # don't fork while it is still generating a key
+        if key_store.filler is not None:
+            key_store.filler.join()
+    timings["node keys"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    nodes = {}
+    for i in labels:
+        mgmt = multiprocessing.Queue(maxsize=constants.MGMT_QUEUE_SIZE)
+        gw = True if i == constants.GW_NODE_LABEL else False
+
+        nodes[i] = Node(
+            constants.NODES[i]["xy"][0],
+            constants.NODES[i]["xy"][1],
+            i,
+            f"/data/{i}/",
+            constants.NODES[i]["server_ip"],
+            constants.NODES[i]["server_port"],
+            constants.NODES,
+            constants.MINIMUM_NEIGHBORS,
+            constants.HELLO_DELAY,
+            mgmt,
+            constants.MEMBER_KEY_PATH,
+            gw,
+            constants.GW_KEY,
+            constants.GW_DETAILS,
+            transport=transport
+            or constants.NODES[i].get("transport", constants.TRANSPORT),
+            mgmt_replies=replies,
+            node_keys=node_keys[i],
+            member_private_key=member_private_key,
+            gateway_private_key=gateway_private_key,
+        )
+    timings["build nodes"] = time.perf_counter() - started
+    return nodes, timings
 
 
-def loop(nodes):
+def print_startup(timings):
+    table = PrettyTable()
+    table.field_names = ["Startup phase", "ms"]
+    table.align["Startup phase"] = "l"
+    table.align["ms"] = "r"
+    for phase, seconds in timings.items():
+        table.add_row([phase, f"{seconds * 1000:.1f}"])
+    table.add_row(["total", f"{sum(timings.values()) * 1000:.1f}"])
+    print(table)
+
+
+def loop(nodes, client):
     user_input = ""
     while user_input != "exit":
-        sleep_duration = 1
-
         try:
             user_input = input("> ")
 
             if user_input == "clear":
                 clear_screen()
-                sleep_duration = 0
 
-            if user_input == "help":
+            elif user_input == "help":
                 show_help()
-                sleep_duration = 0
 
             elif user_input == "show all nodes":
                 print()
                 for node in nodes:
                     print(node, end=" ")
                 print()
-                sleep_duration = 0
 
             elif user_input == "show gateway":
                 if constants.GW_NODE_LABEL in nodes:
-                    nodes[constants.GW_NODE_LABEL].mgmt.put(
-                        {"call": "print_gateway", "args": ()}
+                    run_command(
+                        client, constants.GW_NODE_LABEL, "gateway", (), print_gateway
                     )
                 else:
                     print("Gateway is not running on this Pi!")
 
-            elif "show fib " in user_input:
-                label = parse_input_prefix("show fib ", user_input, nodes)
-                if label != None:
-                    nodes[label].mgmt.put({"call": "print_fib", "args": ()})
-
-            elif "show pit " in user_input:
-                label = parse_input_prefix("show pit ", user_input, nodes)
-                if label != None:
-                    nodes[label].mgmt.put({"call": "print_pit", "args": ()})
-
-            elif "show knn " in user_input:
-                label = parse_input_prefix("show knn ", user_input, nodes)
-                if label != None:
-                    nodes[label].mgmt.put({"call": "print_knn", "args": ()})
-
-            elif "show counters " in user_input:
-                label = parse_input_prefix("show counters ", user_input, nodes)
-                if label != None:
-                    nodes[label].mgmt.put({"call": "print_counters", "args": ()})
-
-            elif "show packets " in user_input:
-                label = parse_input_prefix("show packets ", user_input, nodes)
-                if label != None:
-                    nodes[label].mgmt.put({"call": "print_last_10", "args": ()})
-                    sleep_duration = 1
-
-            elif "show key member " in user_input:
-                label = parse_input_prefix("show key member ", user_input, nodes)
-                if label != None:
-                    nodes[label].mgmt.put(
-                        {"call": "print_member_private_key", "args": ()}
-                    )
-
-            elif "show key gateway " in user_input:
-                label = parse_input_prefix("show key gateway ", user_input, nodes)
-                if label != None:
-                    nodes[label].mgmt.put(
-                        {"call": "print_gateway_private_key", "args": ()}
-                    )
-
-            elif "show key priv " in user_input:
-                label = parse_input_prefix("show key priv ", user_input, nodes)
-                if label != None:
-                    nodes[label].mgmt.put({"call": "print_private_key", "args": ()})
-
-            elif "show key pub " in user_input:
-                label = parse_input_prefix("show key pub ", user_input, nodes)
-                if label != None:
-                    nodes[label].mgmt.put({"call": "print_public_key", "args": ()})
-
-            elif "unpause " in user_input:
-                label = parse_input_prefix("unpause ", user_input, nodes)
-                if label != None:
-                    nodes[label].mgmt.put({"call": "start_comms", "args": ()})
-            
-            elif "pause " in user_input:
-                label = parse_input_prefix("pause ", user_input, nodes)
-                if label != None:
-                    nodes[label].mgmt.put({"call": "stop_comms", "args": ()})
-
-            elif "show state " in user_input:
-                label = parse_input_prefix("show state ", user_input, nodes)
-                if label != None:
-                    nodes[label].mgmt.put({"call": "print_state", "args": ()})
-
-            elif "send interest " in user_input:
-                label, data_address = parse_input_prefix2(
-                    "send interest ", user_input, nodes
+            elif user_input.startswith("send interest "):
+                label, data_address = user_input[len("send interest ") :].split(" ")[:2]
+                run_command(
+                    client,
+                    parse_label(label, nodes),
+                    "send_interest",
+                    (data_address, 0),
+                    lambda request_id: print(f"Interest sent, request ID {request_id}"),
                 )
-                if label != None:
-                    nodes[label].mgmt.put(
-                        {"call": "send_interest_packet", "args": (data_address, 1)}
-                    )
-                    sleep_duration = 2
-            else:
-                sleep_duration = 0
 
-            time.sleep(sleep_duration)
+            else:
+                for prefix, (call, print_result) in COMMANDS.items():
+                    if user_input.startswith(prefix):
+                        label = parse_label(user_input[len(prefix) :], nodes)
+                        run_command(client, label, call, (), print_result)
+                        break
+
+        except ValueError as error:
+            print(error if "Pi" in str(error) else "Invalid input!")
         except KeyboardInterrupt:
             ...
 
@@ -187,41 +311,33 @@ if __name__ == "__main__":
     args = sys.argv
 
     if len(args) < 2:
-        print("Format: python3 main.py <rpi>")
+        print("Format: python3 main.py <rpi> [tcp|udp]")
         exit(1)
 
     rpi = int(args[1])
+    transport = args[2] if len(args) > 2 else None
 
     if rpi == 1:
         start, end = 0, constants.NUM_NODES // 2
     elif rpi == 2:
         start, end = constants.NUM_NODES // 2, constants.NUM_NODES
 
-    nodes = {}
+    # replies to management calls of all nodes
+    replies = multiprocessing.Queue()
+    nodes, timings = create_nodes(range(start, end), transport, replies)
 
-    for i in range(start, end):
-        mgmt = multiprocessing.Queue(maxsize=2)
-        gw = True if i == constants.GW_NODE_LABEL else False
-
-        node = Node(
-            constants.NODES[i]["xy"][0],
-            constants.NODES[i]["xy"][1],
-            i,
-            f"/data/{i}/",
-            constants.NODES[i]["server_ip"],
-            constants.NODES[i]["server_port"],
-            constants.NODES,
-            constants.MINIMUM_NEIGHBORS,
-            constants.HELLO_DELAY,
-            mgmt,
-            constants.MEMBER_KEY_PATH,
-            gw,
-            constants.GW_KEY,
-            constants.GW_DETAILS,
-        )
-        nodes[i] = node
+    started = time.perf_counter()
+    for node in nodes.values():
         node.start()
+    timings["start processes"] = time.perf_counter() - started
+    print_startup(timings)
+
+    client = MgmtClient(
+        {label: node.mgmt for label, node in nodes.items()},
+        replies,
+        constants.MGMT_TIMEOUT,
+    )
 
     print("\nWelcome to Medical Sensor Network - NDN.\n")
     show_help()
-    loop(nodes)
+    loop(nodes, client)
@@ -0,0 +1,145 @@
+import bisect
+import time
+
+# histogram metric names
+STAGE_SECONDS = "ndn_stage_seconds"
+SEND_SECONDS = "ndn_send_seconds"
+RTT_SECONDS = "ndn_rtt_seconds"
+
+
+class Histogram:
+    """
+    Fixed bucket histogram, counts[i] holds the observations <= bounds[i] (and > bounds[i - 1]),
+    the last count the observations above all bounds.
+    """
+
+    __slots__ = ("bounds", "counts", "count", "sum")
+
+    def __init__(self, bounds) -> None:
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+
+class _Timer:
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram) -> None:
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.start)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+NULL_TIMER = _NullTimer()
+
+
+class Metrics:
+    """
+    Latency histograms by metric name and labels, eg.
+    ("ndn_stage_seconds", (("stage", "decode"), ("packet", "interest"))).
+
+    Histograms are created on first use with the bounds of their metric name. When disabled,
+    observe returns right away and time returns a shared no-op context manager, so the
+    instrumented code paths only pay for one call.
+    """
+
+    def __init__(self, enabled, bounds) -> None:
+        self.enabled = enabled
+        # metric name -> bucket upper bounds in seconds
+        self.bounds = bounds
+        self.histograms = {}
+
+    def _histogram(self, name, labels):
+        histogram = self.histograms.get((name, labels))
+        if histogram is None:
+            histogram = self.histograms[(name, labels)] = Histogram(self.bounds[name])
+        return histogram
+
+    def observe(self, name, labels, seconds):
+        if self.enabled:
+            self._histogram(name, labels).observe(seconds)
+
+    def time(self, name, labels):
+        """
+        Context manager observing the time spent in its block.
+        """
+        if not self.enabled:
+            return NULL_TIMER
+        return _Timer(self._histogram(name, labels))
+
+    def stats(self):
+        """
+        {name: {"bounds": [...], "series": {key: {"labels", "count", "sum", "buckets"}}}} with
+        per bucket (not cumulative) counts.
+        """
+        stats = {}
+        for (name, labels), histogram in list(self.histograms.items()):
+            metric = stats.setdefault(name, {"bounds": self.bounds[name], "series": {}})
+            metric["series"]["|".join(value for _, value in labels)] = {
+                "labels": dict(labels),
+                "count": histogram.count,
+                "sum": round(histogram.sum, 6),
+                "buckets": list(histogram.counts),
+            }
+        return stats
+
+
+# for components created before the metrics of their node are known
+DISABLED = Metrics(False, {})
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_string(labels):
+    return ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items())
+
+
+def render_prometheus(sources):
+    """
+    Prometheus text exposition of Metrics.stats() outputs. sources are (labels, stats) pairs,
+    labels (eg. the node label) are added to every series of the stats.
+    """
+    families = {}
+    for extra_labels, metrics_stats in sources:
+        for name, metric in metrics_stats.items():
+            families.setdefault(name, []).append((extra_labels, metric))
+
+    lines = []
+    for name, entries in families.items():
+        lines.append(f"# TYPE {name} histogram")
+        for extra_labels, metric in entries:
+            bounds = [str(bound) for bound in metric["bounds"]] + ["+Inf"]
+            for series in metric["series"].values():
+                labels = _label_string(dict(extra_labels, **series["labels"]))
+                separator = "," if labels else ""
+                cumulative = 0
+                for bound, count in zip(bounds, series["buckets"]):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{{labels}{separator}le="{bound}"}} {cumulative}')
+                lines.append(f"{name}_sum{{{labels}}} {series['sum']}")
+                lines.append(f"{name}_count{{{labels}}} {series['count']}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,92 @@
+import itertools
+import queue
+import time
+
+
+class MgmtTimeout(Exception):
+    """
+    Raised when a node didn't answer a management call in time.
+    """
+
+
+class MgmtError(Exception):
+    """
+    Raised when a management call failed on the node, carries the node's error message.
+    """
+
+
+class MgmtClient:
+    """
+    Request/response management API for local nodes.
+
+    Requests {"id", "call", "args"} are put on the mgmt queue of each node, nodes answer with
+    {"id", "label", "result"} or {"id", "label", "error"} on the shared replies queue. Replies to
+    calls which already timed out are dropped.
+    """
+
+    def __init__(self, queues, replies, timeout) -> None:
+        # node label -> mgmt queue of the node
+        self.queues = queues
+        self.replies = replies
+        self.timeout = timeout
+        self.request_ids = itertools.count()
+
+    def _send(self, label, call, args, deadline):
+        request_id = next(self.request_ids)
+        self.queues[label].put(
+            {"id": request_id, "call": call, "args": args},
+            timeout=max(deadline - time.monotonic(), 0.001),
+        )
+        return request_id
+
+    def _collect(self, pending, deadline):
+        """
+        Read replies until all pending request IDs (id -> label) are answered or the deadline
+        passed. Returns {label: reply}.
+        """
+        replies = {}
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                reply = self.replies.get(timeout=remaining)
+            except queue.Empty:
+                break
+            label = pending.pop(reply["id"], None)
+            if label is not None:
+                replies[label] = reply
+        return replies
+
+    def call(self, label, call, *args, timeout=None):
+        """
+        Run call on one node and return its result.
+        """
+        results, errors = self.broadcast(call, *args, labels=[label], timeout=timeout)
+        if label in errors:
+            raise errors[label]
+        return results[label]
+
+    def broadcast(self, call, *args, labels=None, timeout=None):
+        """
+        Run call on all (or the given) nodes concurrently. Returns (results, errors), both keyed
+        by node label, errors holds MgmtTimeout / MgmtError exceptions.
+        """
+        labels = list(self.queues) if labels is None else labels
+        deadline = time.monotonic() + (self.timeout if timeout is None else timeout)
+        pending, errors = {}, {}
+        for label in labels:
+            try:
+                pending[self._send(label, call, args, deadline)] = label
+            except queue.Full:
+                errors[label] = MgmtTimeout(f"mgmt queue of node {label} is full")
+
+        results = {}
+        for label, reply in self._collect(pending, deadline).items():
+            if "error" in reply:
+                errors[label] = MgmtError(reply["error"])
+            else:
+                results[label] = reply["result"]
+        for label in pending.values():
+            errors[label] = MgmtTimeout(f"node {label} didn't answer {call}")
+        return results, errors
@@ -0,0 +1,208 @@
+import csv
+import random
+from math import sqrt
+
+
+class RandomWaypoint:
+    """
+    Random waypoint mobility: every node walks to a random point of the grid with a random
+    speed, pauses there and picks the next one. Each node draws from its own generator seeded
+    with (seed, label), so positions only depend on the time and every process computes the
+    same ones.
+    """
+
+    def __init__(self, nodes, grid, speed, pause, seed, mobile=None) -> None:
+        self.grid = grid
+        self.speed = speed
+        self.pause = pause
+        # label -> [start time, start xy, end time, end xy, pause until]
+        self.legs = {}
+        self.generators = {}
+        for label, node in nodes.items():
+            if mobile is not None and label not in mobile:
+                continue
+            self.generators[label] = random.Random(f"{seed}:{label}")
+            xy = node["xy"]
+            self.legs[label] = [0.0, xy, 0.0, xy, 0.0]
+        self.last = {}
+
+    def _next_leg(self, label, leg):
+        generator = self.generators[label]
+        start_time, start = leg[4], leg[3]
+        end = (generator.uniform(0, self.grid[0]), generator.uniform(0, self.grid[1]))
+        distance = sqrt((end[0] - start[0]) ** 2 + (end[1] - start[1]) ** 2)
+        end_time = start_time + distance / generator.uniform(*self.speed)
+        leg[:] = [start_time, start, end_time, end, end_time + generator.uniform(0, self.pause)]
+
+    def position(self, label, now):
+        leg = self.legs[label]
+        while now >= leg[4]:
+            self._next_leg(label, leg)
+        start_time, start, end_time, end, _ = leg
+        if now >= end_time:
+            return end
+        progress = (now - start_time) / (end_time - start_time)
+        return (
+            start[0] + (end[0] - start[0]) * progress,
+            start[1] + (end[1] - start[1]) * progress,
+        )
+
+    def positions(self, now):
+        """
+        {label: xy} of the nodes which moved since the last call.
+        """
+        moved = {}
+        for label in self.legs:
+            xy = self.position(label, now)
+            if xy != self.last.get(label):
+                moved[label] = self.last[label] = xy
+        return moved
+
+
+class TraceMobility:
+    """
+    Positions replayed from a CSV trace with rows "time,label,x,y" sorted by time (seconds since
+    start). Nodes jump to the position of their latest row.
+    """
+
+    def __init__(self, path) -> None:
+        with open(path, newline="") as file:
+            self.rows = [
+                (float(row[0]), int(row[1]), (float(row[2]), float(row[3])))
+                for row in csv.reader(file)
+                if row and not row[0].startswith("#")
+            ]
+        self.next_row = 0
+
+    def positions(self, now):
+        moved = {}
+        while self.next_row < len(self.rows) and self.rows[self.next_row][0] <= now:
+            _, label, xy = self.rows[self.next_row]
+            moved[label] = xy
+            self.next_row += 1
+        return moved
+
+
+def create_mobility(model, nodes, grid, speed, pause, seed):
+    """
+    Mobility model for constants.MOBILITY: None, "random_waypoint" or the path of a trace.
+    """
+    if model is None:
+        return None
+    if model == "random_waypoint":
+        return RandomWaypoint(nodes, grid, speed, pause, seed)
+    return TraceMobility(model)
+
+
+class NeighborTracker:
+    """
+    k nearest neighbors of every node, kept up to date while nodes move.
+
+    Every node watches the grid cells its k-th neighbor circle overlaps. After a movement tick
+    only these nodes are recomputed: the ones which moved, the ones with a moved node among their
+    k nearest and the watchers of the cells moved nodes arrived in whose circle now contains one.
+    The result is the same as recomputing all nodes.
+    """
+
+    def __init__(self, index, k) -> None:
+        self.index = index
+        self.k = k
+        # label -> k nearest labels / labels which have label among their k nearest
+        self.nearest = {}
+        self.reverse = {label: set() for label in index.points}
+        # label -> distance of the k-th neighbor (None: less than k other nodes)
+        self.radius = {}
+        # cell -> labels watching it, label -> watched cell range, labels watching everything
+        self.watchers = {}
+        self.watched = {}
+        self.unbounded = set()
+        self.counters = {"ticks": 0, "moves": 0, "cell_changes": 0, "recomputed": 0, "changed": 0}
+        for label in index.points:
+            self._recompute(label)
+
+    def _recompute(self, label):
+        """
+        Recompute k nearest of label, returns the labels which are new among them.
+        """
+        xy = self.index.points[label]
+        nearest = self.index.nearest(xy, self.k, exclude=(label,))
+        labels = [neighbor for neighbor, _ in nearest]
+        old_labels = self.nearest.get(label, [])
+        added = ()
+        if labels != old_labels:
+            for neighbor in set(old_labels) - set(labels):
+                self.reverse[neighbor].discard(label)
+            added = set(labels) - set(old_labels)
+            for neighbor in added:
+                self.reverse[neighbor].add(label)
+            self.nearest[label] = labels
+
+        if len(labels) < self.k:
+            self.radius[label] = None
+            self.unbounded.add(label)
+            self._watch(label, None)
+        else:
+            radius = self.radius[label] = nearest[-1][1]
+            self.unbounded.discard(label)
+            self._watch(
+                label,
+                (
+                    self.index.cell((xy[0] - radius, xy[1] - radius)),
+                    self.index.cell((xy[0] + radius, xy[1] + radius)),
+                ),
+            )
+        self.counters["recomputed"] += 1
+        return added
+
+    def _watch(self, label, corners):
+        """
+        Register label on the cells between corners (min cell, max cell), which cover its k-th
+        neighbor circle. Only re-registered if the range changed.
+        """
+        old_corners = self.watched.get(label)
+        if old_corners == corners:
+            return
+        for cell in self._cells(old_corners):
+            watchers = self.watchers[cell]
+            watchers.discard(label)
+            if not watchers:
+                del self.watchers[cell]
+        for cell in self._cells(corners):
+            self.watchers.setdefault(cell, set()).add(label)
+        self.watched[label] = corners
+
+    @staticmethod
+    def _cells(corners):
+        if corners is None:
+            return ()
+        (min_x, min_y), (max_x, max_y) = corners
+        return [(x, y) for x in range(min_x, max_x + 1) for y in range(min_y, max_y + 1)]
+
+    def update(self, moves):
+        """
+        Move nodes ({label: xy}) and recompute the affected ones. Returns {label: new k nearest
+        labels} of the nodes whose neighbor set changed.
+        """
+        self.counters["ticks"] += 1
+        self.counters["moves"] += len(moves)
+        affected = set(moves)
+        for label, xy in moves.items():
+            if self.index.move(label, xy):
+                self.counters["cell_changes"] += 1
+            affected |= self.reverse[label]
+        for label, (x, y) in moves.items():
+            for watcher in self.watchers.get(self.index.cell((x, y)), ()):
+                if watcher in affected:
+                    continue
+                watcher_x, watcher_y = self.index.points[watcher]
+                if sqrt((x - watcher_x) ** 2 + (y - watcher_y) ** 2) <= self.radius[watcher]:
+                    affected.add(watcher)
+        affected |= self.unbounded
+
+        changed = {}
+        for label in affected:
+            added = self._recompute(label)
+            if added:
+                changed[label] = added
+        self.counters["changed"] += len(changed)
+        return changed
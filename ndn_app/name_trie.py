@@ -0,0 +1,113 @@
+def split_name(name):
+    """
+    "/data/3/heartrate/ecg" -> ("data", "3", "heartrate", "ecg"). Tuples are passed through.
+    """
+    if isinstance(name, tuple):
+        return name
+    return tuple(component for component in name.split("/") if component)
+
+
+def join_name(components):
+    return "/".join(components)
+
+
+class NameTrie:
+    """
+    Index of NDN names by component. Supports exact match and component-wise longest prefix
+    match, so "/data/1/" matches "/data/1/heartrate" but not "/data/11/heartrate".
+    """
+
+    class TrieNode:
+        __slots__ = ("children", "value", "has_value")
+
+        def __init__(self):
+            self.children = {}
+            self.value = None
+            self.has_value = False
+
+    def __init__(self) -> None:
+        self.root = self.TrieNode()
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def __contains__(self, name):
+        return self._find(split_name(name)) is not None
+
+    def _find(self, components):
+        node = self.root
+        for component in components:
+            node = node.children.get(component)
+            if node is None:
+                return None
+        return node if node.has_value else None
+
+    def insert(self, name, value):
+        node = self.root
+        for component in split_name(name):
+            child = node.children.get(component)
+            if child is None:
+                child = node.children[component] = self.TrieNode()
+            node = child
+        if not node.has_value:
+            self.size += 1
+        node.value = value
+        node.has_value = True
+
+    def remove(self, name):
+        """
+        Remove name, prune branches which became empty. Returns False if name wasn't present.
+        """
+        path = [self.root]
+        components = split_name(name)
+        for component in components:
+            node = path[-1].children.get(component)
+            if node is None:
+                return False
+            path.append(node)
+        if not path[-1].has_value:
+            return False
+
+        path[-1].value = None
+        path[-1].has_value = False
+        self.size -= 1
+        for depth in range(len(components), 0, -1):
+            node = path[depth]
+            if node.has_value or node.children:
+                break
+            del path[depth - 1].children[components[depth - 1]]
+        return True
+
+    def exact_match(self, name, default=None):
+        node = self._find(split_name(name))
+        return node.value if node else default
+
+    def longest_prefix_match(self, name):
+        """
+        Returns (prefix components, value) of the longest registered prefix of name, or None.
+        """
+        components = split_name(name)
+        node = self.root
+        match = (0, node) if node.has_value else None
+        for depth, component in enumerate(components, 1):
+            node = node.children.get(component)
+            if node is None:
+                break
+            if node.has_value:
+                match = (depth, node)
+        if match is None:
+            return None
+        return components[: match[0]], match[1].value
+
+    def items(self):
+        """
+        Yield (name components, value) for all registered names.
+        """
+        stack = [((), self.root)]
+        while stack:
+            components, node = stack.pop()
+            if node.has_value:
+                yield components, node.value
+            for component, child in node.children.items():
+                stack.append((components + (component,), child))
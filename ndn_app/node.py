@@ -1,11 +1,25 @@
-from collections import deque
+from async_comm import AsyncSocketCommunication
+from capture import PacketCapture
+from connection_pool import ConnectionPool
+from content_store import ContentStore
 from copy import copy
-from math import sqrt
+from framing import FrameError, FrameReader, encode_frame
+from hello_cache import HelloVerificationCache
+from mobility import NeighborTracker, create_mobility
+from name_trie import NameTrie, join_name, split_name
+from routing import LSA, LinkStateRouting
+from rtt_estimator import RttEstimator
+from scheduler import Scheduler
+from spatial_index import GridIndex
+from state_export import StateExporter
 from sensor_data import MedicalSensorSystem
+from timer_wheel import TimerWheel
+from udp_comm import UDPCommunication
 
-import json
+import asyncio
 import multiprocessing
 import os
+import queue
 import random
 import socket
 import threading
@@ -14,7 +28,41 @@ import constants
 import re
 import string
 import crypto
-import prettytable
+import metrics
+import tlv
+
+
+PACKET_NAMES = {
+    constants.HELLO_ID: "hello",
+    constants.HELLO_ACK_ID: "hello_ack",
+    constants.DATA_ID: "data",
+    constants.INTEREST_ID: "interest",
+    constants.LSA_ID: "lsa",
+}
+
+
+def encode_encrypted_tlv(packet_id, label, payload, public_key):
+    """
+    TLV packet with RSA encrypted payload: [LABEL][PAYLOAD]
+    """
+    return tlv.encode_packet(
+        packet_id,
+        ((tlv.LABEL, label), (tlv.PAYLOAD, crypto.encrypt_bytes(payload, public_key))),
+    )
+
+
+def encode_session_encrypted_tlv(packet_id, label, payload, key_id, session_key):
+    """
+    TLV packet with session key encrypted payload: [LABEL][KEY_ID][PAYLOAD], the header is
+    authenticated as associated data.
+    """
+    encrypted_payload = crypto.session_encrypt_bytes(
+        session_key, payload, tlv.session_associated_data(packet_id, label, key_id)
+    )
+    return tlv.encode_packet(
+        packet_id,
+        ((tlv.LABEL, label), (tlv.KEY_ID, key_id), (tlv.PAYLOAD, encrypted_payload)),
+    )
 
 
 class InterestMessage:
@@ -35,17 +83,64 @@ class InterestMessage:
         )
         return f"{header}[{encrypted_payload}]"
 
+    def get_session_encrypted_string(self, key_id, session_key):
+        header = f"[2][{self.label}][{key_id}]"
+        encrypted_payload = crypto.session_encrypt_data(
+            session_key,
+            f"[{self.data_address}][{self.request_id}][{self.retry_index}]",
+            header,
+        )
+        return f"{header}[{encrypted_payload}]"
+
+    def _tlv_payload(self):
+        return tlv.encode_elements(
+            (
+                (tlv.NAME, self.data_address),
+                (tlv.REQUEST_ID, self.request_id),
+                (tlv.RETRY_INDEX, self.retry_index),
+            )
+        )
+
+    def get_encrypted_bytes(self, public_key):
+        return encode_encrypted_tlv(
+            constants.INTEREST_ID, self.label, self._tlv_payload(), public_key
+        )
+
+    def get_session_encrypted_bytes(self, key_id, session_key):
+        return encode_session_encrypted_tlv(
+            constants.INTEREST_ID, self.label, self._tlv_payload(), key_id, session_key
+        )
+
     def get_string(self):
         return f"[2][{self.label}][{self.data_address}][{self.request_id}][{self.retry_index}]"
 
 
 class HelloMessage:
     """
-    Class for HELLO, its source label and the issued certificate
+    Class for HELLO, its source label and the issued certificate.
+
+    When session keys are enabled the signed body also carries the X25519 session public key
+    and its epoch: [label][ip][port][cert][epoch:session_key]
+
+    Supported binary wire versions are announced after the last field (<tlv:1>), outside the
+    brackets so nodes which only know the text format ignore them.
+
+    Own hellos are sent with get_packet, which serializes each variant once and reuses the bytes
+    until an announced field changes.
     """
 
     def __init__(
-        self, label, ip, port, cert, public_key=None, sign=None, member_sign=None
+        self,
+        label,
+        ip,
+        port,
+        cert,
+        public_key=None,
+        sign=None,
+        member_sign=None,
+        session_epoch=None,
+        session_public_key=None,
+        wire_versions=(),
     ):
         self.certificate = cert
         self.label = label
@@ -54,12 +149,73 @@ class HelloMessage:
         self.public_key = public_key
         self.sign = sign
         self.member_sign = member_sign
+        self.session_epoch = session_epoch
+        self.session_public_key = session_public_key
+        self.wire_versions = wire_versions
+        # signatures over the TLV body
+        self.tlv_sign = None
+        self.tlv_member_sign = None
+        # serialized packets by (ack, tlv) and the announced fields they were built from
+        self.packets = {}
+        self.packets_fingerprint = None
+
+    def set_session_key(self, session_epoch, session_public_key):
+        self.session_epoch = session_epoch
+        self.session_public_key = session_public_key
+        # body changed, signatures have to be regenerated
+        self.sign = None
+        self.member_sign = None
+        self.tlv_sign = None
+        self.tlv_member_sign = None
+
+    def _fingerprint(self):
+        return (
+            self.label,
+            self.ip,
+            self.port,
+            self.certificate,
+            self.public_key,
+            self.session_epoch,
+            self.session_public_key,
+            self.wire_versions,
+        )
+
+    def get_packet(
+        self, ack=False, use_tlv=False, private_key=None, member_private_key=None
+    ):
+        """
+        Hello or hello ack packet as bytes, built once and rebuilt only after the key, address,
+        certificate or announced session key changed.
+        """
+        fingerprint = self._fingerprint()
+        if fingerprint != self.packets_fingerprint:
+            # body changed, signatures have to be regenerated too
+            self.sign = None
+            self.member_sign = None
+            self.tlv_sign = None
+            self.tlv_member_sign = None
+            self.packets = {}
+            self.packets_fingerprint = fingerprint
+
+        packet = self.packets.get((ack, use_tlv))
+        if packet is None:
+            if use_tlv:
+                packet = self.get_bytes(ack, private_key, member_private_key)
+            else:
+                packet = self.get_string(ack, private_key, member_private_key).encode(
+                    "utf-8"
+                )
+            self.packets[(ack, use_tlv)] = packet
+        return packet
 
     def get_string(self, ack=False, private_key=None, member_private_key=None):
         id = constants.HELLO_ID
         if ack:
             id = constants.HELLO_ACK_ID
         main_body = f"[{self.label}][{self.ip}][{self.port}][{self.certificate}]"
+        if self.session_public_key:
+            session_key_str = crypto.b64_session_public_key(self.session_public_key)
+            main_body += f"[{self.session_epoch}:{session_key_str}]"
         if not self.sign:
             # generate signature and base64 encode it
             self.sign = crypto.sign_data(private_key, main_body)
@@ -70,7 +226,43 @@ class HelloMessage:
 
         # base64 encode public key
         public_key_str = crypto.b64_public_key(self.public_key)
-        return f"[{id}]{main_body}[{public_key_str}][{self.sign}][{self.member_sign}]"
+        wire_versions = ""
+        if self.wire_versions:
+            wire_versions = f"<tlv:{','.join(str(v) for v in self.wire_versions)}>"
+        return f"[{id}]{main_body}[{public_key_str}][{self.sign}][{self.member_sign}]{wire_versions}"
+
+    def get_bytes(self, ack=False, private_key=None, member_private_key=None):
+        """
+        TLV hello: [HELLO_BODY][PUBLIC_KEY][SIGNATURE][MEMBER_SIGNATURE][WIRE_VERSIONS], both
+        signatures cover the encoded HELLO_BODY.
+        """
+        body_elements = [
+            (tlv.LABEL, self.label),
+            (tlv.IP, self.ip),
+            (tlv.PORT, self.port),
+            (tlv.CERT, self.certificate),
+        ]
+        if self.session_public_key:
+            body_elements += [
+                (tlv.SESSION_EPOCH, self.session_epoch),
+                (tlv.SESSION_KEY, crypto.session_public_key_bytes(self.session_public_key)),
+            ]
+        body = tlv.encode_elements(body_elements)
+        if not self.tlv_sign:
+            self.tlv_sign = crypto.sign_bytes(private_key, body)
+        if not self.tlv_member_sign:
+            self.tlv_member_sign = crypto.sign_bytes(member_private_key, body)
+
+        return tlv.encode_packet(
+            constants.HELLO_ACK_ID if ack else constants.HELLO_ID,
+            (
+                (tlv.HELLO_BODY, body),
+                (tlv.PUBLIC_KEY, crypto.public_key_bytes(self.public_key)),
+                (tlv.SIGNATURE, self.tlv_sign),
+                (tlv.MEMBER_SIGNATURE, self.tlv_member_sign),
+                (tlv.WIRE_VERSIONS, bytes(self.wire_versions)),
+            ),
+        )
 
 
 class DataMessage:
@@ -93,6 +285,35 @@ class DataMessage:
         )
         return f"{header}[{encrypted_payload}]"
 
+    def get_session_encrypted_string(self, key_id, session_key):
+        header = f"[1][{self.label}][{key_id}]"
+        encrypted_payload = crypto.session_encrypt_data(
+            session_key,
+            f"[{self.data_address}][{self.request_id}][{self.retry_index}][{self.data}]",
+            header,
+        )
+        return f"{header}[{encrypted_payload}]"
+
+    def _tlv_payload(self):
+        return tlv.encode_elements(
+            (
+                (tlv.NAME, self.data_address),
+                (tlv.REQUEST_ID, self.request_id),
+                (tlv.RETRY_INDEX, self.retry_index),
+                (tlv.CONTENT, self.data),
+            )
+        )
+
+    def get_encrypted_bytes(self, public_key):
+        return encode_encrypted_tlv(
+            constants.DATA_ID, self.label, self._tlv_payload(), public_key
+        )
+
+    def get_session_encrypted_bytes(self, key_id, session_key):
+        return encode_session_encrypted_tlv(
+            constants.DATA_ID, self.label, self._tlv_payload(), key_id, session_key
+        )
+
     def get_string(self):
         return f"[1][{self.label}][{self.data_address}][{self.request_id}][{self.retry_index}][{self.data}]"
 
@@ -110,9 +331,47 @@ class FIB:
             self.certificate = certificate
             self.hello_count = 1
             self.public_key = public_key
+            # link health shared with the communication layer
+            self.health = None
+
+            # session keys: latest neighbor epoch, neighbor X25519 keys by epoch and
+            # derived AES keys by (outgoing, key_id)
+            self.session_epoch = None
+            self.session_public_keys = {}
+            self.session_keys = {}
+            # binary wire versions the neighbor announced
+            self.wire_versions = ()
+
+        def update_session_key(self, session_epoch, session_public_key):
+            if session_epoch is None:
+                return
+            known = self.session_public_keys.get(session_epoch)
+            if known is not None and crypto.same_public_key(known, session_public_key):
+                return
+            # epochs only grow while a node runs: a lower epoch or a new key for a known one
+            # means the neighbor restarted and counts from 0 again
+            if known is not None or (
+                self.session_epoch is not None and session_epoch < self.session_epoch
+            ):
+                self.reset_session()
+            self.session_public_keys[session_epoch] = session_public_key
+            self.session_epoch = max(self.session_public_keys)
+            # keep current and previous epoch so in-flight packets can still be decrypted
+            for epoch in list(self.session_public_keys):
+                if epoch < self.session_epoch - 1:
+                    del self.session_public_keys[epoch]
+            self.session_keys.clear()
+
+        def reset_session(self):
+            """
+            Forget the session keys of the neighbor, eg. after it restarted.
+            """
+            self.session_epoch = None
+            self.session_public_keys.clear()
+            self.session_keys.clear()
 
         def __repr__(self) -> str:
-            return f"(comm={self.tcp_ip}:{self.tcp_port} count={self.hello_count})"
+            return f"(comm={self.tcp_ip}:{self.tcp_port} count={self.hello_count} health={self.health})"
 
         def increment_hello_count(self):
             self.hello_count += 1
@@ -128,26 +387,121 @@ class FIB:
         return ", ".join([f"({self.table[row]})" for row in self.table])
 
     def received_hello(self, hello_message: HelloMessage):
-        if hello_message.label in self.table:
-            if self.table[hello_message.label].hello_count <= constants.MAX_HELLO_COUNT:
-                self.table[hello_message.label].increment_hello_count()
-                self.table[hello_message.label].public_key = hello_message.public_key
-        else:
-            self.table[hello_message.label] = self.FIB_Row(
+        """
+        Update FIB with hello, returns (True if the neighbor is new, its row). The row is read
+        once, the main loop may age the neighbor out of the table meanwhile.
+        """
+        row = self.table.get(hello_message.label)
+        new_neighbor = row is None
+        if new_neighbor:
+            row = self.table[hello_message.label] = self.FIB_Row(
                 hello_message.ip,
                 hello_message.port,
                 hello_message.certificate,
                 hello_message.public_key,
             )
+        else:
+            if row.hello_count <= constants.MAX_HELLO_COUNT:
+                row.increment_hello_count()
+            if not crypto.same_public_key(row.public_key, hello_message.public_key):
+                # restarted with a new key pair, session keys are from its previous run
+                row.public_key = hello_message.public_key
+                row.reset_session()
+        row.update_session_key(hello_message.session_epoch, hello_message.session_public_key)
+        row.wire_versions = hello_message.wire_versions
+        return new_neighbor, row
 
     def update_counts(self):
         """
-        Decrement all hello counts in FIB.
+        Decrement all hello counts in FIB. Returns labels of removed neighbors.
         """
+        removed = []
         for each_key in copy(self.table):
             count_bigger_zero = self.table[each_key].decrement_hello_count()
             if not count_bigger_zero:
                 del self.table[each_key]
+                removed.append(each_key)
+        return removed
+
+
+class PIT:
+    """
+    Pending Interest Table aggregated by data address (NDN style). Each entry holds the
+    downstream faces (neighbor labels) waiting for the data together with their request IDs, so
+    one returning Data is fanned out to all of them and only the first Interest goes upstream.
+    """
+
+    FORWARD = "forward"
+    AGGREGATED = "aggregated"
+    DUPLICATE = "duplicate"
+
+    class PIT_Entry:
+        def __init__(self):
+            # neighbor label -> {request_id: highest retry index}
+            self.faces = {}
+            # request_id -> highest retry index seen from any face
+            self.requests = {}
+
+        def add(self, label, request_id, retry_index):
+            face = self.faces.setdefault(label, {})
+            face[request_id] = max(retry_index, face.get(request_id, retry_index))
+            self.requests[request_id] = max(
+                retry_index, self.requests.get(request_id, retry_index)
+            )
+
+    def __init__(self):
+        self.table = {}
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.table)
+
+    def add_interest(self, data_address, label, request_id, retry_index):
+        """
+        Register interest and decide what to do with it:
+            FORWARD: first interest for the name or a retry with a higher retry index
+            AGGREGATED: name is already pending upstream, just wait for the data
+            DUPLICATE: same request and retry index seen before (interest loop), drop
+        """
+        with self.lock:
+            entry = self.table.get(data_address)
+            if entry is None:
+                entry = self.table[data_address] = self.PIT_Entry()
+                entry.add(label, request_id, retry_index)
+                return self.FORWARD
+
+            if request_id in entry.requests:
+                if retry_index <= entry.requests[request_id]:
+                    return self.DUPLICATE
+                entry.add(label, request_id, retry_index)
+                return self.FORWARD
+
+            entry.add(label, request_id, retry_index)
+            return self.AGGREGATED
+
+    def satisfy(self, data_address):
+        """
+        Remove entry for data address and return waiting faces {label: {request_id: retry}}.
+        """
+        with self.lock:
+            entry = self.table.pop(data_address, None)
+        return entry.faces if entry else {}
+
+    def expire(self, data_address):
+        with self.lock:
+            return self.table.pop(data_address, None) is not None
+
+    def rows(self):
+        """
+        Flat (data_address, label, request_id, retry_index) rows for printing and export.
+        """
+        with self.lock:
+            return [
+                (data_address, label, request_id, retry_index)
+                for data_address, entry in self.table.items()
+                for label, requests in entry.faces.items()
+                for request_id, retry_index in requests.items()
+            ]
 
 
 class Network:
@@ -165,36 +519,46 @@ class Network:
         * Updates PIT and Content Store
     """
 
-    def _simulate_physical_layer(self, all_nodes, k):
+    def _simulate_physical_layer(self, all_nodes, k, node_index=None):
         """
-        Calculates euclidean distances to all other nodes and saves only k nearest neighbors.
-        This simulates a physical wireless medium where signal from nearby nodes is visible.
+        Saves the k nearest nodes by euclidean distance, found with a spatial index of all nodes
+        (built here unless a shared one is passed). This simulates a physical wireless medium
+        where signal from nearby nodes is visible.
         """
 
         self.x, self.y = all_nodes[self.label]["xy"]
-        # calculate all distances
-        all_distances = []
-        for label in all_nodes:
-            if label != self.label:
-                all_distances.append(
-                    (
-                        label,
-                        euclidean_distance((self.x, self.y), all_nodes[label]["xy"]),
-                    )
-                )
-
-        # filter k nearest based on distance
-        k_nearest = sorted(all_distances, key=lambda x: x[1])[:k]
+        if node_index is None:
+            node_index = GridIndex.from_nodes(all_nodes)
+        k_nearest = node_index.nearest((self.x, self.y), k, exclude=(self.label,))
+        self.k_nearest = self._addresses(label for label, _ in k_nearest)
 
-        # save labels and server ip:port information
-        self.k_nearest = {
-            node[0]: (
-                all_nodes[node[0]]["server_ip"],
-                all_nodes[node[0]]["server_port"],
+    def _addresses(self, labels):
+        """
+        label -> (server ip, server port) of the nodes
+        """
+        return {
+            label: (
+                self.all_nodes[label]["server_ip"],
+                self.all_nodes[label]["server_port"],
             )
-            for node in k_nearest
+            for label in labels
         }
-        # print(f"NEAREST {k} NODES: {self.k_nearest}")
+
+    def move_to(self, xy, labels):
+        """
+        Node moved to xy, labels are its k nearest now. New ones get a hello right away, the
+        ones out of range are no longer sent hellos and age out of the FIB.
+        """
+        self.x, self.y = xy
+        added = [label for label in labels if label not in self.k_nearest]
+        if not added and len(labels) == len(self.k_nearest):
+            return
+        self.k_nearest = self._addresses(labels)
+        self.mobility_counters["k_nearest_updates"] += 1
+        self.mobility_counters["k_nearest_added"] += len(added)
+        for label in added:
+            ip, port = self.k_nearest[label]
+            self.send_hello(ip, port, self._neighbor_supports_tlv(label))
 
     def __init__(
         self,
@@ -208,44 +572,110 @@ class Network:
         gateway,
         gateway_key_path,
         gateway_details,
+        clock=time.monotonic,
+        node_keys=None,
+        member_private_key=None,
+        node_index=None,
+        gateway_private_key=None,
     ) -> None:
         self.comm: SocketCommunication = comm
         self.label = label
-        self.sensor_data_callback = None
+        # time source of all timers and intervals, virtual time in the simulator
+        self.clock = clock
+        # data address prefix -> callback(suffix) of local producers
+        self.producers = NameTrie()
         self.originator_callback = None
-        self._simulate_physical_layer(all_nodes, k)
+        self.all_nodes = all_nodes
+        self._simulate_physical_layer(all_nodes, k, node_index)
+        self.mobility_counters = {"k_nearest_updates": 0, "k_nearest_added": 0}
         self.hello_delay = hello_delay
         self.hello_message = hello_message
 
         self.neighbor_table = FIB()
-        self.pit = {}
+        self.pit = PIT()
+        self.content_store = ContentStore(
+            constants.CS_MAX_ENTRIES,
+            constants.CS_MAX_BYTES,
+            constants.CS_DEFAULT_TTL,
+            constants.CS_PREFIX_TTLS,
+            clock=clock,
+        )
 
         # gateway stuff
         self.gpit = {}
         self.gateway_client_requests = {}
 
-        self.member_private_key = crypto.load_private_key_from_disk(member_key_path)
+        # lifetimes of PIT, GPIT and client request entries
+        self.interest_lifetime = constants.INTEREST_LIFETIME
+        self.timers = TimerWheel(constants.TIMER_TICK, constants.TIMER_SLOTS, clock=clock)
+        self.expiry_counters = {
+            "pit": 0,
+            "gpit": 0,
+            "gateway_client_requests": 0,
+            "client_requests": 0,
+            "lsa": 0,
+        }
+
+        # link state routing
+        self.routing_enabled = constants.LINK_STATE_ROUTING
+        self.routing = LinkStateRouting(label)
+        self.routing.counters.update({"routed_interests": 0, "flooded_interests": 0})
+        self.lsa_refreshed = 0
+
+        # keys can be passed in already loaded (eg. shared by all nodes of a simulation)
+        self.member_private_key = (
+            member_private_key or crypto.load_private_key_from_disk(member_key_path)
+        )
         if gateway:
             self.gateway = True
-            self.gateway_private_key = crypto.load_private_key_from_disk(
-                gateway_key_path
+            self.gateway_private_key = (
+                gateway_private_key or crypto.load_private_key_from_disk(gateway_key_path)
             )
             self.gateway_public_key = self.gateway_private_key.public_key()
             self.gateway_details = gateway_details
+            self.gateway_prefixes = NameTrie()
+            self.gateway_prefixes.insert(gateway_details[2], gateway_details[:2])
         else:
             self.gateway = False
 
         self.member_public_key = self.member_private_key.public_key()
-        self.private_key, self.public_key = crypto.generate_keys(2048)
+        self.private_key, self.public_key = node_keys or crypto.generate_keys(2048)
+        self.hello_cache = HelloVerificationCache(constants.HELLO_CACHE_SIZE)
         self.hello_message.public_key = self.public_key
 
-        self.last_10_packets = deque(maxlen=10)
+        # binary TLV packets are used towards neighbors which announced a common wire version
+        self.wire_tlv = constants.WIRE_FORMAT == "tlv"
+        self.hello_message.wire_versions = tlv.SUPPORTED_VERSIONS if self.wire_tlv else ()
+        # gateway peer has no hellos, switch to TLV once it sent a TLV (or announcing) packet
+        self.gateway_peer_tlv = False
+        self.wire_counters = {"tlv": 0, "text": 0}
+
+        # symmetric session keys for Interest/Data, X25519 private keys by epoch
+        self.session_keys_enabled = constants.SESSION_KEYS
+        self.session_private_keys = {}
+        self.session_epoch = -1
+        self.session_send_epoch = 0
+        self.session_key_created = 0
+        if self.session_keys_enabled:
+            self.rotate_session_key()
+
+        # captured packets, formatted only when viewed ("packets" mgmt call)
+        self.capture = PacketCapture(
+            constants.CAPTURE_SIZE,
+            constants.CAPTURE_SAMPLE_EVERY,
+            constants.CAPTURE_PACKET_TYPES,
+            constants.CAPTURE_DIRECTIONS,
+            constants.CAPTURE_NAME_PREFIX,
+        )
         self.packet_counters = {
             "in": {
                 "hello": 0,
                 "hello_ack": 0,
                 "interest": 0,
+                "interest_aggregated": 0,
                 "data": 0,
+                "data_unsolicited": 0,
+                "lsa": 0,
             },
             "out": {
                 "hello": 0,
@@ -254,27 +684,120 @@ class Network:
                 "interest_fwd": 0,
                 "data_org": 0,
                 "data_fwd": 0,
+                "data_cache": 0,
+                "lsa": 0,
             },
+            "transport": self.comm.counters,
         }
 
-        self.comm.register_callback(self.hello_handler)
-        self.comm.register_callback(self.data_handler)
-        self.comm.register_callback(self.interest_handler)
+        # per packet type decode timings -> {type: {"count", "total_ms", "max_ms"}}
+        self.decode_timings = {}
+        # latency histograms per pipeline stage and packet type, sends and RTTs
+        self.metrics = metrics.Metrics(
+            constants.METRICS_ENABLED,
+            {
+                metrics.STAGE_SECONDS: constants.STAGE_BUCKETS,
+                metrics.SEND_SECONDS: constants.STAGE_BUCKETS,
+                metrics.RTT_SECONDS: constants.RTT_BUCKETS,
+            },
+        )
+        self.comm.metrics = self.metrics
+
+        # handler registry keyed by packet ID, each packet is decoded once in dispatch_packet
+        self.handlers = {}
+        self.register_handler(constants.HELLO_ID, self.hello_handler)
+        self.register_handler(constants.HELLO_ACK_ID, self.hello_handler)
+        self.register_handler(constants.DATA_ID, self.data_handler)
+        self.register_handler(constants.INTEREST_ID, self.interest_handler)
+        self.register_handler(constants.LSA_ID, self.lsa_handler)
+        self.comm.packet_callback = self.dispatch_packet
         self.comm.gateway_callback = self.gateway_handler
 
-    def send_hello(self, ip, port):
-        hello_packet = self.hello_message.get_string(
-            private_key=self.private_key, member_private_key=self.member_private_key
+    def register_handler(self, packet_id, handler):
+        """
+        Register handler for a packet ID. Handler is called with (data_type, message) where message
+        is the already decoded message object.
+        """
+        self.handlers[packet_id] = handler
+
+    def _stage(self, stage, packet_name):
+        """
+        Context manager timing a pipeline stage of a packet type.
+        """
+        if not self.metrics.enabled:
+            return metrics.NULL_TIMER
+        return self.metrics.time(
+            metrics.STAGE_SECONDS, (("stage", stage), ("packet", packet_name))
         )
-        self.comm.send(ip, port, hello_packet)
-        self.packet_counters["out"]["hello"] += 1
 
-    def send_hello_ack(self, ip, port):
-        hello_ack_packet = self.hello_message.get_string(
-            ack=True,
+    def _record_decode_timing(self, packet_name, elapsed_ms):
+        timing = self.decode_timings.setdefault(
+            packet_name, {"count": 0, "total_ms": 0.0, "max_ms": 0.0}
+        )
+        timing["count"] += 1
+        timing["total_ms"] += elapsed_ms
+        timing["max_ms"] = max(timing["max_ms"], elapsed_ms)
+
+    def dispatch_packet(self, data):
+        """
+        Callback for all non gateway packets. This will be called by SocketCommunication object.
+        Decodes (and decrypts) the packet exactly once and passes the decoded message to the
+        single handler registered for its packet ID.
+        """
+        start = time.perf_counter()
+        if tlv.is_tlv(data):
+            self.wire_counters["tlv"] += 1
+            data_type, message = self._decode_tlv(data)
+        else:
+            self.wire_counters["text"] += 1
+            try:
+                data_type, message = self._decode_data(str(data, "utf-8"))
+            except UnicodeDecodeError:
+                data_type, message = -1, None
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        handler = self.handlers.get(data_type)
+        if handler is None:
+            packet_name = "invalid"
+        else:
+            # handlers may be registered for IDs without a name
+            packet_name = PACKET_NAMES.get(data_type, str(data_type))
+        self._record_decode_timing(packet_name, elapsed_ms)
+        self.metrics.observe(
+            metrics.STAGE_SECONDS,
+            (("stage", "decode"), ("packet", packet_name)),
+            elapsed_ms / 1000,
+        )
+        if handler is None:
+            return
+
+        # received frames are views into the receive buffer, only keep their size
+        self.capture.record("in", packet_name, message, len(data))
+        with self._stage("handle", packet_name):
+            handler(data_type, message)
+
+    def _supports_tlv(self, wire_versions):
+        return self.wire_tlv and tlv.WIRE_VERSION in wire_versions
+
+    def _neighbor_supports_tlv(self, neighbor_label):
+        row = self.neighbor_table.table.get(neighbor_label)
+        return row is not None and self._supports_tlv(row.wire_versions)
+
+    def _hello_packet(self, ack, use_tlv):
+        return self.hello_message.get_packet(
+            ack=ack,
+            use_tlv=use_tlv,
             private_key=self.private_key,
             member_private_key=self.member_private_key,
         )
+
+    def send_hello(self, ip, port, use_tlv=False):
+        hello_packet = self._hello_packet(False, use_tlv)
+        self.comm.send(ip, port, hello_packet)
+        self.packet_counters["out"]["hello"] += 1
+
+    def send_hello_ack(self, ip, port, use_tlv=False):
+        hello_ack_packet = self._hello_packet(True, use_tlv)
         self.comm.send(
             ip,
             port,
@@ -282,42 +805,225 @@ class Network:
         )
         self.packet_counters["out"]["hello_ack"] += 1
 
+    def register_producer(self, prefix, callback):
+        """
+        Serve interests under prefix locally: callback gets the remaining name components
+        (eg. "heartrate/ecg" for "/data/1/heartrate/ecg" under "/data/1/") and returns the data.
+        """
+        self.producers.insert(prefix, callback)
+        if self.routing_enabled:
+            self.refresh_lsa()
+
+    def produce(self, data_address):
+        """
+        Data from the local producer with the longest matching prefix or None.
+        """
+        components = split_name(data_address)
+        match = self.producers.longest_prefix_match(components)
+        if match is None:
+            return None
+        prefix, callback = match
+        return callback(join_name(components[len(prefix) :]))
+
+    def rotate_session_key(self):
+        """
+        Generate new X25519 session key pair and announce it in the following hellos.
+        Private key of the previous epoch is kept so in-flight packets can still be decrypted.
+        """
+        self.session_epoch += 1
+        private_key, public_key = crypto.generate_session_keys()
+        self.session_private_keys[self.session_epoch] = private_key
+        for epoch in list(self.session_private_keys):
+            if epoch < self.session_epoch - 1:
+                del self.session_private_keys[epoch]
+        self.session_key_created = self.clock()
+        self.hello_message.set_session_key(self.session_epoch, public_key)
+
+        for row in copy(self.neighbor_table.table).values():
+            row.session_keys.clear()
+
+    def _get_session_key(self, neighbor_label, key_id, outgoing):
+        """
+        Derive (or fetch cached) AES key for packets to/from a neighbor. key_id is
+        "<sender epoch>.<receiver epoch>", keys are directional.
+        """
+        row = self.neighbor_table.table.get(neighbor_label)
+        if row is None:
+            return None
+        # one lookup, rotate_session_key may clear the cache meanwhile
+        session_key = row.session_keys.get((outgoing, key_id))
+        if session_key is not None:
+            return session_key
+
+        try:
+            sender_epoch, receiver_epoch = (int(epoch) for epoch in key_id.split("."))
+        except ValueError:
+            return None
+        if outgoing:
+            own_epoch, peer_epoch = sender_epoch, receiver_epoch
+            info = f"{self.label}.{sender_epoch}>{neighbor_label}.{receiver_epoch}"
+        else:
+            own_epoch, peer_epoch = receiver_epoch, sender_epoch
+            info = f"{neighbor_label}.{sender_epoch}>{self.label}.{receiver_epoch}"
+
+        private_key = self.session_private_keys.get(own_epoch)
+        peer_public_key = row.session_public_keys.get(peer_epoch)
+        if private_key is None or peer_public_key is None:
+            return None
+
+        session_key = crypto.derive_session_key(private_key, peer_public_key, info)
+        row.session_keys[(outgoing, key_id)] = session_key
+        return session_key
+
+    def _encrypt_for(self, neighbor_label, row, message_obj):
+        """
+        Encrypt message for a neighbor (its FIB row, read once by the caller), with the session
+        key if one is agreed else with RSA. Binary TLV packet if the neighbor supports it, else
+        text.
+        """
+        packet_name = "interest" if isinstance(message_obj, InterestMessage) else "data"
+        with self._stage("encrypt", packet_name):
+            use_tlv = self._supports_tlv(row.wire_versions)
+            if self.session_keys_enabled and row.session_epoch is not None:
+                key_id = f"{self.session_send_epoch}.{row.session_epoch}"
+                session_key = self._get_session_key(neighbor_label, key_id, outgoing=True)
+                if session_key:
+                    if use_tlv:
+                        return message_obj.get_session_encrypted_bytes(key_id, session_key)
+                    return message_obj.get_session_encrypted_string(key_id, session_key)
+            if use_tlv:
+                return message_obj.get_encrypted_bytes(row.public_key)
+            return message_obj.get_encrypted_string(row.public_key)
+
+    def _decrypt_from(self, packet_id, label, data_array):
+        """
+        Decrypt Interest/Data payload from a neighbor. Session encrypted packets carry a key id:
+        [id][label][key_id][payload], RSA encrypted ones don't: [id][label][payload]
+        """
+        if len(data_array) == 4:
+            key_id, encrypted_payload = data_array[2], data_array[3]
+            session_key = self._get_session_key(label, key_id, outgoing=False)
+            if not session_key:
+                return None
+            return crypto.session_decrypt_data(
+                session_key, encrypted_payload, f"[{packet_id}][{label}][{key_id}]"
+            )
+        return crypto.decrypt_data(self.private_key, data_array[2])
+
     def send_hellos(self):
         """
         Loop over k_nearest nodes and send hellos -> label : TCP IP, TCP port
         """
+        if self.session_keys_enabled:
+            # start using the latest epoch once it has been announced in a hello round
+            self.session_send_epoch = self.session_epoch
+            if self.clock() - self.session_key_created >= constants.SESSION_KEY_ROTATION:
+                self.rotate_session_key()
+
+        if (
+            self.routing_enabled
+            and self.clock() - self.lsa_refreshed >= constants.LSA_REFRESH_INTERVAL
+        ):
+            self.refresh_lsa()
 
         for node in self.k_nearest:
             ip, port = self.k_nearest[node]
-            self.send_hello(ip, port)
+            self.send_hello(ip, port, self._neighbor_supports_tlv(node))
+
+    def _advertised_prefixes(self):
+        prefixes = [f"/{join_name(prefix)}/" for prefix, _ in self.producers.items()]
+        if self.gateway:
+            prefixes += [
+                f"/{join_name(prefix)}/" for prefix, _ in self.gateway_prefixes.items()
+            ]
+        return prefixes
+
+    def refresh_lsa(self):
+        """
+        Originate LSA with current neighbors and served prefixes, sign it and flood it.
+        """
+        lsa = self.routing.originate(
+            list(self.neighbor_table.table), self._advertised_prefixes()
+        )
+        lsa.member_sign = crypto.sign_data(self.member_private_key, lsa.get_body())
+        self.lsa_refreshed = self.clock()
+        self.flood_lsa(lsa)
+
+    def flood_lsa(self, lsa, ignore_neighbor=None):
+        packet = lsa.get_string(self.label)
+        for neighbor_label, row in copy(self.neighbor_table.table).items():
+            if neighbor_label != ignore_neighbor:
+                self.comm.send(row.tcp_ip, row.tcp_port, packet)
+                self.packet_counters["out"]["lsa"] += 1
+
+    def sync_lsdb(self, neighbor_label):
+        """
+        Send all known LSAs to a new neighbor so it learns the topology right away.
+        """
+        row = self.neighbor_table.table.get(neighbor_label)
+        if row is None:
+            # aged out by the main loop in the meantime
+            return
+        for lsa in list(self.routing.lsdb.values()):
+            if lsa.member_sign:
+                self.comm.send(row.tcp_ip, row.tcp_port, lsa.get_string(self.label))
+                self.packet_counters["out"]["lsa"] += 1
+
+    def age_neighbors(self):
+        """
+        Decrement hello counts, re-advertise adjacencies if neighbors were lost.
+        """
+        removed = self.neighbor_table.update_counts()
+        for label in removed:
+            self.hello_cache.invalidate(label)
+        if removed and self.routing_enabled:
+            self.refresh_lsa()
+
+    def _interest_next_hops(self, data_address, retry_index, ignore_neighbor=None):
+        """
+        (label, FIB row) of the neighbors to send an interest to: best next hops of the longest
+        matching prefix when there is a route, else all neighbors (flooding). Retries are always
+        flooded so a stale route can't swallow them. Rows come from a copy of the table, a
+        neighbor aging out meanwhile is still sent to.
+        """
+        neighbors = [
+            (neighbor_label, row)
+            for neighbor_label, row in copy(self.neighbor_table.table).items()
+            if neighbor_label != ignore_neighbor
+        ]
+        if self.routing_enabled and retry_index == 0:
+            next_hops = self.routing.next_hops(data_address)
+            routed = [
+                (label, row) for label, row in neighbors if next_hops and label in next_hops
+            ]
+            if routed:
+                self.routing.counters["routed_interests"] += 1
+                return routed
+        self.routing.counters["flooded_interests"] += 1
+        return neighbors
 
     def _generate_request_id(self):
         characters = string.ascii_letters + string.digits
         random_string = "".join(random.choice(characters) for _ in range(5))
         return random_string
 
-    def originate_interest(self, data_address, retry_index):
+    def originate_interest(self, data_address, retry_index, request_id=None):
         """
         Introduce an interest packet in the network. This node will become the originator.
+        Retransmissions pass the request_id of the original interest.
         """
         # random string for request index
-        request_id = self._generate_request_id()
+        if request_id is None:
+            request_id = self._generate_request_id()
 
         message_obj = InterestMessage(data_address, self.label, request_id, retry_index)
-        payload = message_obj.get_string()
 
-        for neighbor_label in copy(self.neighbor_table.table):
-            encrypted_payload = message_obj.get_encrypted_string(
-                self.neighbor_table.table[neighbor_label].public_key
-            )
-            self.comm.send(
-                self.neighbor_table.table[neighbor_label].tcp_ip,
-                self.neighbor_table.table[neighbor_label].tcp_port,
-                encrypted_payload,
-            )
+        for neighbor_label, row in self._interest_next_hops(data_address, retry_index):
+            encrypted_payload = self._encrypt_for(neighbor_label, row, message_obj)
+            self.comm.send(row.tcp_ip, row.tcp_port, encrypted_payload)
             self.packet_counters["out"]["interest_org"] += 1
-            self.last_10_packets.append(
-                f"[OUT INTEREST]\nPLAIN: {payload}\nENCRYPT: {encrypted_payload}\n"
+            self.capture.record(
+                "out", "interest_org", message_obj, encrypted_payload, neighbor_label
             )
 
         return request_id
@@ -326,75 +1032,93 @@ class Network:
         self, data_address, retry_index, request_id, ignore_neighbor=""
     ):
         """
-        Go through FIB table and forward interests to all neighbors except ignore_neighbor which
-        forwarded the interest to us.
+        Forward interest to the next hops towards the producer (or all neighbors if there is
+        no route) except ignore_neighbor which forwarded the interest to us.
         """
         message_obj = InterestMessage(data_address, self.label, request_id, retry_index)
-        payload = message_obj.get_string()
 
-        for neighbor_label in copy(self.neighbor_table.table):
-            if neighbor_label != ignore_neighbor:
-                encrypted_payload = message_obj.get_encrypted_string(
-                    self.neighbor_table.table[neighbor_label].public_key
-                )
-                self.comm.send(
-                    self.neighbor_table.table[neighbor_label].tcp_ip,
-                    self.neighbor_table.table[neighbor_label].tcp_port,
-                    encrypted_payload,
-                )
-                self.packet_counters["out"]["interest_fwd"] += 1
-                self.last_10_packets.append(
-                    f"[FWD INTEREST]\nPLAIN: {payload}\nENCRYPT: {encrypted_payload}\n"
-                )
+        for neighbor_label, row in self._interest_next_hops(
+            data_address, retry_index, ignore_neighbor
+        ):
+            encrypted_payload = self._encrypt_for(neighbor_label, row, message_obj)
+            self.comm.send(row.tcp_ip, row.tcp_port, encrypted_payload)
+            self.packet_counters["out"]["interest_fwd"] += 1
+            self.capture.record(
+                "out", "interest_fwd", message_obj, encrypted_payload, neighbor_label
+            )
 
-    def send_data(self, neighbor_label, data_address, request_id, retry_index, data):
+    def send_data(
+        self,
+        neighbor_label,
+        data_address,
+        request_id,
+        retry_index,
+        data,
+        counter="data_org",
+    ):
         message_obj = DataMessage(
             self.label, data_address, request_id, retry_index, data
         )
-        payload = message_obj.get_string()
-        encrypted_payload = message_obj.get_encrypted_string(
-            self.neighbor_table.table[neighbor_label].public_key
-        )
+        row = self.neighbor_table.table.get(neighbor_label)
+        if row is None:
+            # aged out since the interest arrived
+            return
+        encrypted_payload = self._encrypt_for(neighbor_label, row, message_obj)
 
-        self.comm.send(
-            self.neighbor_table.table[neighbor_label].tcp_ip,
-            self.neighbor_table.table[neighbor_label].tcp_port,
-            encrypted_payload,
-        )
-        self.packet_counters["out"]["data_org"] += 1
-        self.last_10_packets.append(
-            f"[OUT DATA]\nPLAIN: {payload}\nENCRYPT: {encrypted_payload}\n"
-        )
+        self.comm.send(row.tcp_ip, row.tcp_port, encrypted_payload)
+        self.packet_counters["out"][counter] += 1
+        self.capture.record("out", counter, message_obj, encrypted_payload, neighbor_label)
 
-    def forward_data(self, data_address, request_id, retry_index, data):
-        if (data_address, request_id, retry_index) in self.pit:
-            neighbor_label = self.pit[(data_address, request_id, retry_index)]
-            message_obj = DataMessage(
-                self.label, data_address, request_id, retry_index, data
-            )
-            payload = message_obj.get_string()
-            encrypted_payload = message_obj.get_encrypted_string(
-                self.neighbor_table.table[neighbor_label].public_key
-            )
-            if (data_address, request_id, retry_index) in self.pit:
-                self.comm.send(
-                    self.neighbor_table.table[neighbor_label].tcp_ip,
-                    self.neighbor_table.table[neighbor_label].tcp_port,
-                    encrypted_payload,
+    def forward_data(self, data_address, data):
+        """
+        Fan out Data to every downstream face waiting for the data address, once per request.
+        Returns True if a PIT entry was satisfied.
+        """
+        faces = self.pit.satisfy(data_address)
+        if not faces:
+            return False
+        self.timers.cancel(("pit", data_address))
+        for neighbor_label, requests in faces.items():
+            row = self.neighbor_table.table.get(neighbor_label)
+            if row is None:
+                # aged out while the interest was pending
+                continue
+            for request_id, retry_index in requests.items():
+                message_obj = DataMessage(
+                    self.label, data_address, request_id, retry_index, data
                 )
+                encrypted_payload = self._encrypt_for(neighbor_label, row, message_obj)
+                self.comm.send(row.tcp_ip, row.tcp_port, encrypted_payload)
                 self.packet_counters["out"]["data_fwd"] += 1
-                self.last_10_packets.append(
-                    f"[FWD DATA]\nPLAIN: {payload}\nENCRYPT: {encrypted_payload}\n"
+                self.capture.record(
+                    "out", "data_fwd", message_obj, encrypted_payload, neighbor_label
                 )
-            if (data_address, request_id, retry_index) in self.pit:
-                self.pit.pop((data_address, request_id, retry_index))
+        return True
 
     def send_over_gateway(self, data_address, data=None):
         """
         Build custom EG or EG_REPLY packet and send to Gateway peer.
         """
 
-        if data:
+        if self.wire_tlv and self.gateway_peer_tlv:
+            if data:
+                packet_id = constants.EG_REPLY_ID
+                payload = tlv.encode_elements(
+                    ((tlv.NAME, data_address), (tlv.CONTENT, data))
+                )
+            else:
+                packet_id = constants.EG_ID
+                payload = tlv.encode_elements(((tlv.NAME, data_address),))
+            encrypted_payload = tlv.encode_packet(
+                packet_id,
+                (
+                    (
+                        tlv.PAYLOAD,
+                        crypto.encrypt_bytes(payload, self.gateway_public_key),
+                    ),
+                ),
+            )
+        elif data:
             encrypted_payload = "EG_REPLY|" + crypto.encrypt_data(
                 f"{data_address}|{data}", self.gateway_public_key
             )
@@ -403,6 +1127,9 @@ class Network:
             encrypted_payload = "EG|" + crypto.encrypt_data(
                 data_address, self.gateway_public_key
             )
+        if self.wire_tlv and isinstance(encrypted_payload, str):
+            # announce TLV support, older peers only look at the first two fields
+            encrypted_payload += f"|tlv:{tlv.WIRE_VERSION}"
 
         self.comm.send(
             self.gateway_details[0], self.gateway_details[1], encrypted_payload
@@ -410,6 +1137,9 @@ class Network:
 
     def _decode_data(self, data):
         data_array = re.findall(r"\[([^\]]+)\]", data)
+        if not data_array:
+            return -1, "DATA GETS IGNORED, SINCE TYPE -1 DOESN'T EXIST"
+
         # Decode Hello packets
         if data_array[0] == "0" or data_array[0] == "4":
             data_type = int(data_array[0])
@@ -417,26 +1147,60 @@ class Network:
             ip_address = data_array[2]
             port = int(data_array[3])
             cert = data_array[4]
+            main_body = f"[{label}][{ip_address}][{port}][{cert}]"
+
+            # Hello with session key carries one more field in the signed body
+            session_epoch, session_field = None, None
+            if len(data_array) == 9:
+                session_field = data_array[5]
+                main_body += f"[{session_field}]"
+                session_epoch = int(session_field.split(":", 1)[0])
+                data_array = data_array[:5] + data_array[6:]
+
             public_key = data_array[5]
             sign = data_array[6]
             member_sign = data_array[7]
 
-            # Validate peer signature
-            public_key_decoded = crypto.get_public_key_from_string(public_key)
-            verify = crypto.verify_signature(
-                public_key_decoded,
-                f"[{label}][{ip_address}][{port}][{cert}]",
-                sign,
-            )
-            if not verify:
-                return -1, "DATA GETS IGNORED, SINCE TYPE -1 DOESN'T EXIST"
+            # Identical hellos were already parsed and verified
+            digest = self.hello_cache.digest(main_body, public_key, sign, member_sign)
+            cached = self.hello_cache.lookup(digest)
+            if cached is None:
+                start = time.perf_counter()
+                # Validate peer signature
+                public_key_decoded = crypto.get_public_key_from_string(public_key)
+                verify = crypto.verify_signature(
+                    public_key_decoded,
+                    main_body,
+                    sign,
+                )
+                if not verify:
+                    return -1, "DATA GETS IGNORED, SINCE TYPE -1 DOESN'T EXIST"
 
-            # Validate member signature
-            verify = crypto.verify_signature(
-                self.member_public_key,
-                f"[{label}][{ip_address}][{port}][{cert}]",
-                member_sign,
-            )
+                # Validate member signature
+                if not crypto.verify_signature(
+                    self.member_public_key,
+                    main_body,
+                    member_sign,
+                ):
+                    return -1, "DATA GETS IGNORED, SINCE TYPE -1 DOESN'T EXIST"
+
+                session_public_key = None
+                if session_field:
+                    session_public_key = crypto.get_session_public_key_from_string(
+                        session_field.split(":", 1)[1]
+                    )
+                cached = (public_key_decoded, session_public_key)
+                self.hello_cache.insert(
+                    label, digest, cached, time.perf_counter() - start
+                )
+            public_key_decoded, session_public_key = cached
+
+            wire_versions = ()
+            wire_versions_match = re.search(r"<tlv:([\d,]+)>$", data)
+            if wire_versions_match:
+                wire_versions = tuple(
+                    int(version) for version in wire_versions_match.group(1).split(",")
+                )
 
             return data_type, HelloMessage(
                 label=label,
@@ -445,18 +1209,18 @@ class Network:
                 cert=cert,
                 public_key=public_key_decoded,
                 sign=sign,
+                session_epoch=session_epoch,
+                session_public_key=session_public_key,
+                wire_versions=wire_versions,
             )
 
         # Decode Data packets
         elif data_array[0] == "1":
             data_type = int(data_array[0])
             label = int(data_array[1])
-            encrypted_payload = data_array[2]
             # decrypt payload
             if label in self.neighbor_table.table:
-                decrypted_payload = crypto.decrypt_data(
-                    self.private_key, encrypted_payload
-                )
+                decrypted_payload = self._decrypt_from(data_type, label, data_array)
 
                 if not decrypted_payload:
                     return -1, "DATA GETS IGNORED, SINCE TYPE -1 DOESN'T EXIST"
@@ -476,12 +1240,9 @@ class Network:
         elif data_array[0] == "2":
             label = int(data_array[1])
             data_type = int(data_array[0])
-            encrypted_payload = data_array[2]
             # decrypt payload
             if label in self.neighbor_table.table:
-                decrypted_payload = crypto.decrypt_data(
-                    self.private_key, encrypted_payload
-                )
+                decrypted_payload = self._decrypt_from(data_type, label, data_array)
 
                 if not decrypted_payload:
                     return -1, "DATA GETS IGNORED, SINCE TYPE -1 DOESN'T EXIST"
@@ -494,15 +1255,156 @@ class Network:
                 return 2, InterestMessage(data_address, label, request_id, retry_index)
             else:
                 return -1, "DATA GETS IGNORED, SINCE TYPE -1 DOESN'T EXIST"
+
+        # Decode LSA packets, only accepted from neighbors and with valid membership signature
+        elif data_array[0] == "5" and len(data_array) == 7:
+            lsa = LSA.from_fields(data_array[1:])
+            if lsa.sender not in self.neighbor_table.table:
+                return -1, "DATA GETS IGNORED, SINCE TYPE -1 DOESN'T EXIST"
+            if not crypto.verify_signature(
+                self.member_public_key, lsa.get_body(), lsa.member_sign
+            ):
+                return -1, "DATA GETS IGNORED, SINCE TYPE -1 DOESN'T EXIST"
+            return 5, lsa
         else:
             return -1, "DATA GETS IGNORED, SINCE TYPE -1 DOESN'T EXIST"
 
-    def hello_handler(self, data):
+    def _decode_tlv(self, data):
+        """
+        Decode binary TLV packet, same results as _decode_data.
+        """
+        try:
+            packet_id, value = tlv.decode_packet(data)
+            elements = tlv.decode_elements(value)
+            if packet_id in (constants.HELLO_ID, constants.HELLO_ACK_ID):
+                message = self._decode_tlv_hello(elements)
+            elif packet_id in (constants.DATA_ID, constants.INTEREST_ID):
+                message = self._decode_tlv_payload(packet_id, elements)
+            else:
+                message = None
+        except (tlv.TLVError, KeyError, ValueError):
+            message = None
+
+        if message is None:
+            return -1, "DATA GETS IGNORED, SINCE TYPE -1 DOESN'T EXIST"
+        return packet_id, message
+
+    def _decode_tlv_hello(self, elements):
+        body = elements[tlv.HELLO_BODY]
+        body_elements = tlv.decode_elements(body)
+        label = tlv.get_number(body_elements, tlv.LABEL)
+
+        # Identical hellos were already parsed and verified
+        digest = self.hello_cache.digest(
+            body,
+            elements[tlv.PUBLIC_KEY],
+            elements[tlv.SIGNATURE],
+            elements[tlv.MEMBER_SIGNATURE],
+        )
+        cached = self.hello_cache.lookup(digest)
+        if cached is None:
+            start = time.perf_counter()
+            public_key = crypto.get_public_key_from_bytes(elements[tlv.PUBLIC_KEY])
+            # Validate peer and member signature
+            if not crypto.verify_bytes(public_key, body, elements[tlv.SIGNATURE]):
+                return None
+            if not crypto.verify_bytes(
+                self.member_public_key, body, elements[tlv.MEMBER_SIGNATURE]
+            ):
+                return None
+
+            session_public_key = None
+            if tlv.SESSION_KEY in body_elements:
+                session_public_key = crypto.get_session_public_key_from_bytes(
+                    body_elements[tlv.SESSION_KEY]
+                )
+            cached = (public_key, session_public_key)
+            self.hello_cache.insert(label, digest, cached, time.perf_counter() - start)
+        public_key, session_public_key = cached
+
+        session_epoch = None
+        if session_public_key is not None:
+            session_epoch = tlv.get_number(body_elements, tlv.SESSION_EPOCH)
+
+        return HelloMessage(
+            label=label,
+            ip=tlv.get_string(body_elements, tlv.IP),
+            port=tlv.get_number(body_elements, tlv.PORT),
+            cert=tlv.get_string(body_elements, tlv.CERT),
+            public_key=public_key,
+            sign=bytes(elements[tlv.SIGNATURE]),
+            session_epoch=session_epoch,
+            session_public_key=session_public_key,
+            wire_versions=tuple(elements.get(tlv.WIRE_VERSIONS, b"")),
+        )
+
+    def _decode_tlv_payload(self, packet_id, elements):
+        """
+        Decrypt Interest/Data from a neighbor, session encrypted packets carry a KEY_ID.
+        """
+        label = tlv.get_number(elements, tlv.LABEL)
+        if label not in self.neighbor_table.table:
+            return None
+
+        if tlv.KEY_ID in elements:
+            key_id = tlv.get_string(elements, tlv.KEY_ID)
+            session_key = self._get_session_key(label, key_id, outgoing=False)
+            if not session_key:
+                return None
+            payload = crypto.session_decrypt_bytes(
+                session_key,
+                elements[tlv.PAYLOAD],
+                tlv.session_associated_data(packet_id, label, key_id),
+            )
+        else:
+            payload = crypto.decrypt_bytes(self.private_key, elements[tlv.PAYLOAD])
+        if not payload:
+            return None
+
+        payload_elements = tlv.decode_elements(payload)
+        data_address = tlv.get_string(payload_elements, tlv.NAME)
+        request_id = tlv.get_string(payload_elements, tlv.REQUEST_ID)
+        retry_index = tlv.get_number(payload_elements, tlv.RETRY_INDEX)
+        if packet_id == constants.INTEREST_ID:
+            return InterestMessage(data_address, label, request_id, retry_index)
+        return DataMessage(
+            label,
+            data_address,
+            request_id,
+            retry_index,
+            tlv.get_string(payload_elements, tlv.CONTENT),
+        )
+
+    def _expire_entry(self, key):
+        """
+        Timer callback, drop table entry whose lifetime ran out without an answer.
         """
-        Callback for hello packets. This will be called by SocketCommunication object.
+        table, entry_key = key
+        if table == "pit":
+            expired = self.pit.expire(entry_key)
+        elif table == "lsa":
+            expired = self.routing.remove(entry_key)
+        elif table == "gpit":
+            expired = self.gpit.pop(entry_key, None) is not None
+        else:
+            expired = self.gateway_client_requests.pop(entry_key, None) is not None
+        if expired:
+            self.expiry_counters[table] += 1
+
+    def table_sizes(self):
+        return {
+            "pit": len(self.pit),
+            "gpit": len(self.gpit),
+            "gateway_client_requests": len(self.gateway_client_requests),
+            "timers": len(self.timers),
+            "lsdb": len(self.routing.lsdb),
+        }
+
+    def hello_handler(self, data_type, message):
+        """
+        Handler for hello and hello ack packets. This will be called by dispatch_packet.
         This will handle FIB update here.
         """
-        data_type, message = self._decode_data(data)
 
         if data_type == 0 or data_type == 4:
             if data_type == 0:
@@ -510,34 +1412,60 @@ class Network:
             if data_type == 4:
                 self.packet_counters["in"]["hello_ack"] += 1
 
-            self.neighbor_table.received_hello(message)
+            new_neighbor, row = self.neighbor_table.received_hello(message)
+            if row.health is None:
+                row.health = self.comm.get_health((row.tcp_ip, row.tcp_port))
             if data_type == 0:
-                self.send_hello_ack(message.ip, message.port)
+                self.send_hello_ack(
+                    message.ip, message.port, self._supports_tlv(message.wire_versions)
+                )
+
+            if new_neighbor and self.routing_enabled:
+                self.refresh_lsa()
+                self.sync_lsdb(message.label)
+
+    def lsa_handler(self, data_type, lsa):
+        """
+        Handler for LSA packets. Installs newer LSAs and floods them to the other neighbors.
+        """
+        self.packet_counters["in"]["lsa"] += 1
+        if not self.routing_enabled:
+            return
+
+        if lsa.origin == self.label:
+            # own LSA from before a restart, continue above its sequence number
+            if lsa.seq > self.routing.seq:
+                self.routing.seq = lsa.seq
+                self.refresh_lsa()
+            return
 
-    def interest_handler(self, data):
+        if self.routing.install(lsa):
+            self.timers.schedule(
+                ("lsa", lsa.origin), constants.LSA_MAX_AGE, self._expire_entry
+            )
+            self.flood_lsa(lsa, ignore_neighbor=lsa.sender)
+
+    def interest_handler(self, data_type, message):
         """
-        Callback for interest packets. This will be called by SocketCommunication object.
+        Handler for interest packets. This will be called by dispatch_packet.
         This will handle PIT updates and interest propagation.
         """
-        data_type, message = self._decode_data(data)
 
         if data_type == 2:
             self.packet_counters["in"]["interest"] += 1
-            self.last_10_packets.append(
-                f"[IN INTEREST]\nDECRYPT:{message.get_string()}\n"
-            )
 
             # Check if I sent the original interest
             if self.originator_callback(message.data_address, message.request_id, None):
                 return
 
             # Check if I own the data
-            sensor_data = self.sensor_data_callback(message.data_address)
+            with self._stage("sensor_lookup", "interest"):
+                sensor_data = self.produce(message.data_address)
 
             # Check if am gateway and this is gateway interest
             if (
                 self.gateway
-                and self.gateway_details[2] in message.data_address
+                and self.gateway_prefixes.longest_prefix_match(message.data_address)
                 and message.data_address not in self.gpit
             ):
                 self.gpit[message.data_address] = {
@@ -545,60 +1473,91 @@ class Network:
                     "retry_index": message.retry_index,
                     "neighbor_label": message.label,
                 }
+                self.timers.schedule(
+                    ("gpit", message.data_address),
+                    self.interest_lifetime,
+                    self._expire_entry,
+                )
 
                 self.send_over_gateway(message.data_address)
 
             if sensor_data:
                 # print(f"I own the data {message.data_address} : {sensor_data}")
-                self.send_data(
-                    message.label,
-                    message.data_address,
-                    message.request_id,
-                    message.retry_index,
-                    sensor_data,
-                )
+                with self._stage("send_data", "interest"):
+                    self.send_data(
+                        message.label,
+                        message.data_address,
+                        message.request_id,
+                        message.retry_index,
+                        sensor_data,
+                    )
+                return
+
+            # Answer from Content Store if a fresh copy was forwarded through this node
+            with self._stage("content_store", "interest"):
+                cached_data = self.content_store.lookup(message.data_address)
+            if cached_data is not None:
+                with self._stage("send_data", "interest"):
+                    self.send_data(
+                        message.label,
+                        message.data_address,
+                        message.request_id,
+                        message.retry_index,
+                        cached_data,
+                        counter="data_cache",
+                    )
 
             # Forward interest message
             else:
-                # Detect interest loop (duplicate interest)
-                if (
-                    message.data_address,
-                    message.request_id,
-                    message.retry_index,
-                ) in self.pit:
-                    ...  # Drop interest (do nothing)
-                # New interest or retry interest
-                else:
-                    self.pit[
-                        (message.data_address, message.request_id, message.retry_index)
-                    ] = message.label
-                    self.forward_interests(
+                with self._stage("pit_update", "interest"):
+                    action = self.pit.add_interest(
                         message.data_address,
-                        message.retry_index,
-                        message.request_id,
                         message.label,
+                        message.request_id,
+                        message.retry_index,
                     )
+                    if action == PIT.FORWARD:
+                        self.timers.schedule(
+                            ("pit", message.data_address),
+                            self.interest_lifetime,
+                            self._expire_entry,
+                        )
+                # New interest or retry interest
+                if action == PIT.FORWARD:
+                    with self._stage("forward", "interest"):
+                        self.forward_interests(
+                            message.data_address,
+                            message.retry_index,
+                            message.request_id,
+                            message.label,
+                        )
+                # Same name already pending upstream, data will be fanned out to this face
+                elif action == PIT.AGGREGATED:
+                    self.packet_counters["in"]["interest_aggregated"] += 1
+                # Detected interest loop (duplicate interest) -> drop
 
-    def data_handler(self, data):
+    def data_handler(self, data_type, message):
         """
-        Callback for data packets. This will be called by SocketCommunication object.
+        Handler for data packets. This will be called by dispatch_packet.
         This will handle PIT updates and data propagation.
         """
-        data_type, message = self._decode_data(data)
 
         if data_type == 1:
             self.packet_counters["in"]["data"] += 1
-            self.last_10_packets.append(f"[IN DATA]\nDECRYPT:{message.get_string()}\n")
-
-            if not self.originator_callback(
+            requested = self.originator_callback(
                 message.data_address, message.request_id, message.data
-            ):
-                self.forward_data(
-                    message.data_address,
-                    message.request_id,
-                    message.retry_index,
-                    message.data,
-                )
+            )
+            # fan out to consumers aggregated here, also when this node is the originator
+            with self._stage("forward", "data"):
+                if self.forward_data(message.data_address, message.data):
+                    requested = True
+
+            # only cache Data some interest asked for, anyone could push unsolicited Data
+            if not requested:
+                self.packet_counters["in"]["data_unsolicited"] += 1
+                return
+            with self._stage("content_store", "data"):
+                self.content_store.insert(message.data_address, message.data)
 
     def gateway_handler(self, packet):
         """
@@ -609,50 +1568,82 @@ class Network:
         if not self.gateway:
             return
 
-        packet_ = packet.split("|")
-        decrypted_packet = crypto.decrypt_data(self.gateway_private_key, packet_[1])
-
+        decoded = self._decode_gateway_packet(packet)
         # If decryption was successful then peer has encrypted with invalid private key
-        if not decrypted_packet:
+        if decoded is None:
             return
+        packet_type, data_address, data = decoded
 
         # EG packet
-        if packet_[0] == "EG":
-            data_address = decrypted_packet
+        if packet_type == "EG":
             request_id = self.originate_interest(data_address, 0)
             self.gateway_client_requests[(data_address, request_id)] = False
+            # answered entries are kept until expiry to suppress duplicate replies
+            self.timers.schedule(
+                ("gateway_client_requests", (data_address, request_id)),
+                self.interest_lifetime,
+                self._expire_entry,
+            )
 
         # EG_REPLY packet
-        if packet_[0] == "EG_REPLY":
-            decrypted_packet = decrypted_packet.split("|")
-            data_address, data = decrypted_packet[0], decrypted_packet[1]
-            if data_address in self.gpit:
-                request_id = self.gpit[data_address]["request_id"]
-                retry_index = self.gpit[data_address]["retry_index"]
-                neighbor_label = self.gpit[data_address]["neighbor_label"]
+        if packet_type == "EG_REPLY":
+            # claimed in one step, the entry may expire on the timer thread meanwhile
+            entry = self.gpit.pop(data_address, None)
+            if entry is not None:
+                self.timers.cancel(("gpit", data_address))
+                self.content_store.insert(data_address, data)
+                request_id = entry["request_id"]
+                retry_index = entry["retry_index"]
+                neighbor_label = entry["neighbor_label"]
 
                 message_obj = DataMessage(
                     self.label, data_address, request_id, retry_index, data
                 )
-                payload = message_obj.get_string()
-                encrypted_payload = message_obj.get_encrypted_string(
-                    self.neighbor_table.table[neighbor_label].public_key
-                )
-
-                self.comm.send(
-                    self.neighbor_table.table[neighbor_label].tcp_ip,
-                    self.neighbor_table.table[neighbor_label].tcp_port,
-                    encrypted_payload,
-                )
-                self.packet_counters["out"]["data_fwd"] += 1
-                self.last_10_packets.append(
-                    f"[FWD DATA]\nPLAIN: {payload}\nENCRYPT: {encrypted_payload}\n"
-                )
-                self.gpit.pop(data_address)
+                row = self.neighbor_table.table.get(neighbor_label)
+                # the requesting neighbor may have aged out meanwhile
+                if row is not None:
+                    encrypted_payload = self._encrypt_for(neighbor_label, row, message_obj)
+                    self.comm.send(row.tcp_ip, row.tcp_port, encrypted_payload)
+                    self.packet_counters["out"]["data_fwd"] += 1
+                    self.capture.record(
+                        "out", "data_fwd", message_obj, encrypted_payload, neighbor_label
+                    )
+            else:
+                self.packet_counters["in"]["data_unsolicited"] += 1
 
 
-def euclidean_distance(p1, p2):
-    return sqrt((p1[0] - p2[0]) ** 2 + (p1[1] - p2[1]) ** 2)
+    def _decode_gateway_packet(self, packet):
+        """
+        Decrypt EG / EG_REPLY packet in either wire format. Returns (type, data address, data)
+        or None.
+        """
+        try:
+            if tlv.is_tlv(packet):
+                packet_id, value = tlv.decode_packet(packet)
+                payload = crypto.decrypt_bytes(
+                    self.gateway_private_key, tlv.decode_elements(value)[tlv.PAYLOAD]
+                )
+                if not payload:
+                    return None
+                self.gateway_peer_tlv = True
+                elements = tlv.decode_elements(payload)
+                data_address = tlv.get_string(elements, tlv.NAME)
+                if packet_id == constants.EG_REPLY_ID:
+                    return "EG_REPLY", data_address, tlv.get_string(elements, tlv.CONTENT)
+                return "EG", data_address, None
+
+            packet_ = str(packet, "utf-8").split("|")
+            decrypted_packet = crypto.decrypt_data(self.gateway_private_key, packet_[1])
+            if not decrypted_packet:
+                return None
+            if f"tlv:{tlv.WIRE_VERSION}" in packet_[2:]:
+                self.gateway_peer_tlv = True
+            if packet_[0] == "EG_REPLY":
+                data_address, data = decrypted_packet.split("|", 1)
+                return "EG_REPLY", data_address, data
+            return packet_[0], decrypted_packet, None
+        except (tlv.TLVError, KeyError, ValueError, IndexError, UnicodeDecodeError):
+            return None
 
 
 class Node(multiprocessing.Process):
@@ -681,19 +1672,37 @@ class Node(multiprocessing.Process):
         gateway=False,
         gateway_key_path=None,
         gateway_details=None,
+        engine=constants.COMM_ENGINE,
+        transport=constants.TRANSPORT,
+        mgmt_replies=None,
+        node_keys=None,
+        member_private_key=None,
+        gateway_private_key=None,
     ):
         super().__init__()
         self.x = x
         self.y = y
         self.label = label
         self.hello_delay = hello_delay
+        # UDP transport runs its own selector thread, engine only applies to TCP
+        self.engine = engine if transport == "tcp" else "thread"
 
-        comm = SocketCommunication(address, port)
+        comm = create_comm(address, port, engine, transport)
         cert = "ULTRA_CERT"
         self.sensor_data = MedicalSensorSystem()
         hello_message = HelloMessage(label=label, ip=address, port=port, cert=cert)
         self.data_address = data_address
+        # (data address, request id) -> [answered, first sent, retries, first retry index]
         self.client_requests = {}
+        self.rtt = RttEstimator(
+            constants.INITIAL_RTO,
+            constants.MIN_RTO,
+            constants.MAX_RTO,
+            constants.RTT_HISTORY,
+        )
+        self.retransmission_counters = {"sent": 0, "answered": 0, "retries": 0, "timeouts": 0}
+        # shared by the k nearest search of the network and the mobility tracker
+        node_index = GridIndex.from_nodes(all_nodes)
         self.ndn = Network(
             label,
             all_nodes,
@@ -705,14 +1714,89 @@ class Node(multiprocessing.Process):
             gateway,
             gateway_key_path,
             gateway_details,
+            node_keys=node_keys,
+            member_private_key=member_private_key,
+            node_index=node_index,
+            gateway_private_key=gateway_private_key,
         )
-        self.ndn.sensor_data_callback = self.sensor_handler
+        self.mobility = create_mobility(
+            constants.MOBILITY,
+            all_nodes,
+            constants.GRID_DIMENSIONS,
+            constants.MOBILITY_SPEED,
+            constants.MOBILITY_PAUSE,
+            constants.MOBILITY_SEED,
+        )
+        # positions and k nearest of all nodes, every process moves them the same way
+        self.neighbor_tracker = NeighborTracker(node_index, k) if self.mobility else None
+        self.ndn.register_producer(data_address, self.sensor_handler)
         self.ndn.originator_callback = self.originator_handler
         self.mgmt = mgmt
+        # replies to management calls, shared by all nodes of the CLI
+        self.mgmt_replies = mgmt_replies
+        self.scheduler = Scheduler()
+        self.state_exporter = StateExporter(
+            f"stats/{self.label}",
+            self.label,
+            deltas=constants.STATE_EXPORT_DELTAS,
+            # timings differ on every export, not worth a write on their own
+            volatile=("decode_timings", "metrics", "scheduler", "state_export"),
+            sink=self.push_state,
+            snapshot_interval=constants.STATE_SNAPSHOT_INTERVAL,
+        )
+        self.stats_socket = None
+
+    @staticmethod
+    def rtt_prefix(data_address):
+        return join_name(split_name(data_address)[: constants.RTT_PREFIX_COMPONENTS])
 
     def originate_interest(self, data_address, retry_index):
         request_id = self.ndn.originate_interest(data_address, retry_index)
-        self.client_requests[(data_address, request_id)] = [False, time.time()]
+        self.client_requests[(data_address, request_id)] = [
+            False,
+            time.time(),
+            0,
+            retry_index,
+        ]
+        self.retransmission_counters["sent"] += 1
+        self.ndn.timers.schedule(
+            ("client_requests", (data_address, request_id)),
+            self.rtt.rto(self.rtt_prefix(data_address)),
+            self.client_request_expired,
+        )
+        return request_id
+
+    def client_request_expired(self, key):
+        """
+        Timeout event for an interest this node originated. Unanswered requests are
+        retransmitted with an increasing retry index (above the one of the first transmission,
+        so PITs don't drop them as duplicates) and backed off timeout until MAX_RETRIES, then
+        reported as timed out. Answered requests are only removed.
+        """
+        _, (data_address, request_id) = key
+        request = self.client_requests.get((data_address, request_id))
+        if request is None:
+            return
+        answered, _, retries, retry_index = request
+        if not answered and retries < constants.MAX_RETRIES:
+            request[2] = retries = retries + 1
+            self.retransmission_counters["retries"] += 1
+            self.ndn.originate_interest(data_address, retry_index + retries, request_id)
+            self.ndn.timers.schedule(
+                key,
+                self.rtt.rto(self.rtt_prefix(data_address), retries),
+                self.client_request_expired,
+            )
+            return
+
+        self.client_requests.pop((data_address, request_id), None)
+        self.ndn.expiry_counters["client_requests"] += 1
+        if not answered:
+            self.retransmission_counters["timeouts"] += 1
+            print(
+                f"[Interest timed out after {retries} retries] {data_address}\n",
+                flush=True,
+            )
 
     def originator_handler(self, data_address, request_id, data):
         """
@@ -721,277 +1805,393 @@ class Node(multiprocessing.Process):
         Interest handler: check if I sent the original request and don't forward again (leave data as None)
         Data handler: check if I sent the original request and print the data (pass data value so it gets printed)
         """
-        # Check if I originally sent the request
-        if (data_address, request_id) in self.client_requests:
+        # Check if I originally sent the request, one lookup as the scheduler may expire it
+        request = self.client_requests.get((data_address, request_id))
+        if request is not None:
             # If I have not yet received reply then print data
-            if not self.client_requests[(data_address, request_id)][0] and data:
-                self.client_requests[(data_address, request_id)][0] = True
-                round_trip = round(
-                    (time.time() - self.client_requests[(data_address, request_id)][1])
-                    * 1000
+            if not request[0] and data:
+                request[0] = True
+                round_trip = time.time() - request[1]
+                prefix = self.rtt_prefix(data_address)
+                self.rtt.add_sample(prefix, round_trip, retransmitted=request[2] > 0)
+                self.ndn.metrics.observe(
+                    metrics.RTT_SECONDS, (("prefix", prefix),), round_trip
+                )
+                self.retransmission_counters["answered"] += 1
+                # keep the entry a while so late copies and loops are still recognized
+                self.ndn.timers.schedule(
+                    ("client_requests", (data_address, request_id)),
+                    self.ndn.interest_lifetime,
+                    self.client_request_expired,
                 )
+                retries = f", {request[2]} retries" if request[2] else ""
                 print(
-                    f"[Sensor value received in {round_trip}ms] {data_address} = {data}\n",
+                    f"[Sensor value received in {round(round_trip * 1000)}ms{retries}] {data_address} = {data}\n",
                     flush=True,
                 )
             return True
         # Check if the originator was a gateway forward
-        elif (data_address, request_id) in self.ndn.gateway_client_requests:
-            if (
-                not self.ndn.gateway_client_requests[(data_address, request_id)]
-                and data
-            ):
+        answered = self.ndn.gateway_client_requests.get((data_address, request_id))
+        if answered is not None:
+            if not answered and data:
                 self.ndn.gateway_client_requests[(data_address, request_id)] = True
                 self.ndn.send_over_gateway(data_address, data)
             return True
         return False
 
     def sensor_handler(self, data_address):
-        if self.data_address in data_address:
-            data_address = data_address.replace(self.data_address, "")
-            data = self.sensor_data.generate_json_string(data_address)
-            return data
+        """
+        Producer callback for names under this node's data address, data_address is the part
+        after it (eg. "heartrate/ecg").
+        """
+        return self.sensor_data.generate_json_string(data_address)
+
+    def move_nodes(self):
+        """
+        Advance the mobility model to the current time, update own position and k nearest.
+        """
+        moves = self.mobility.positions(self.scheduler.clock() - self.scheduler.started)
+        if not moves:
+            return
+        changed = self.neighbor_tracker.update(moves)
+        if self.label in moves or self.label in changed:
+            self.x, self.y = moves.get(self.label, (self.x, self.y))
+            self.ndn.move_to((self.x, self.y), self.neighbor_tracker.nearest[self.label])
+
+    def get_state(self):
+        """
+        Current node state and statistics, as exported to the stats file.
+        """
+        return {
+            "x": self.x,
+            "y": self.y,
+            "comm": {
+                "server_ip": self.ndn.comm.address,
+                "server_port": self.ndn.comm.port,
+            },
+            "comms_enabled": self.ndn.comm.comms_enabled,
+            "gw_node": {
+                "is_node_marked": self.ndn.gateway,
+                "peer_connection": self.ndn.gateway_details[:2]
+                if self.ndn.gateway
+                else [],
+            },
+            "packet_counters": self.ndn.packet_counters,
+            "decode_timings": self.ndn.decode_timings,
+            "metrics": self.ndn.metrics.stats(),
+            "wire_format": self.ndn.wire_counters,
+            "hello_cache": self.ndn.hello_cache.stats(),
+            "content_store": self.ndn.content_store.stats(),
+            "tables": dict(
+                self.ndn.table_sizes(),
+                client_requests=len(self.client_requests),
+            ),
+            "expired": self.ndn.expiry_counters,
+            "routing": self.ndn.routing.stats(),
+            "mobility": self.ndn.mobility_counters,
+            "scheduler": self.scheduler.stats(),
+            "state_export": self.state_exporter.stats(),
+            "retransmission": dict(
+                self.rtt.stats(), counters=self.retransmission_counters
+            ),
+            "data_address": self.data_address,
+            "label": self.label,
+            "ndn": {
+                "fib": [
+                    {
+                        "label": nei,
+                        "hello_count": row.hello_count,
+                        "session_epoch": row.session_epoch,
+                        "link_failures": row.health.failures if row.health else 0,
+                    }
+                    for nei, row in list(self.ndn.neighbor_table.table.items())
+                ],
+                "pit": [
+                    {
+                        "data_address": data_address,
+                        "request_id": request_id,
+                        "retry_index": retry_index,
+                        "label": label,
+                    }
+                    for data_address, label, request_id, retry_index in self.ndn.pit.rows()
+                ],
+            },
+        }
+
+    def push_state(self, record):
+        """
+        Push exported state record to the stats aggregator of this host. Best effort, the
+        aggregator reloads missed updates from the stats file.
+        """
+        if self.stats_socket is None:
+            self.stats_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            self.stats_socket.sendto(record, constants.STATS_AGGREGATOR_ADDRESS)
+        except OSError:
+            pass
 
     def save_state(self):
         if not os.path.exists("stats"):
             # Create the directory if it doesn't exist
             os.makedirs("stats")
-        with open(f"stats/{self.label}", "w") as file:
-            file.write(
-                json.dumps(
-                    {
-                        self.label: {
-                            "x": self.x,
-                            "y": self.y,
-                            "comm": {
-                                "server_ip": self.ndn.comm.address,
-                                "server_port": self.ndn.comm.port,
-                            },
-                            "comms_enabled": self.ndn.comm.comms_enabled,
-                            "gw_node": {
-                                "is_node_marked": self.ndn.gateway,
-                                "peer_connection": self.ndn.gateway_details[:2]
-                                if self.ndn.gateway
-                                else [],
-                            },
-                            "packet_counters": self.ndn.packet_counters,
-                            "last_10_packets": list(self.ndn.last_10_packets),
-                            "data_address": self.data_address,
-                            "label": self.label,
-                            "ndn": {
-                                "fib": [
-                                    {
-                                        "label": nei,
-                                        "hello_count": self.ndn.neighbor_table.table[
-                                            nei
-                                        ].hello_count,
-                                    }
-                                    for nei in self.ndn.neighbor_table.table
-                                ],
-                                "pit": [
-                                    {
-                                        "data_address": data_address,
-                                        "request_id": request_id,
-                                        "retry_index": retry_index,
-                                        "label": self.ndn.pit[
-                                            (data_address, request_id, retry_index)
-                                        ],
-                                    }
-                                    for data_address, request_id, retry_index in self.ndn.pit
-                                ],
-                            },
-                        }
-                    },
-                    indent=2,
-                )
+        self.state_exporter.export(self.get_state())
+
+    def mgmt_fib(self):
+        return [
+            {
+                "label": neighbor_label,
+                "ip": row.tcp_ip,
+                "port": row.tcp_port,
+                "hello_count": row.hello_count,
+                "link": "up" if not row.health or row.health.healthy else "down",
+            }
+            for neighbor_label, row in list(self.ndn.neighbor_table.table.items())
+        ]
+
+    def mgmt_pit(self):
+        return [
+            {
+                "label": label,
+                "data_address": data_address,
+                "request_id": request_id,
+                "retry_index": retry_index,
+            }
+            for data_address, label, request_id, retry_index in self.ndn.pit.rows()
+        ]
+
+    def mgmt_routes(self):
+        routes = []
+        for origin in sorted(self.ndn.routing.lsdb):
+            distance, next_hops = self.ndn.routing.routes.get(origin, (None, []))
+            routes.append(
+                {
+                    "origin": origin,
+                    "distance": 0 if origin == self.label else distance,
+                    "next_hops": sorted(next_hops),
+                    "prefixes": sorted(self.ndn.routing.lsdb[origin].prefixes),
+                }
             )
+        return routes
+
+    def mgmt_counters(self):
+        return {
+            "in": self.ndn.packet_counters["in"],
+            "out": self.ndn.packet_counters["out"],
+            "transport": self.ndn.packet_counters["transport"],
+            "content_store": self.ndn.content_store.stats(),
+        }
 
-    def run(self):
+    def mgmt_knn(self):
+        return [
+            {"label": label, "ip": ip, "port": port}
+            for label, (ip, port) in self.ndn.k_nearest.items()
+        ]
+
+    def mgmt_set_comms(self, enabled):
+        self.ndn.comm.comms_enabled = enabled
+        return enabled
+
+    def mgmt_gateway(self):
+        return {
+            "gateway": self.ndn.gateway,
+            "peer_connection": list(self.ndn.gateway_details[:2])
+            if self.ndn.gateway
+            else [],
+        }
+
+    def mgmt_configure_capture(self, config=None):
         """
-        Main Application loop.
+        Change capture sampling and filters (dict with sample_every, packet_types, directions,
+        name_prefix), returns the capture stats.
         """
+        if config is not None:
+            self.ndn.capture.configure(**config)
+        return self.ndn.capture.stats()
 
-        # start TCP listener
-        self.ndn.comm.listen()
-
-        # Send initial hellos to pre-populate tables
-        # self.ndn.send_hellos()
-        # time.sleep(self.hello_delay + 2)
+    def mgmt_send_interest(self, data_address, retry_index=0):
+        return self.originate_interest(data_address, retry_index)
 
-        # Main loop:
-        flip = 0
-        while True:
-            self.ndn.send_hellos()
-            time.sleep(self.hello_delay)
-
-            # decrement hello counts after two cycles
-            if flip > 0:
-                self.ndn.neighbor_table.update_counts()
-                flip = 0
-            else:
-                flip += 1
-
-            # Handle mgmt commands if any
-            if not self.mgmt.empty():
-                task = self.mgmt.get()
-                # print("MGMT task:", task, flush=True)
-
-                if task["call"] == "send_interest_packet":
-                    self.originate_interest(task["args"][0], task["args"][1])
-
-                elif task["call"] == "print_fib":
-                    table = prettytable.PrettyTable()
-                    table.field_names = ["Label", "TCP IP", "TCP Port"]
-                    # print(f"FIB:{self.ndn.neighbor_table}")
-                    for neighbor_label in self.ndn.neighbor_table.table:
-                        table.add_row(
-                            [
-                                neighbor_label,
-                                self.ndn.neighbor_table.table[neighbor_label].tcp_ip,
-                                self.ndn.neighbor_table.table[neighbor_label].tcp_port,
-                            ]
-                        )
-                    print("\nFIB")
-                    print(table)
-
-                elif task["call"] == "print_pit":
-                    table = prettytable.PrettyTable()
-                    table.field_names = ["Label", "Data address", "Request ID", "Retry"]
-                    for data_address, request_id, retry_index in self.ndn.pit:
-                        neighbor_label = self.ndn.pit[
-                            (data_address, request_id, retry_index)
-                        ]
-                        table.add_row(
-                            [neighbor_label, data_address, request_id, retry_index]
-                        )
-                    print("\nPIT")
-                    print(table)
-
-                elif task["call"] == "print_counters":
-                    table = prettytable.PrettyTable()
-                    table.field_names = ["Packet", "Count"]
-                    table.align["Packet"] = "l"
-                    table.align["Count"] = "l"
-                    for counter in self.ndn.packet_counters["in"]:
-                        table.add_row(
-                            [counter.upper(), self.ndn.packet_counters["in"][counter]]
-                        )
-                    print("\nINPUT")
-                    print(table)
-                    table = prettytable.PrettyTable()
-                    table.field_names = ["Packet", "Count"]
-                    table.align["Packet"] = "l"
-                    table.align["Count"] = "l"
-                    for counter in self.ndn.packet_counters["out"]:
-                        table.add_row(
-                            [counter.upper(), self.ndn.packet_counters["out"][counter]]
-                        )
-                    print("\nOUTPUT")
-                    print(table)
-
-                elif task["call"] == "print_knn":
-                    table = prettytable.PrettyTable()
-                    table.field_names = ["Label", "TCP IP", "TCP Port"]
-
-                    for neighbor_label in self.ndn.k_nearest:
-                        table.add_row(
-                            [
-                                neighbor_label,
-                                self.ndn.k_nearest[neighbor_label][0],
-                                self.ndn.k_nearest[neighbor_label][1],
-                            ]
-                        )
-                    print("\nKNN")
-                    print(table)
-
-                elif task["call"] == "print_last_10":
-                    print("\nLAST 10 Data & Interest packets")
-                    for packet in self.ndn.last_10_packets:
-                        print(packet)
+    def mgmt_calls(self):
+        """
+        Management calls by name, each returns plain (JSON serializable) data.
+        """
+        return {
+            "send_interest": self.mgmt_send_interest,
+            "fib": self.mgmt_fib,
+            "pit": self.mgmt_pit,
+            "routes": self.mgmt_routes,
+            "counters": self.mgmt_counters,
+            "knn": self.mgmt_knn,
+            "packets": self.ndn.capture.view,
+            "capture": self.mgmt_configure_capture,
+            "state": self.get_state,
+            "metrics": lambda: metrics.render_prometheus(
+                [({"node": self.label}, self.ndn.metrics.stats())]
+            ),
+            "comms": lambda: self.ndn.comm.comms_enabled,
+            "start_comms": lambda: self.mgmt_set_comms(True),
+            "stop_comms": lambda: self.mgmt_set_comms(False),
+            "gateway": self.mgmt_gateway,
+            "public_key": lambda: crypto.str_public_key(self.ndn.public_key),
+            "private_key": lambda: crypto.str_private_key(self.ndn.private_key),
+            "member_private_key": lambda: crypto.str_private_key(
+                self.ndn.member_private_key
+            ),
+            "gateway_private_key": lambda: crypto.str_private_key(
+                self.ndn.gateway_private_key
+            ),
+        }
 
-                elif task["call"] == "print_public_key":
-                    print("\nNODE PUBLIC KEY")
-                    print(crypto.str_public_key(self.ndn.public_key))
+    def handle_mgmt_task(self, task):
+        """
+        Execute one management call {"id", "call", "args"} received over the mgmt queue and put
+        the result (or error) on the replies queue.
+        """
+        call = self.mgmt_calls().get(task["call"])
+        try:
+            if call is None:
+                raise ValueError(f"unknown call {task['call']}")
+            reply = {"result": call(*task.get("args", ()))}
+        except Exception as error:
+            reply = {"error": f"{type(error).__name__}: {error}"}
 
-                elif task["call"] == "print_private_key":
-                    print("\nNODE PRIVATE KEY")
-                    print(crypto.str_private_key(self.ndn.private_key))
+        if "id" in task and self.mgmt_replies is not None:
+            self.mgmt_replies.put(dict(reply, id=task["id"], label=self.label))
 
-                elif task["call"] == "print_member_private_key":
-                    print("\nMEMBERSHIP KEY")
-                    print(crypto.str_private_key(self.ndn.member_private_key))
+    def run(self):
+        """
+        Main Application loop.
+        """
+        if self.engine == "asyncio":
+            asyncio.run(self._run_async())
+            return
 
-                elif task["call"] == "print_gateway_private_key":
-                    print("\GATEWAY KEY")
-                    print(crypto.str_private_key(self.ndn.gateway_private_key))
+        # start TCP listener
+        self.ndn.comm.listen()
 
-                elif task["call"] == "start_comms":
-                    print(f"\nEnabling Comms for node {self.label}")
-                    self.ndn.comm.comms_enabled = True
+        # Main loop: timers, woken up right away by mgmt commands
+        self._schedule_timers()
+        self.scheduler.run(self._wait_mgmt_task, self.handle_mgmt_task)
+
+    def _schedule_timers(self):
+        self.scheduler.started = self.scheduler.clock()
+        self.scheduler.call_every(self.hello_delay, self.ndn.send_hellos, "hello")
+        # decrement hello counts every FIB_AGING_HELLO_INTERVALS hello cycles
+        aging_interval = self.hello_delay * constants.FIB_AGING_HELLO_INTERVALS
+        self.scheduler.call_every(
+            aging_interval, self.ndn.age_neighbors, "fib_aging", aging_interval
+        )
+        # Expire PIT, GPIT, LSA and client request entries
+        self.scheduler.call_every(
+            constants.TIMER_TICK, self.ndn.timers.advance, "table_expiry"
+        )
+        self.scheduler.call_every(
+            constants.STATS_EXPORT_INTERVAL,
+            self.save_state,
+            "stats_export",
+            constants.STATS_EXPORT_INTERVAL,
+        )
+        if self.mobility:
+            self.scheduler.call_every(
+                constants.MOBILITY_TICK, self.move_nodes, "mobility", constants.MOBILITY_TICK
+            )
 
-                elif task["call"] == "stop_comms":
-                    print(f"\nDisabling Comms for node {self.label}")
-                    self.ndn.comm.comms_enabled = False
+    def _wait_mgmt_task(self, timeout):
+        try:
+            return self.mgmt.get(timeout=timeout)
+        except queue.Empty:
+            return None
 
-                elif task["call"] == "print_state":
-                    print(f"\nNode {self.label} state = {self.ndn.comm.comms_enabled}")
+    async def _run_timers_async(self):
+        while True:
+            await asyncio.sleep(self.scheduler.time_until_next())
+            self.scheduler.run_due()
 
-                elif task["call"] == "print_gateway":
-                    if self.ndn.gateway:
-                        print(f"\nGateway Node: {self.label}")
-                        print("Peer connection:", self.ndn.gateway_details[:2])
+    async def _run_async(self):
+        """
+        Main Application loop for the asyncio engine. Timers, the mgmt queue and all socket
+        I/O run on one event loop.
+        """
+        loop = asyncio.get_running_loop()
+        await self.ndn.comm.start()
 
-                print()
+        self._schedule_timers()
+        loop.create_task(self._run_timers_async())
 
-            self.save_state()
+        # mgmt queue is a blocking multiprocessing queue, wait for it in an executor thread
+        while True:
+            task = await loop.run_in_executor(None, self.mgmt.get)
+            self.scheduler.run_event(self.handle_mgmt_task, task)
 
 
 class SocketCommunication:
     """
     Manages threads for TCP server and clients.
+    Outgoing packets reuse long lived connections from the connection pool.
     """
 
     def __init__(self, address, port) -> None:
         self.address = address
         self.port = port
-        self.callbacks = []
+        self.packet_callback = None
         self.gateway_callback = None
         self.comms_enabled = True
+        # replaced by the metrics of the node
+        self.metrics = metrics.DISABLED
+        self.pool = ConnectionPool(
+            constants.CONNECT_TIMEOUT,
+            constants.SEND_TIMEOUT,
+            constants.IDLE_CONNECTION_TIMEOUT,
+            constants.RECONNECT_BACKOFF,
+            constants.MAX_RECONNECT_BACKOFF,
+        )
+        self.counters = self.pool.counters
+        self.counters["packet_errors"] = 0
 
-    def register_callback(self, callback):
-        self.callbacks.append(callback)
+    def get_health(self, dest):
+        return self.pool.get_health(dest)
 
     def send(self, dest_address, dest_port, data):
-        if self.comms_enabled:
-            client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        with self.metrics.time(metrics.SEND_SECONDS, (("transport", "tcp"),)):
+            return self._send(dest_address, dest_port, data)
 
+    def _send(self, dest_address, dest_port, data):
+        if self.comms_enabled:
             # print(f"Sending message '{data}' to {(dest_address, dest_port)}")
-            try:
-                client_socket.connect((dest_address, dest_port))
-            except Exception:
-                ...
-                # print(f"Can't connect to {(dest_address, dest_port)}")
+            if isinstance(data, str):
+                data = data.encode("utf-8")
+            return self.pool.send((dest_address, dest_port), encode_frame(data))
+        return False
+
+    def _handle_packet(self, data):
+        try:
+            # If gateway packet, execute gateway callback
+            if tlv.is_gateway_packet(data):
+                self.gateway_callback(data)
+            # Else, hand over to packet dispatcher
             else:
-                client_socket.send(data.encode("utf-8"))
+                self.packet_callback(data)
+        except Exception:
+            # malformed packet, must not end the connection it came in on
+            self.counters["packet_errors"] += 1
 
     def _handle_incoming_packet(self, peer_connection, peer_address):
         """
-        Decodes received data and passes it to all registered callbacks.
-
+        Reads length prefixed frames from a (persistent) peer connection until it is closed.
+        Each frame is one packet and is passed to the packet or gateway callback.
         """
-        if self.comms_enabled:
-            data = peer_connection.recv(2048).decode("utf-8")
-            # print(f"Received message '{data}' from {peer_address}")
-
-            # If gateway packet, execute gateway callback
-            if data[:2] == "EG":
-                self.gateway_callback(data)
-            # Else, execute all other registered callbacks
-            else:
-                for callback in self.callbacks:
-                    callback(data)
-        else:
-            peer_connection.close()
+        reader = FrameReader(constants.MAX_FRAME_SIZE, constants.RECEIVE_BUFFER_SIZE)
+        with peer_connection:
+            while self.comms_enabled:
+                try:
+                    if not reader.recv_from(peer_connection):
+                        break
+                    for frame in reader.frames():
+                        # print(f"Received message '{frame}' from {peer_address}")
+                        self._handle_packet(frame)
+                except (OSError, FrameError):
+                    # oversized or garbage frame, drop the connection
+                    break
 
     def _listen_thread(self):
         """
@@ -1013,6 +2213,19 @@ class SocketCommunication:
         """
         # print(f"Listening on {self.address}:{self.port}")
         self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         self.server_socket.bind((self.address, self.port))
-        self.server_socket.listen(5)
+        self.server_socket.listen(constants.SERVER_BACKLOG)
         threading.Thread(target=self._listen_thread).start()
+
+
+def create_comm(address, port, engine, transport="tcp"):
+    """
+    Communication object for the selected transport ("tcp" or "udp") and, for TCP, the
+    selected engine ("thread" or "asyncio").
+    """
+    if transport == "udp":
+        return UDPCommunication(address, port)
+    if engine == "asyncio":
+        return AsyncSocketCommunication(address, port)
+    return SocketCommunication(address, port)
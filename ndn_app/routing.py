@@ -0,0 +1,192 @@
+from name_trie import NameTrie
+
+import heapq
+import threading
+
+
+class LSA:
+    """
+    Link state advertisement of one node: its current neighbors and the name prefixes it
+    serves. Signed by the origin with the membership key, the sender changes on every hop.
+
+    [5][SENDER][ORIGIN][SEQ][NEIGHBOR,NEIGHBOR,..][PREFIX|PREFIX|..][MEMBER_SIGN]
+    """
+
+    def __init__(self, origin, seq, neighbors, prefixes, member_sign=None, sender=None):
+        self.origin = origin
+        self.seq = seq
+        self.neighbors = frozenset(neighbors)
+        self.prefixes = frozenset(prefixes)
+        self.member_sign = member_sign
+        self.sender = sender
+
+    def __repr__(self) -> str:
+        return f"(origin={self.origin} seq={self.seq} neighbors={sorted(self.neighbors)})"
+
+    def get_body(self):
+        # empty fields can't be parsed, "-" marks an empty list
+        neighbors = ",".join(str(label) for label in sorted(self.neighbors)) or "-"
+        prefixes = "|".join(sorted(self.prefixes)) or "-"
+        return f"[{self.origin}][{self.seq}][{neighbors}][{prefixes}]"
+
+    def get_string(self, sender):
+        return f"[5][{sender}]{self.get_body()}[{self.member_sign}]"
+
+    @classmethod
+    def from_fields(cls, fields):
+        """
+        Build LSA from parsed packet fields (without packet id).
+        """
+        sender, origin, seq, neighbors, prefixes, member_sign = fields
+        return cls(
+            int(origin),
+            int(seq),
+            [int(label) for label in neighbors.split(",")] if neighbors != "-" else [],
+            prefixes.split("|") if prefixes != "-" else [],
+            member_sign=member_sign,
+            sender=int(sender),
+        )
+
+
+class LinkStateRouting:
+    """
+    NLSR style link state routing.
+
+    Keeps the newest LSA of every origin (LSDB), computes shortest paths with Dijkstra over the
+    links both ends advertise and maps served prefixes to next hops. The shortest path tree is
+    only recomputed when an LSA changes the adjacency graph, LSAs that only change prefixes or
+    refresh the sequence number just update the prefix index.
+    """
+
+    def __init__(self, label) -> None:
+        self.label = label
+        self.seq = 0
+        self.lsdb = {}
+        # origin -> (distance, set of next hop neighbor labels)
+        self.routes = {}
+        # prefix -> set of origins serving it
+        self.prefixes = NameTrie()
+        self.lock = threading.Lock()
+        self.counters = {"spf_runs": 0, "stale_lsa": 0, "installed_lsa": 0}
+
+    def originate(self, neighbors, prefixes):
+        """
+        New LSA for this node with the next sequence number, installed in the local LSDB.
+        Caller has to sign and flood it.
+        """
+        self.seq += 1
+        lsa = LSA(self.label, self.seq, neighbors, prefixes)
+        self.install(lsa)
+        return lsa
+
+    def install(self, lsa):
+        """
+        Install LSA if it is newer than the one in the LSDB. Returns True if it was installed
+        (and has to be flooded further).
+        """
+        with self.lock:
+            current = self.lsdb.get(lsa.origin)
+            if current and current.seq >= lsa.seq:
+                self.counters["stale_lsa"] += 1
+                return False
+
+            self.lsdb[lsa.origin] = lsa
+            self.counters["installed_lsa"] += 1
+            self._update_prefixes(current, lsa)
+            if current is None or current.neighbors != lsa.neighbors:
+                self._compute_routes()
+            return True
+
+    def remove(self, origin):
+        """
+        Drop LSA of an origin which stopped refreshing it.
+        """
+        with self.lock:
+            lsa = self.lsdb.pop(origin, None)
+            if lsa is None:
+                return False
+            self._update_prefixes(lsa, None)
+            self._compute_routes()
+            return True
+
+    def _update_prefixes(self, old, new):
+        old_prefixes = old.prefixes if old else frozenset()
+        new_prefixes = new.prefixes if new else frozenset()
+        origin = (old or new).origin
+        for prefix in old_prefixes - new_prefixes:
+            origins = self.prefixes.exact_match(prefix)
+            origins.discard(origin)
+            if not origins:
+                self.prefixes.remove(prefix)
+        for prefix in new_prefixes - old_prefixes:
+            origins = self.prefixes.exact_match(prefix)
+            if origins is None:
+                origins = set()
+                self.prefixes.insert(prefix, origins)
+            origins.add(origin)
+
+    def _links(self, label):
+        """
+        Neighbors of label which also list label as their neighbor.
+        """
+        lsa = self.lsdb.get(label)
+        if lsa is None:
+            return ()
+        return [
+            neighbor
+            for neighbor in lsa.neighbors
+            if neighbor in self.lsdb and label in self.lsdb[neighbor].neighbors
+        ]
+
+    def _compute_routes(self):
+        """
+        Dijkstra from this node with unit link costs. Keeps all equal cost first hops.
+        """
+        self.counters["spf_runs"] += 1
+        distances = {self.label: 0}
+        first_hops = {self.label: set()}
+        heap = [(0, self.label)]
+        visited = set()
+        while heap:
+            distance, label = heapq.heappop(heap)
+            if label in visited:
+                continue
+            visited.add(label)
+            for neighbor in self._links(label):
+                hops = {neighbor} if label == self.label else first_hops[label]
+                if neighbor not in distances or distance + 1 < distances[neighbor]:
+                    distances[neighbor] = distance + 1
+                    first_hops[neighbor] = set(hops)
+                    heapq.heappush(heap, (distance + 1, neighbor))
+                elif distance + 1 == distances[neighbor]:
+                    first_hops[neighbor] |= hops
+
+        self.routes = {
+            label: (distances[label], first_hops[label])
+            for label in distances
+            if label != self.label
+        }
+
+    def next_hops(self, data_address):
+        """
+        Next hops towards the nearest origin serving the longest matching prefix. Returns
+        None if no reachable origin serves the name.
+        """
+        with self.lock:
+            match = self.prefixes.longest_prefix_match(data_address)
+            if match is None:
+                return None
+            reachable = [
+                self.routes[origin] for origin in match[1] if origin in self.routes
+            ]
+            if not reachable:
+                return None
+            nearest = min(distance for distance, _ in reachable)
+            return set().union(
+                *(hops for distance, hops in reachable if distance == nearest)
+            )
+
+    def stats(self):
+        return dict(
+            self.counters, lsdb=len(self.lsdb), routes=len(self.routes), seq=self.seq
+        )
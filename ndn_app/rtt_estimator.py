@@ -0,0 +1,84 @@
+from collections import deque
+
+import math
+import threading
+
+
+class RttEstimator:
+    """
+    Retransmission timeout per name prefix as in RFC 6298: smoothed RTT and RTT variance are
+    updated from every sample, RTO = SRTT + 4 * RTTVAR clamped to [min_rto, max_rto].
+
+    Samples of retransmitted requests are ambiguous (which transmission was answered?), so they
+    only go into the latency history used for percentiles and not into SRTT (Karn's algorithm).
+    """
+
+    ALPHA = 1 / 8
+    BETA = 1 / 4
+
+    class PrefixState:
+        def __init__(self, rtt, min_rto, max_rto):
+            self.srtt = rtt
+            self.rttvar = rtt / 2
+            self.rto = min(max(self.srtt + 4 * self.rttvar, min_rto), max_rto)
+
+    def __init__(self, initial_rto, min_rto, max_rto, history) -> None:
+        self.initial_rto = initial_rto
+        self.min_rto = min_rto
+        self.max_rto = max_rto
+        self.prefixes = {}
+        self.latencies = deque(maxlen=history)
+        self.lock = threading.Lock()
+
+    def rto(self, prefix, retries=0):
+        """
+        Timeout for the next transmission of a request, doubled for every retry (capped).
+        """
+        state = self.prefixes.get(prefix)
+        rto = state.rto if state else self.initial_rto
+        return min(rto * 2**retries, self.max_rto)
+
+    def add_sample(self, prefix, rtt, retransmitted=False):
+        with self.lock:
+            self.latencies.append(rtt)
+            if retransmitted:
+                return
+
+            state = self.prefixes.get(prefix)
+            if state is None:
+                self.prefixes[prefix] = self.PrefixState(rtt, self.min_rto, self.max_rto)
+                return
+            state.rttvar = (1 - self.BETA) * state.rttvar + self.BETA * abs(state.srtt - rtt)
+            state.srtt = (1 - self.ALPHA) * state.srtt + self.ALPHA * rtt
+            state.rto = min(
+                max(state.srtt + 4 * state.rttvar, self.min_rto), self.max_rto
+            )
+
+    def percentiles(self, percents=(50, 90, 99)):
+        """
+        Nearest rank percentiles of the recent latencies in ms, None if there are no samples.
+        """
+        with self.lock:
+            latencies = sorted(self.latencies)
+        if not latencies:
+            return {f"p{percent}": None for percent in percents}
+        return {
+            f"p{percent}": round(
+                latencies[max(math.ceil(len(latencies) * percent / 100) - 1, 0)]
+                * 1000,
+                2,
+            )
+            for percent in percents
+        }
+
+    def stats(self):
+        with self.lock:
+            prefixes = {
+                prefix: {
+                    "srtt_ms": round(state.srtt * 1000, 2),
+                    "rttvar_ms": round(state.rttvar * 1000, 2),
+                    "rto_ms": round(state.rto * 1000, 2),
+                }
+                for prefix, state in self.prefixes.items()
+            }
+        return {"latency_ms": self.percentiles(), "prefixes": prefixes}
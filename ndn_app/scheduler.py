@@ -0,0 +1,135 @@
+import heapq
+import itertools
+import time
+
+
+class Scheduler:
+    """
+    Periodic and one-shot timers of the node main loop, kept on a heap by deadline.
+
+    The loop sleeps until the next deadline or until an external event (a mgmt command) wakes it
+    up. Per timer lag (how late it ran) and loop utilization (share of wall time spent running
+    timers and events) are kept as metrics.
+    """
+
+    class Timer:
+        def __init__(self, name, callback, interval):
+            self.name = name
+            self.callback = callback
+            self.interval = interval
+            self.cancelled = False
+            self.runs = 0
+            self.lag_total = 0.0
+            self.lag_max = 0.0
+            self.busy = 0.0
+
+    def __init__(self, clock=time.monotonic) -> None:
+        self.clock = clock
+        self.heap = []
+        self.sequence = itertools.count()
+        self.timers = {}
+        self.started = clock()
+        self.busy_seconds = 0.0
+        self.events = 0
+
+    def _push(self, deadline, timer):
+        heapq.heappush(self.heap, (deadline, next(self.sequence), timer))
+
+    def call_later(self, delay, callback, name):
+        """
+        Run callback once after delay seconds. Returns timer handle for cancel.
+        """
+        timer = self.Timer(name, callback, None)
+        self.timers[name] = timer
+        self._push(self.clock() + delay, timer)
+        return timer
+
+    def call_every(self, interval, callback, name, first_delay=0):
+        """
+        Run callback every interval seconds, first after first_delay. Missed runs are skipped
+        instead of being run back to back.
+        """
+        timer = self.Timer(name, callback, interval)
+        self.timers[name] = timer
+        self._push(self.clock() + first_delay, timer)
+        return timer
+
+    def cancel(self, timer):
+        timer.cancelled = True
+
+    def time_until_next(self):
+        """
+        Seconds until the earliest deadline (0 if overdue), None without timers.
+        """
+        while self.heap and self.heap[0][2].cancelled:
+            heapq.heappop(self.heap)
+        if not self.heap:
+            return None
+        return max(self.heap[0][0] - self.clock(), 0)
+
+    def run_due(self):
+        """
+        Run all timers whose deadline passed.
+        """
+        now = self.clock()
+        while self.heap and self.heap[0][0] <= now:
+            deadline, _, timer = heapq.heappop(self.heap)
+            if timer.cancelled:
+                continue
+
+            start = self.clock()
+            lag = start - deadline
+            timer.callback()
+            elapsed = self.clock() - start
+            timer.runs += 1
+            timer.lag_total += lag
+            timer.lag_max = max(timer.lag_max, lag)
+            timer.busy += elapsed
+            self.busy_seconds += elapsed
+
+            if timer.interval is not None:
+                next_deadline = deadline + timer.interval
+                if next_deadline <= start:
+                    # fell behind by more than one interval, continue from now
+                    next_deadline = start + timer.interval
+                self._push(next_deadline, timer)
+            now = self.clock()
+
+    def run_event(self, callback, *args):
+        """
+        Handle an external event right away, counted in the loop utilization.
+        """
+        start = self.clock()
+        callback(*args)
+        self.busy_seconds += self.clock() - start
+        self.events += 1
+
+    def run(self, wait, handle):
+        """
+        Run forever. wait(timeout) blocks until an event arrives (returned) or the timeout
+        passed (returns None), handle(event) is called for every event.
+        """
+        while True:
+            event = wait(self.time_until_next())
+            if event is not None:
+                self.run_event(handle, event)
+            self.run_due()
+
+    def stats(self):
+        elapsed = self.clock() - self.started
+        return {
+            "utilization": round(self.busy_seconds / elapsed, 4) if elapsed else 0,
+            "events": self.events,
+            "timers": {
+                name: {
+                    "interval": timer.interval,
+                    "runs": timer.runs,
+                    "lag_avg_ms": round(timer.lag_total / timer.runs * 1000, 3)
+                    if timer.runs
+                    else None,
+                    "lag_max_ms": round(timer.lag_max * 1000, 3),
+                    "busy_ms": round(timer.busy * 1000, 2),
+                }
+                for name, timer in self.timers.items()
+            },
+        }
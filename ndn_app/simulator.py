@@ -0,0 +1,579 @@
+import collections
+import heapq
+import itertools
+import json
+import random
+import sys
+import time
+import constants
+import crypto
+import metrics
+import tlv
+from connection_pool import PeerHealth
+from name_trie import split_name
+from node import HelloMessage, Network
+from prettytable import PrettyTable
+from spatial_index import GridIndex, euclidean_distance
+from mobility import NeighborTracker, create_mobility
+
+
+SENSOR_NAMES = ("heartrate", "temperature", "oxygen", "bloodpressure")
+
+
+class VirtualClock:
+    """
+    Discrete event loop with virtual time. Events are (time, sequence, callback, args) on a
+    heap, time only moves when an event is run, so a simulated second costs as much as its
+    events.
+    Instances are callable and return the current virtual time, to be passed as clock.
+    """
+
+    def __init__(self) -> None:
+        self.now = 0.0
+        self.heap = []
+        self.sequence = itertools.count()
+        self.events = 0
+
+    def __call__(self):
+        return self.now
+
+    def call_at(self, when, callback, *args):
+        heapq.heappush(self.heap, (when, next(self.sequence), callback, args))
+
+    def call_later(self, delay, callback, *args):
+        self.call_at(self.now + delay, callback, *args)
+
+    def call_every(self, interval, callback, first_delay=0):
+        """
+        Run callback every interval seconds, first after first_delay.
+        """
+
+        def periodic():
+            callback()
+            self.call_later(interval, periodic)
+
+        self.call_later(first_delay, periodic)
+
+    def run_until(self, end):
+        """
+        Run all events up to virtual time end.
+        """
+        heap = self.heap
+        while heap and heap[0][0] <= end:
+            self.now, _, callback, args = heapq.heappop(heap)
+            callback(*args)
+            self.events += 1
+        self.now = end
+
+
+class SimulatedCommunication:
+    """
+    In-memory transport with the same interface as SocketCommunication. Packets are handed to
+    the simulation, which delivers them to the destination node after the link delay.
+    """
+
+    def __init__(self, address, port, simulation) -> None:
+        self.address = address
+        self.port = port
+        self.simulation = simulation
+        self.packet_callback = None
+        self.gateway_callback = None
+        self.comms_enabled = True
+        # replaced by the metrics of the node
+        self.metrics = metrics.DISABLED
+        self.health = {}
+        self.counters = {
+            "packets_out": 0,
+            "packets_in": 0,
+            "bytes_out": 0,
+            "bytes_in": 0,
+            "dropped": 0,
+        }
+
+    def get_health(self, dest):
+        if dest not in self.health:
+            self.health[dest] = PeerHealth()
+        return self.health[dest]
+
+    def send(self, dest_address, dest_port, data):
+        with self.metrics.time(metrics.SEND_SECONDS, (("transport", "sim"),)):
+            return self._send(dest_address, dest_port, data)
+
+    def _send(self, dest_address, dest_port, data):
+        if not self.comms_enabled:
+            return False
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        self.counters["packets_out"] += 1
+        self.counters["bytes_out"] += len(data)
+        return self.simulation.transmit(self, (dest_address, dest_port), data)
+
+    def deliver(self, data):
+        if not self.comms_enabled:
+            self.counters["dropped"] += 1
+            return
+        self.counters["packets_in"] += 1
+        self.counters["bytes_in"] += len(data)
+        # If gateway packet, execute gateway callback
+        if tlv.is_gateway_packet(data):
+            self.gateway_callback(data)
+        # Else, hand over to packet dispatcher
+        else:
+            self.packet_callback(data)
+
+
+def simulated_nodes(num_nodes, seed):
+    """
+    Topology in the format of constants.NODES. Nodes of constants.NODES keep their coordinates,
+    further ones are placed at random on the same grid. Every node gets its own address.
+    """
+    rng = random.Random(seed)
+    nodes = {}
+    for label in range(num_nodes):
+        if label in constants.NODES:
+            xy = constants.NODES[label]["xy"]
+        else:
+            xy = (
+                rng.randint(0, constants.GRID_DIMENSIONS[0] + 1),
+                rng.randint(0, constants.GRID_DIMENSIONS[1] + 1),
+            )
+        nodes[label] = {
+            "server_ip": f"10.{(label >> 16) & 255}.{(label >> 8) & 255}.{label & 255}",
+            "server_port": constants.STARTING_SERVER_PORT,
+            "xy": xy,
+        }
+    return nodes
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+class Simulation:
+    """
+    Many Network instances in one process, connected by SimulatedCommunication and driven by a
+    VirtualClock: hellos, FIB aging and table expiry run as timer events, packets are delivered
+    after SIM_LINK_DELAY plus SIM_LINK_DELAY_PER_UNIT per unit of euclidean distance between
+    the nodes.
+
+    Consumers are picked at random and request names under the data address of a producer
+    ("/data/<label>/<sensor>"), producers are picked with Zipf(popularity) weights (0 is
+    uniform). Runs are deterministic for a seed.
+    """
+
+    def __init__(
+        self,
+        num_nodes,
+        k=constants.MINIMUM_NEIGHBORS,
+        seed=constants.COORDINATE_SEED,
+        routing=constants.LINK_STATE_ROUTING,
+        loss=0.0,
+        mobility=constants.MOBILITY,
+    ) -> None:
+        self.clock = VirtualClock()
+        self.rng = random.Random(seed)
+        # request ids of the nodes come from the global generator
+        random.seed(seed)
+        self.loss = loss
+        self.nodes = simulated_nodes(num_nodes, seed)
+
+        # (ip, port) -> label / comm of every node
+        self.addresses = {}
+        self.comms = {}
+        self.networks = {}
+        # (label, data address) -> hops the last Data for the name travelled to label
+        self.data_hops = {}
+        # (label, data address, request id) -> [sent, answered]
+        self.requests = {}
+        self.results = {
+            "issued": 0,
+            "reachable": 0,
+            "satisfied": 0,
+            "latencies": [],
+            "hops": [],
+        }
+        self.converged = {"neighbors": None, "routing": None}
+        # links which appeared through mobility: (since, label, neighbor) until known by both
+        # neighbors / by routing in the whole component, recovery times in seconds
+        self.new_links = []
+        self.recovery = {"links": 0, "superseded": 0, "discovery": [], "routing": []}
+        self.mobility_update_seconds = 0.0
+
+        started = time.perf_counter()
+        # RSA keys are loaded / generated once and shared, they are not what is simulated
+        member_private_key = crypto.load_private_key_from_disk(constants.MEMBER_KEY_PATH)
+        node_index = GridIndex.from_nodes(self.nodes)
+        key_pool = [
+            crypto.generate_keys(2048) for _ in range(min(constants.SIM_KEY_POOL, num_nodes))
+        ]
+        for label, node in self.nodes.items():
+            address = (node["server_ip"], node["server_port"])
+            comm = SimulatedCommunication(*address, self)
+            network = Network(
+                label,
+                self.nodes,
+                k,
+                comm,
+                constants.HELLO_DELAY,
+                HelloMessage(label=label, ip=address[0], port=address[1], cert="ULTRA_CERT"),
+                constants.MEMBER_KEY_PATH,
+                False,
+                None,
+                None,
+                clock=self.clock,
+                node_keys=key_pool[label % len(key_pool)],
+                member_private_key=member_private_key,
+                node_index=node_index,
+            )
+            network.routing_enabled = routing
+            self._instrument(label, network)
+            self.addresses[address] = label
+            self.comms[label] = comm
+            self.networks[label] = network
+        # k nearest of all nodes, kept up to date while nodes move
+        self.tracker = NeighborTracker(node_index, k)
+        self.mobility = create_mobility(
+            mobility,
+            self.nodes,
+            constants.GRID_DIMENSIONS,
+            constants.MOBILITY_SPEED,
+            constants.MOBILITY_PAUSE,
+            seed,
+        )
+        self.setup_seconds = time.perf_counter() - started
+        self._update_components()
+
+    def _instrument(self, label, network):
+        """
+        Produce data under /data/<label>/, track originated requests and Data hop counts.
+        """
+        network.originator_callback = lambda *request: self._originator(label, *request)
+        network.register_producer(
+            f"/data/{label}/", lambda suffix: f"{label}:{suffix}:{round(self.clock.now, 3)}"
+        )
+
+        send_data = network.send_data
+
+        def responder_send_data(neighbor_label, data_address, *args, **kwargs):
+            self.data_hops[(label, data_address)] = 0
+            send_data(neighbor_label, data_address, *args, **kwargs)
+
+        def counting_data_handler(data_type, message):
+            self.data_hops[(label, message.data_address)] = (
+                self.data_hops.get((message.label, message.data_address), 0) + 1
+            )
+            network.data_handler(data_type, message)
+
+        network.send_data = responder_send_data
+        network.register_handler(constants.DATA_ID, counting_data_handler)
+
+    def expected_neighbors(self, label):
+        """
+        Nodes send hellos to their k nearest and answer the ones which have them as k nearest.
+        """
+        return set(self.tracker.nearest[label]) | self.tracker.reverse[label]
+
+    def _update_components(self):
+        """
+        Connected component of every node in the expected neighbor graph.
+        """
+        self.components = {}
+        index = 0
+        for start in self.networks:
+            if start in self.components:
+                continue
+            index += 1
+            self.components[start] = index
+            stack = [start]
+            while stack:
+                for neighbor in self.expected_neighbors(stack.pop()):
+                    if neighbor not in self.components:
+                        self.components[neighbor] = index
+                        stack.append(neighbor)
+        self.component_sizes = collections.Counter(self.components.values())
+        self.members = {}
+        for label, component in self.components.items():
+            self.members.setdefault(component, []).append(label)
+
+    def transmit(self, comm, dest, data):
+        dest_label = self.addresses.get(dest)
+        if dest_label is None or (self.loss and self.rng.random() < self.loss):
+            comm.counters["dropped"] += 1
+            return False
+        src_label = self.addresses[(comm.address, comm.port)]
+        # from the current positions, nodes may move
+        distance = euclidean_distance(self.nodes[src_label]["xy"], self.nodes[dest_label]["xy"])
+        delay = constants.SIM_LINK_DELAY + distance * constants.SIM_LINK_DELAY_PER_UNIT
+        self.clock.call_later(delay, self.comms[dest_label].deliver, data)
+        return True
+
+    def _originator(self, label, data_address, request_id, data):
+        request = self.requests.get((label, data_address, request_id))
+        if request is None:
+            return False
+        if data and not request[1]:
+            request[1] = True
+            self.results["satisfied"] += 1
+            self.results["latencies"].append(self.clock.now - request[0])
+            self.results["hops"].append(self.data_hops.get((label, data_address)))
+        return True
+
+    def _expire_request(self, key):
+        self.requests.pop(key, None)
+
+    def issue_interest(self, label, data_address):
+        request_id = self.networks[label].originate_interest(data_address, 0)
+        key = (label, data_address, request_id)
+        self.requests[key] = [self.clock.now, False]
+        self.results["issued"] += 1
+        # producer in the same connected component as the consumer
+        if self.components[label] == self.components[int(split_name(data_address)[1])]:
+            self.results["reachable"] += 1
+        self.clock.call_later(constants.INTEREST_LIFETIME, self._expire_request, key)
+
+    def _schedule_workload(self, start, end, rate, popularity):
+        labels = list(self.networks)
+        weights = list(
+            itertools.accumulate(1 / (rank + 1) ** popularity for rank in range(len(labels)))
+        )
+        producers = labels[:]
+        self.rng.shuffle(producers)
+
+        def next_interest():
+            consumer = self.rng.choice(labels)
+            producer = self.rng.choices(producers, cum_weights=weights)[0]
+            if producer != consumer:
+                sensor = self.rng.choice(SENSOR_NAMES)
+                self.issue_interest(consumer, f"/data/{producer}/{sensor}")
+            arrival = self.clock.now + self.rng.expovariate(rate)
+            if arrival < end:
+                self.clock.call_at(arrival, next_interest)
+
+        self.clock.call_at(start + self.rng.expovariate(rate), next_interest)
+
+    def _check_convergence(self):
+        now = self.clock.now
+        if self.converged["neighbors"] is None and all(
+            set(network.neighbor_table.table) == self.expected_neighbors(label)
+            for label, network in self.networks.items()
+        ):
+            self.converged["neighbors"] = now
+        if (
+            self.converged["routing"] is None
+            and self.converged["neighbors"] is not None
+            and all(network.routing_enabled for network in self.networks.values())
+            and all(
+                len(network.routing.routes)
+                == self.component_sizes[self.components[label]] - 1
+                for label, network in self.networks.items()
+            )
+        ):
+            self.converged["routing"] = now
+
+    def _knows_link(self, label, neighbor, observer):
+        lsa = self.networks[observer].routing.lsdb.get(label)
+        return lsa is not None and neighbor in lsa.neighbors
+
+    def _check_new_links(self):
+        """
+        Record how long links which appeared through mobility took to be discovered by both
+        neighbors (hello) and to be advertised to every node of their component (LSA).
+        """
+        if not self.new_links:
+            return
+        now = self.clock.now
+        pending = []
+        for link in self.new_links:
+            since, label, neighbor, discovered = link
+            if neighbor not in self.expected_neighbors(label):
+                self.recovery["superseded"] += 1
+                continue
+            if discovered is None:
+                if (
+                    neighbor in self.networks[label].neighbor_table.table
+                    and label in self.networks[neighbor].neighbor_table.table
+                ):
+                    discovered = link[3] = now
+                    self.recovery["discovery"].append(now - since)
+                pending.append(link)
+                continue
+            if not self.networks[label].routing_enabled:
+                continue
+            if all(
+                self._knows_link(label, neighbor, observer)
+                and self._knows_link(neighbor, label, observer)
+                for observer in self.members[self.components[label]]
+            ):
+                self.recovery["routing"].append(now - since)
+            else:
+                pending.append(link)
+        self.new_links = pending
+
+    def _move_nodes(self):
+        """
+        Advance the mobility model, update the k nearest of the affected nodes.
+        """
+        moves = self.mobility.positions(self.clock.now)
+        if not moves:
+            return
+        started = time.perf_counter()
+        changed = self.tracker.update(moves)
+        self.mobility_update_seconds += time.perf_counter() - started
+
+        for label, xy in moves.items():
+            self.nodes[label]["xy"] = xy
+        for label in set(moves) | set(changed):
+            self.networks[label].move_to(self.nodes[label]["xy"], self.tracker.nearest[label])
+        for label, added in changed.items():
+            for neighbor in added:
+                self.new_links.append([self.clock.now, label, neighbor, None])
+                self.recovery["links"] += 1
+        if changed:
+            self._update_components()
+
+    def _advance_timers(self):
+        for network in self.networks.values():
+            if len(network.timers):
+                network.timers.advance()
+
+    def run(self, duration, rate=0.0, warmup=5.0, popularity=0.0):
+        """
+        Simulate duration virtual seconds, interests arrive at rate per second (Poisson) after
+        warmup and until INTEREST_LIFETIME before the end. Returns the report.
+        """
+        hello_delay = constants.HELLO_DELAY
+        aging_interval = hello_delay * constants.FIB_AGING_HELLO_INTERVALS
+        for network in self.networks.values():
+            # random phase, nodes don't boot at the same instant
+            phase = self.rng.uniform(0, hello_delay)
+            self.clock.call_every(hello_delay, network.send_hellos, phase)
+            self.clock.call_every(aging_interval, network.age_neighbors, phase + aging_interval)
+        self.clock.call_every(constants.TIMER_TICK, self._advance_timers)
+        self.clock.call_every(constants.SIM_CHECK_INTERVAL, self._check_convergence)
+        if self.mobility:
+            self.clock.call_every(
+                constants.MOBILITY_TICK, self._move_nodes, constants.MOBILITY_TICK
+            )
+            self.clock.call_every(constants.SIM_LINK_CHECK_INTERVAL, self._check_new_links)
+        if rate > 0:
+            self._schedule_workload(
+                warmup, duration - constants.INTEREST_LIFETIME, rate, popularity
+            )
+
+        started = time.perf_counter()
+        self.clock.run_until(duration)
+        return self.report(duration, time.perf_counter() - started)
+
+    def report(self, duration, wall_seconds):
+        latencies = self.results["latencies"]
+        hops = [hop for hop in self.results["hops"] if hop is not None]
+        load = {
+            label: comm.counters["packets_in"] + comm.counters["packets_out"]
+            for label, comm in self.comms.items()
+        }
+        busiest = sorted(load, key=load.get, reverse=True)[:5]
+        packets_out = {}
+        for network in self.networks.values():
+            for name, count in network.packet_counters["out"].items():
+                packets_out[name] = packets_out.get(name, 0) + count
+        issued = self.results["issued"]
+
+        return {
+            "nodes": len(self.networks),
+            "virtual_seconds": duration,
+            "wall_seconds": round(wall_seconds, 2),
+            "setup_seconds": round(self.setup_seconds, 2),
+            "events": self.clock.events,
+            "topology": {
+                "components": len(self.component_sizes),
+                "largest_component": max(self.component_sizes.values()),
+            },
+            "mobility": {
+                "ticks": self.tracker.counters["ticks"],
+                "moves": self.tracker.counters["moves"],
+                "k_nearest_changes": self.tracker.counters["changed"],
+                "update_ms_avg": _ms(
+                    self.mobility_update_seconds / self.tracker.counters["ticks"]
+                )
+                if self.tracker.counters["ticks"]
+                else None,
+                "new_links": self.recovery["links"],
+                "superseded": self.recovery["superseded"],
+                "discovery_ms_p50": _ms(percentile(self.recovery["discovery"], 0.5)),
+                "discovery_ms_p95": _ms(percentile(self.recovery["discovery"], 0.95)),
+                "routing_ms_p50": _ms(percentile(self.recovery["routing"], 0.5)),
+                "routing_ms_p95": _ms(percentile(self.recovery["routing"], 0.95)),
+            },
+            "convergence": {
+                name: round(value, 3) if value is not None else None
+                for name, value in self.converged.items()
+            },
+            "interests": {
+                "issued": issued,
+                "reachable": self.results["reachable"],
+                "satisfied": self.results["satisfied"],
+                "success_rate": round(self.results["satisfied"] / issued, 4)
+                if issued
+                else None,
+                "latency_ms_p50": _ms(percentile(latencies, 0.5)),
+                "latency_ms_p95": _ms(percentile(latencies, 0.95)),
+                "hops_avg": round(sum(hops) / len(hops), 2) if hops else None,
+                "hops_max": max(hops) if hops else None,
+            },
+            "load": {
+                "packets_avg": round(sum(load.values()) / len(load), 1),
+                "packets_p50": percentile(list(load.values()), 0.5),
+                "packets_p95": percentile(list(load.values()), 0.95),
+                "packets_max": load[busiest[0]],
+                "busiest_nodes": {label: load[label] for label in busiest},
+                "dropped": sum(comm.counters["dropped"] for comm in self.comms.values()),
+            },
+            "packets_out": packets_out,
+        }
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 2) if seconds is not None else None
+
+
+def print_report(report):
+    table = PrettyTable()
+    table.field_names = ["Metric", "Value"]
+    table.align["Metric"] = "l"
+    table.align["Value"] = "l"
+    for section in ("topology", "mobility", "convergence", "interests", "load", "packets_out"):
+        for name, value in report[section].items():
+            table.add_row([f"{section} {name}", value])
+    print(
+        f"{report['nodes']} nodes, {report['virtual_seconds']} s simulated in "
+        f"{report['wall_seconds']} s ({report['events']} events, setup "
+        f"{report['setup_seconds']} s)"
+    )
+    print(table)
+
+
+if __name__ == "__main__":
+    args = sys.argv
+
+    if len(args) < 2:
+        print(
+            "Format: python3 simulator.py <nodes> [seconds] [interests per second] "
+            "[routing|flooding] [report.json]"
+        )
+        exit(1)
+
+    num_nodes = int(args[1])
+    duration = float(args[2]) if len(args) > 2 else 30.0
+    rate = float(args[3]) if len(args) > 3 else 10.0
+    # link state routing floods and SPFs every LSA on every node, flooding scales further
+    routing = args[4] == "routing" if len(args) > 4 else constants.LINK_STATE_ROUTING
+
+    simulation = Simulation(num_nodes, routing=routing)
+    report = simulation.run(duration, rate)
+    print_report(report)
+    if len(args) > 5:
+        with open(args[5], "w") as file:
+            json.dump(report, file, indent=2)
@@ -0,0 +1,155 @@
+import itertools
+from math import floor, sqrt
+
+
+def euclidean_distance(p1, p2):
+    return sqrt((p1[0] - p2[0]) ** 2 + (p1[1] - p2[1]) ** 2)
+
+
+class GridIndex:
+    """
+    Uniform grid over 2D points for k-nearest neighbor queries.
+
+    Points are bucketed by cell (cell_size x cell_size). A query scans rings of cells around the
+    cell of the query point and stops once the k-th best distance is shorter than the distance
+    to any cell outside the scanned rings, so with a few points per cell it only looks at the
+    neighborhood instead of all points. Equal distances are ordered by insertion, the result is
+    the same as sorting all points by distance.
+    """
+
+    # average points per cell when the cell size is derived from the points
+    POINTS_PER_CELL = 2
+
+    def __init__(self, cell_size) -> None:
+        self.cell_size = cell_size
+        # (cell x, cell y) -> {label: (x, y)}
+        self.cells = {}
+        # label -> (x, y) / insertion number
+        self.points = {}
+        self.order = {}
+        self.sequence = itertools.count()
+        # min/max cell coordinates ever used, queries don't scan beyond them
+        self.bounds = None
+
+    @classmethod
+    def from_points(cls, points):
+        """
+        Index of {label: (x, y)} with the cell size fitted to the point density.
+        """
+        if not points:
+            return cls(1)
+        xs = [xy[0] for xy in points.values()]
+        ys = [xy[1] for xy in points.values()]
+        area = max(max(xs) - min(xs), 1) * max(max(ys) - min(ys), 1)
+        index = cls(sqrt(area * cls.POINTS_PER_CELL / len(points)))
+        for label, xy in points.items():
+            index.insert(label, xy)
+        return index
+
+    @classmethod
+    def from_nodes(cls, nodes):
+        """
+        Index of the nodes of a topology in the format of constants.NODES.
+        """
+        return cls.from_points({label: node["xy"] for label, node in nodes.items()})
+
+    def __len__(self):
+        return len(self.points)
+
+    def __contains__(self, label):
+        return label in self.points
+
+    def cell(self, xy):
+        return floor(xy[0] / self.cell_size), floor(xy[1] / self.cell_size)
+
+    def insert(self, label, xy):
+        if label in self.points:
+            self.remove(label)
+        cell = self.cell(xy)
+        self.cells.setdefault(cell, {})[label] = xy
+        self.points[label] = xy
+        self.order[label] = next(self.sequence)
+        if self.bounds is None:
+            self.bounds = (cell[0], cell[1], cell[0], cell[1])
+        else:
+            min_x, min_y, max_x, max_y = self.bounds
+            self.bounds = (
+                min(min_x, cell[0]),
+                min(min_y, cell[1]),
+                max(max_x, cell[0]),
+                max(max_y, cell[1]),
+            )
+
+    def move(self, label, xy):
+        """
+        Update the position of label, it keeps its place in the tie order. Returns True if it
+        changed cells.
+        """
+        old_cell = self.cell(self.points[label])
+        cell = self.cell(xy)
+        if cell == old_cell:
+            self.cells[cell][label] = self.points[label] = xy
+            return False
+        order = self.order[label]
+        self.remove(label)
+        self.insert(label, xy)
+        self.order[label] = order
+        return True
+
+    def remove(self, label):
+        xy = self.points.pop(label)
+        del self.order[label]
+        cell = self.cell(xy)
+        del self.cells[cell][label]
+        if not self.cells[cell]:
+            del self.cells[cell]
+
+    def _ring(self, center_x, center_y, ring):
+        if ring == 0:
+            yield center_x, center_y
+            return
+        for x in range(center_x - ring, center_x + ring + 1):
+            yield x, center_y - ring
+            yield x, center_y + ring
+        for y in range(center_y - ring + 1, center_y + ring):
+            yield center_x - ring, y
+            yield center_x + ring, y
+
+    def nearest(self, xy, k, exclude=()):
+        """
+        k nearest points as (label, distance), nearest first. Labels in exclude (eg. the
+        querying node itself) are skipped.
+        """
+        if k <= 0 or not self.points:
+            return []
+        x, y = xy
+        center_x, center_y = self.cell(xy)
+        min_x, min_y, max_x, max_y = self.bounds
+        last_ring = max(
+            center_x - min_x, max_x - center_x, center_y - min_y, max_y - center_y, 0
+        )
+
+        # (distance, insertion number, label)
+        candidates = []
+        for ring in range(last_ring + 1):
+            for cell in self._ring(center_x, center_y, ring):
+                points = self.cells.get(cell)
+                if not points:
+                    continue
+                for label, (point_x, point_y) in points.items():
+                    if label not in exclude:
+                        candidates.append(
+                            (
+                                sqrt((x - point_x) ** 2 + (y - point_y) ** 2),
+                                self.order[label],
+                                label,
+                            )
+                        )
+            if len(candidates) >= k:
+                candidates.sort()
+                del candidates[k:]
+                # points outside the scanned rings are at least ring * cell_size away
+                if candidates[-1][0] < ring * self.cell_size:
+                    break
+        candidates.sort()
+        return [(label, distance) for distance, _, label in candidates[:k]]
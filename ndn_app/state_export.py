@@ -0,0 +1,211 @@
+import json
+import os
+import time
+
+# compact separators, the C encoder is only used without indent
+_encode = json.JSONEncoder(separators=(",", ":")).encode
+
+
+def write_atomic(path, data):
+    """
+    Replace file at path with data (bytes) so readers see either the old or the new content.
+    """
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "wb") as file:
+        file.write(data)
+    os.replace(temp_path, path)
+
+
+def _flatten(value, path, leaves):
+    """
+    Encoded leaves of nested dicts by key path, lists and empty dicts are leaves.
+    """
+    for key, item in value.items():
+        item_path = path + (key if isinstance(key, str) else str(key),)
+        if isinstance(item, dict) and item:
+            _flatten(item, item_path, leaves)
+        else:
+            leaves[item_path] = _encode(item)
+    return leaves
+
+
+class StateExporter:
+    """
+    Change driven export of the node state to a stats file.
+
+    The state is flattened to encoded leaves by key path and compared with the last export,
+    nothing is written if no leaf changed. Volatile keys (eg. timings, which differ on every
+    call) are left out of the comparison and the deltas, they are only refreshed with snapshots.
+    With a snapshot_interval (off by default) a snapshot is also written once the interval
+    passed and the volatile keys differ from the last snapshot, so an unchanged state is never
+    written again.
+
+    The stats file holds a full snapshot {"label", "version", "state"}, replaced atomically. With
+    deltas enabled, changes are appended to <path>.delta as JSON lines
+    {"label", "version", "set": [[path, value], ...], "del": [path, ...]} instead, and a new
+    snapshot (which removes the delta log) is only written once the log outgrew the snapshot.
+    Use read_state to get the current state back. Every written snapshot or delta is also passed
+    to sink (eg. to push it to the stats aggregator).
+    """
+
+    def __init__(
+        self, path, label, deltas=True, volatile=(), sink=None, snapshot_interval=None
+    ) -> None:
+        self.path = path
+        self.delta_path = f"{path}.delta"
+        self.label = label
+        self.deltas = deltas
+        self.volatile = set(volatile)
+        self.sink = sink
+        self.snapshot_interval = snapshot_interval
+        self.snapshot_time = 0
+        # encoded volatile keys of the last snapshot
+        self.snapshot_volatile = None
+        self.version = 0
+        # key path -> encoded leaf of the last export, without volatile keys
+        self.exported = None
+        self.snapshot_bytes = 0
+        self.delta_bytes = 0
+        self.counters = {
+            "checks": 0,
+            "unchanged": 0,
+            "snapshots": 0,
+            "deltas": 0,
+            "bytes_written": 0,
+        }
+
+    def export(self, state):
+        """
+        Export state if it changed since the last export. Returns True if something was written.
+        """
+        self.counters["checks"] += 1
+        leaves = _flatten(
+            {key: value for key, value in state.items() if key not in self.volatile},
+            (),
+            {},
+        )
+        snapshot_due = (
+            self.snapshot_interval is not None
+            and time.monotonic() - self.snapshot_time >= self.snapshot_interval
+            and self._volatile(state) != self.snapshot_volatile
+        )
+        if leaves == self.exported and not snapshot_due:
+            self.counters["unchanged"] += 1
+            return False
+
+        self.version += 1
+        if (
+            not self.deltas
+            or self.exported is None
+            or snapshot_due
+            or self.delta_bytes > self.snapshot_bytes
+        ):
+            self._write_snapshot(state)
+        else:
+            self._append_delta(leaves)
+        self.exported = leaves
+        return True
+
+    def _write_snapshot(self, state):
+        data = _encode(
+            {"label": self.label, "version": self.version, "state": state}
+        ).encode("utf-8")
+        write_atomic(self.path, data)
+        if self.delta_bytes or not self.counters["snapshots"]:
+            # deltas up to this version are part of the snapshot now, on the first snapshot the
+            # log may still be left from an earlier run
+            try:
+                os.remove(self.delta_path)
+            except FileNotFoundError:
+                pass
+        self.snapshot_bytes = len(data)
+        self.snapshot_time = time.monotonic()
+        if self.snapshot_interval is not None:
+            self.snapshot_volatile = self._volatile(state)
+        self.delta_bytes = 0
+        self.counters["snapshots"] += 1
+        self.counters["bytes_written"] += len(data)
+        if self.sink is not None:
+            self.sink(data)
+
+    def _append_delta(self, leaves):
+        changes = ",".join(
+            f"[{_encode(path)},{value}]"
+            for path, value in leaves.items()
+            if self.exported.get(path) != value
+        )
+        removed = _encode([path for path in self.exported if path not in leaves])
+        data = (
+            f'{{"label":{_encode(self.label)},"version":{self.version},'
+            f'"set":[{changes}],"del":{removed}}}\n'
+        ).encode("utf-8")
+        with open(self.delta_path, "ab") as file:
+            file.write(data)
+        self.delta_bytes += len(data)
+        self.counters["deltas"] += 1
+        self.counters["bytes_written"] += len(data)
+        if self.sink is not None:
+            self.sink(data)
+
+    def _volatile(self, state):
+        return _encode({key: state[key] for key in self.volatile if key in state})
+
+    def stats(self):
+        return dict(
+            self.counters,
+            version=self.version,
+            snapshot_bytes=self.snapshot_bytes,
+            delta_bytes=self.delta_bytes,
+        )
+
+
+def apply_delta(state, delta):
+    """
+    Apply delta record ("set" and "del" key paths) to state in place.
+    """
+    for path in delta["del"]:
+        parents = [state]
+        for key in path[:-1]:
+            parents.append(parents[-1].get(key, {}))
+        parents[-1].pop(path[-1], None)
+        # drop dicts left empty, empty dicts which are values themselves are set again below
+        for depth in range(len(path) - 1, 0, -1):
+            if parents[depth] or path[depth - 1] not in parents[depth - 1]:
+                break
+            del parents[depth - 1][path[depth - 1]]
+    for path, value in delta["set"]:
+        parent = state
+        for key in path[:-1]:
+            if not isinstance(parent.get(key), dict):
+                parent[key] = {}
+            parent = parent[key]
+        parent[path[-1]] = value
+
+
+def read_state(path):
+    """
+    Current (label, version, state) from a stats file and its delta log. Incomplete trailing
+    delta lines (still being written) and deltas older than the snapshot are skipped.
+    """
+    with open(path, "r") as file:
+        snapshot = json.load(file)
+    version, state = snapshot["version"], snapshot["state"]
+
+    try:
+        with open(f"{path}.delta", "r") as file:
+            lines = file.readlines()
+    except FileNotFoundError:
+        lines = []
+
+    for line in lines:
+        if not line.endswith("\n"):
+            break
+        delta = json.loads(line)
+        if delta["version"] <= version:
+            continue
+        if delta["version"] != version + 1:
+            # log of a newer snapshot than the one read, state stays at the snapshot
+            break
+        apply_delta(state, delta)
+        version = delta["version"]
+    return snapshot["label"], version, state
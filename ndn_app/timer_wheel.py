@@ -0,0 +1,85 @@
+import math
+import threading
+import time
+
+
+class TimerWheel:
+    """
+    Hashed timing wheel. Timers are bucketed by their deadline tick into one of num_slots slots,
+    so scheduling, cancelling and expiring are O(1) amortized as long as most lifetimes are
+    shorter than one revolution (tick * num_slots). Longer timers simply stay in their slot
+    until the wheel reaches their deadline.
+
+    Each timer has a key, scheduling the same key again replaces the old timer.
+    """
+
+    def __init__(self, tick, num_slots, clock=time.monotonic) -> None:
+        self.tick = tick
+        self.clock = clock
+        self.slots = [{} for _ in range(num_slots)]
+        # key -> (slot index, deadline tick)
+        self.timers = {}
+        self.current_tick = self._to_tick(clock())
+        self.lock = threading.Lock()
+        self.counters = {"scheduled": 0, "cancelled": 0, "expired": 0}
+
+    def __len__(self):
+        return len(self.timers)
+
+    def __contains__(self, key):
+        return key in self.timers
+
+    def _to_tick(self, timestamp):
+        return int(timestamp / self.tick)
+
+    def _remove(self, key):
+        slot_index, _ = self.timers.pop(key)
+        del self.slots[slot_index][key]
+
+    def schedule(self, key, delay, callback=None):
+        """
+        Call callback(key) once delay seconds have passed, unless cancelled before.
+        """
+        deadline = max(
+            math.ceil((self.clock() + delay) / self.tick), self.current_tick + 1
+        )
+        slot_index = deadline % len(self.slots)
+        with self.lock:
+            if key in self.timers:
+                self._remove(key)
+            self.slots[slot_index][key] = (deadline, callback)
+            self.timers[key] = (slot_index, deadline)
+            self.counters["scheduled"] += 1
+
+    def cancel(self, key):
+        with self.lock:
+            if key not in self.timers:
+                return False
+            self._remove(key)
+            self.counters["cancelled"] += 1
+            return True
+
+    def advance(self, now=None):
+        """
+        Move the wheel to now and fire all timers which are due. Callbacks run outside the lock
+        so they can schedule new timers. Returns list of expired keys.
+        """
+        now_tick = self._to_tick(self.clock() if now is None else now)
+        expired = []
+        with self.lock:
+            # each slot has to be visited at most once, even after a long pause
+            steps = min(now_tick - self.current_tick, len(self.slots))
+            for step in range(1, steps + 1):
+                slot = self.slots[(self.current_tick + step) % len(self.slots)]
+                for key, (deadline, callback) in list(slot.items()):
+                    if deadline <= now_tick:
+                        del slot[key]
+                        del self.timers[key]
+                        expired.append((key, callback))
+            self.current_tick = max(self.current_tick, now_tick)
+            self.counters["expired"] += len(expired)
+
+        for key, callback in expired:
+            if callback:
+                callback(key)
+        return [key for key, _ in expired]
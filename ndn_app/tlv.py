@@ -0,0 +1,231 @@
+"""
+Binary TLV (type-length-value) wire format.
+
+A packet is [MAGIC][VERSION] followed by one TLV element whose type is the packet ID and whose
+value is a sequence of TLV elements. Types are one byte, lengths use the NDN variable length
+encoding (< 253 in one byte, else 0xFD + 2 bytes or 0xFE + 4 bytes). Values are raw bytes,
+UTF-8 strings or non-negative integers in the shortest of 1, 2, 4 or 8 bytes.
+
+The magic byte can't start a text packet ("[" or "EG|"), so both formats can share a
+connection. Decoding returns memoryview slices of the received buffer, nothing is copied until
+a field is converted.
+"""
+from functools import lru_cache
+
+import constants
+import struct
+
+MAGIC = 0x00
+WIRE_VERSION = 1
+# versions this node can decode, announced in hellos
+SUPPORTED_VERSIONS = (WIRE_VERSION,)
+
+# Element types
+LABEL = 1
+IP = 2
+PORT = 3
+CERT = 4
+SESSION_EPOCH = 5
+SESSION_KEY = 6
+PUBLIC_KEY = 7
+SIGNATURE = 8
+MEMBER_SIGNATURE = 9
+KEY_ID = 10
+PAYLOAD = 11
+NAME = 12
+REQUEST_ID = 13
+RETRY_INDEX = 14
+CONTENT = 15
+HELLO_BODY = 16
+WIRE_VERSIONS = 17
+
+GATEWAY_PACKET_IDS = (constants.EG_ID, constants.EG_REPLY_ID)
+
+_UINT16 = struct.Struct("!H")
+_UINT32 = struct.Struct("!I")
+_UINT64 = struct.Struct("!Q")
+_PACKET_HEADER = struct.Struct("!BBBB")
+# preencoded [type][length] headers of short elements
+_SHORT_HEADERS = [
+    [bytes((element_type, length)) for length in range(253)]
+    for element_type in range(WIRE_VERSIONS + 1)
+]
+
+
+class TLVError(Exception):
+    """
+    Raised for truncated or malformed TLV packets and unknown wire versions.
+    """
+
+
+def is_tlv(data):
+    return len(data) > 0 and data[0] == MAGIC
+
+
+def is_gateway_packet(data):
+    """
+    EG / EG_REPLY packet in either wire format.
+    """
+    if is_tlv(data):
+        return len(data) > 2 and data[2] in GATEWAY_PACKET_IDS
+    return data[:2] == b"EG"
+
+
+def encode_number(number):
+    if number < 0x100:
+        return bytes((number,))
+    if number < 0x10000:
+        return _UINT16.pack(number)
+    if number < 0x100000000:
+        return _UINT32.pack(number)
+    return _UINT64.pack(number)
+
+
+def decode_number(value):
+    if len(value) == 1:
+        return value[0]
+    if len(value) == 2:
+        return _UINT16.unpack(value)[0]
+    if len(value) == 4:
+        return _UINT32.unpack(value)[0]
+    if len(value) == 8:
+        return _UINT64.unpack(value)[0]
+    raise TLVError(f"invalid number length {len(value)}")
+
+
+def _encode_length(length):
+    if length < 253:
+        return bytes((length,))
+    if length < 0x10000:
+        return b"\xfd" + _UINT16.pack(length)
+    return b"\xfe" + _UINT32.pack(length)
+
+
+def _encode_parts(elements, parts):
+    """
+    Append encoded headers and values of (type, value) pairs to parts, returns encoded size.
+    """
+    size = 0
+    for element_type, value in elements:
+        value_class = value.__class__
+        if value_class is str:
+            value = value.encode("utf-8")
+        elif value_class is int:
+            value = encode_number(value)
+        length = len(value)
+        if length < 253:
+            parts.append(_SHORT_HEADERS[element_type][length])
+            size += 2 + length
+        else:
+            header = bytes((element_type,)) + _encode_length(length)
+            parts.append(header)
+            size += len(header) + length
+        parts.append(value)
+    return size
+
+
+def encode_elements(elements):
+    """
+    Encode iterable of (type, value) pairs, value is bytes, str or int.
+    """
+    parts = []
+    _encode_parts(elements, parts)
+    return b"".join(parts)
+
+
+def encode_element(element_type, value):
+    return encode_elements(((element_type, value),))
+
+
+def encode_packet(packet_id, elements):
+    """
+    Packet from (type, value) pairs or already encoded elements, joined in one copy.
+    """
+    parts = [None]
+    if isinstance(elements, bytes):
+        parts.append(elements)
+        length = len(elements)
+    else:
+        length = _encode_parts(elements, parts)
+    if length < 253:
+        parts[0] = _PACKET_HEADER.pack(MAGIC, WIRE_VERSION, packet_id, length)
+    else:
+        parts[0] = bytes((MAGIC, WIRE_VERSION, packet_id)) + _encode_length(length)
+    return b"".join(parts)
+
+
+def _read_length(view, offset, end):
+    """
+    Long form length at offset (after the 253/254 marker). Returns (length, next offset).
+    """
+    marker = view[offset - 1]
+    size = 2 if marker == 253 else 4 if marker == 254 else 0
+    if size == 0:
+        raise TLVError("unsupported element length")
+    if offset + size > end:
+        raise TLVError("truncated element length")
+    length = (_UINT16 if size == 2 else _UINT32).unpack_from(view, offset)[0]
+    return length, offset + size
+
+
+def decode_elements(value):
+    """
+    Decode a sequence of elements into {type: value view}.
+    """
+    view = value if value.__class__ is memoryview else memoryview(value)
+    elements = {}
+    offset = 0
+    end = len(view)
+    try:
+        while offset < end:
+            element_type = view[offset]
+            length = view[offset + 1]
+            offset += 2
+            if length >= 253:
+                length, offset = _read_length(view, offset, end)
+            next_offset = offset + length
+            if next_offset > end:
+                raise TLVError("truncated element value")
+            elements[element_type] = view[offset:next_offset]
+            offset = next_offset
+    except IndexError:
+        raise TLVError("truncated element header")
+    return elements
+
+
+def decode_packet(data):
+    """
+    Returns (packet ID, value view) of a TLV packet.
+    """
+    view = data if data.__class__ is memoryview else memoryview(data)
+    end = len(view)
+    if end < 4 or view[0] != MAGIC:
+        raise TLVError("not a TLV packet")
+    if view[1] not in SUPPORTED_VERSIONS:
+        raise TLVError(f"unsupported wire version {view[1]}")
+    packet_id = view[2]
+    length = view[3]
+    offset = 4
+    if length >= 253:
+        length, offset = _read_length(view, offset, end)
+    if offset + length != end:
+        raise TLVError("packet length doesn't match")
+    return packet_id, view[offset:]
+
+
+def get_string(elements, element_type):
+    return str(elements[element_type], "utf-8")
+
+
+def get_number(elements, element_type):
+    return decode_number(elements[element_type])
+
+
+@lru_cache(maxsize=1024)
+def session_associated_data(packet_id, label, key_id):
+    """
+    Associated data authenticated with session encrypted payloads, the unencrypted header.
+    """
+    return bytes((MAGIC, WIRE_VERSION, packet_id)) + encode_elements(
+        ((LABEL, label), (KEY_ID, key_id))
+    )
@@ -0,0 +1,300 @@
+from collections import OrderedDict, deque
+from connection_pool import PeerHealth
+
+import selectors
+import socket
+import struct
+import threading
+import time
+import constants
+import metrics
+import tlv
+
+
+# version, message id, fragment index, fragment count
+FRAGMENT_HEADER = struct.Struct("!BIHH")
+FRAGMENT_VERSION = 1
+
+
+class Reassembly:
+    """
+    Fragments of one message received so far.
+    """
+
+    def __init__(self, count, now):
+        self.fragments = [None] * count
+        self.received = 0
+        self.first_seen = now
+
+    def add(self, index, chunk):
+        """
+        Returns False if this fragment was already received.
+        """
+        if self.fragments[index] is not None:
+            return False
+        self.fragments[index] = chunk
+        self.received += 1
+        return True
+
+    def complete(self):
+        return self.received == len(self.fragments)
+
+
+class UDPCommunication:
+    """
+    UDP datagram transport with the same interface as SocketCommunication. There is no
+    connection setup, every packet is sent as one or more datagrams from the node's server socket.
+
+    Packets bigger than one datagram are split into fragments and reassembled on the receiver:
+        [version][message id][fragment index][fragment count][chunk]
+    Duplicate fragments, fragments of already delivered (late) messages and incomplete messages
+    older than REASSEMBLY_TIMEOUT are dropped and counted. So are fragments announcing a message
+    bigger than MAX_FRAME_SIZE and fragments of new messages while MAX_REASSEMBLIES_PER_SENDER
+    (or MAX_REASSEMBLIES over all senders) are incomplete.
+    """
+
+    def __init__(self, address, port) -> None:
+        self.address = address
+        self.port = port
+        self.packet_callback = None
+        self.gateway_callback = None
+        self.comms_enabled = True
+        # replaced by the metrics of the node
+        self.metrics = metrics.DISABLED
+
+        self.sock = None
+        self.selector = None
+        self.next_message_id = 0
+        self.lock = threading.Lock()
+        # datagrams which couldn't be sent without blocking, flushed by the listener thread
+        self.outgoing = deque()
+        # (sender, message id) -> Reassembly, sender -> number of its reassemblies
+        self.reassembly = OrderedDict()
+        self.sender_reassemblies = {}
+        # recently delivered or expired (sender, message id), to detect late fragments
+        self.finished = OrderedDict()
+        self.health = {}
+
+        self.max_chunk = constants.MAX_DATAGRAM_SIZE - FRAGMENT_HEADER.size
+        # fragments of the biggest frame a peer may send
+        self.max_fragments = -(-constants.MAX_FRAME_SIZE // self.max_chunk)
+        self.counters = {
+            "datagrams_out": 0,
+            "datagrams_in": 0,
+            "fragmented": 0,
+            "reassembled": 0,
+            "duplicate_fragments": 0,
+            "late_fragments": 0,
+            "incomplete_dropped": 0,
+            "oversized_dropped": 0,
+            "reassembly_limit_dropped": 0,
+            "send_queued": 0,
+            "send_dropped": 0,
+            "packet_errors": 0,
+        }
+
+    def get_health(self, dest):
+        with self.lock:
+            if dest not in self.health:
+                self.health[dest] = PeerHealth()
+            return self.health[dest]
+
+    def _fragment(self, data):
+        with self.lock:
+            message_id = self.next_message_id
+            self.next_message_id = (self.next_message_id + 1) & 0xFFFFFFFF
+
+        chunks = [
+            data[i : i + self.max_chunk] for i in range(0, len(data), self.max_chunk)
+        ] or [b""]
+        if len(chunks) > 1:
+            self.counters["fragmented"] += 1
+        return [
+            FRAGMENT_HEADER.pack(FRAGMENT_VERSION, message_id, index, len(chunks))
+            + chunk
+            for index, chunk in enumerate(chunks)
+        ]
+
+    def send(self, dest_address, dest_port, data):
+        with self.metrics.time(metrics.SEND_SECONDS, (("transport", "udp"),)):
+            return self._send(dest_address, dest_port, data)
+
+    def _send(self, dest_address, dest_port, data):
+        if not self.comms_enabled or self.sock is None:
+            return False
+
+        dest = (dest_address, dest_port)
+        health = self.get_health(dest)
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        if len(data) > constants.MAX_FRAME_SIZE:
+            self.counters["send_dropped"] += 1
+            return False
+
+        for datagram in self._fragment(data):
+            with self.lock:
+                if self.outgoing:
+                    # keep order behind datagrams which are already waiting
+                    self._queue(datagram, dest)
+                    continue
+                try:
+                    self.sock.sendto(datagram, dest)
+                except BlockingIOError:
+                    self._queue(datagram, dest)
+                except OSError:
+                    self.counters["send_dropped"] += 1
+                    health.mark_failure(
+                        time.monotonic(),
+                        constants.RECONNECT_BACKOFF,
+                        constants.MAX_RECONNECT_BACKOFF,
+                    )
+                    return False
+                else:
+                    self.counters["datagrams_out"] += 1
+        health.mark_success(time.monotonic())
+        return True
+
+    def _queue(self, datagram, dest):
+        if len(self.outgoing) >= constants.MAX_QUEUED_DATAGRAMS:
+            self.counters["send_dropped"] += 1
+            return
+        self.outgoing.append((datagram, dest))
+        self.counters["send_queued"] += 1
+        self.selector.modify(self.sock, selectors.EVENT_READ | selectors.EVENT_WRITE)
+
+    def _flush(self):
+        with self.lock:
+            while self.outgoing:
+                datagram, dest = self.outgoing[0]
+                try:
+                    self.sock.sendto(datagram, dest)
+                except BlockingIOError:
+                    return
+                except OSError:
+                    self.counters["send_dropped"] += 1
+                else:
+                    self.counters["datagrams_out"] += 1
+                self.outgoing.popleft()
+            self.selector.modify(self.sock, selectors.EVENT_READ)
+
+    def _mark_finished(self, key):
+        self.finished[key] = True
+        if len(self.finished) > constants.REASSEMBLY_HISTORY:
+            self.finished.popitem(last=False)
+
+    def _finish_reassembly(self, key):
+        del self.reassembly[key]
+        sender = key[0]
+        self.sender_reassemblies[sender] -= 1
+        if not self.sender_reassemblies[sender]:
+            del self.sender_reassemblies[sender]
+        self._mark_finished(key)
+
+    def _expire_reassembly(self, now):
+        while self.reassembly:
+            key, reassembly = next(iter(self.reassembly.items()))
+            if now - reassembly.first_seen < constants.REASSEMBLY_TIMEOUT:
+                break
+            self._finish_reassembly(key)
+            self.counters["incomplete_dropped"] += 1
+
+    def _receive_datagram(self, datagram, sender, now):
+        """
+        Returns complete packet bytes or None if more fragments are needed.
+        """
+        if len(datagram) < FRAGMENT_HEADER.size:
+            return None
+        version, message_id, index, count = FRAGMENT_HEADER.unpack_from(datagram)
+        if version != FRAGMENT_VERSION or count == 0 or index >= count:
+            return None
+        chunk = datagram[FRAGMENT_HEADER.size :]
+
+        if count == 1:
+            return chunk
+        if count > self.max_fragments:
+            self.counters["oversized_dropped"] += 1
+            return None
+
+        key = (sender, message_id)
+        if key in self.finished:
+            self.counters["late_fragments"] += 1
+            return None
+        reassembly = self.reassembly.get(key)
+        if reassembly is None:
+            # count comes from the peer, bound what it can make us allocate
+            if (
+                self.sender_reassemblies.get(sender, 0) >= constants.MAX_REASSEMBLIES_PER_SENDER
+                or len(self.reassembly) >= constants.MAX_REASSEMBLIES
+            ):
+                self.counters["reassembly_limit_dropped"] += 1
+                return None
+            reassembly = self.reassembly[key] = Reassembly(count, now)
+            self.sender_reassemblies[sender] = self.sender_reassemblies.get(sender, 0) + 1
+        elif count != len(reassembly.fragments):
+            # fragments of one message disagree on the count
+            return None
+        if not reassembly.add(index, chunk):
+            self.counters["duplicate_fragments"] += 1
+            return None
+        if not reassembly.complete():
+            return None
+
+        self._finish_reassembly(key)
+        self.counters["reassembled"] += 1
+        return b"".join(reassembly.fragments)
+
+    def _handle_packet(self, data):
+        try:
+            # If gateway packet, execute gateway callback
+            if tlv.is_gateway_packet(data):
+                self.gateway_callback(data)
+            # Else, hand over to packet dispatcher
+            else:
+                self.packet_callback(data)
+        except Exception:
+            # malformed packet, must not end the listener thread
+            self.counters["packet_errors"] += 1
+
+    def _listen_thread(self):
+        """
+        Thread waiting on the non-blocking socket for incoming datagrams and for room to send
+        queued ones.
+        """
+        while True:
+            events = self.selector.select(timeout=constants.REASSEMBLY_TIMEOUT)
+            now = time.monotonic()
+            for _, mask in events:
+                if mask & selectors.EVENT_WRITE:
+                    self._flush()
+                if not mask & selectors.EVENT_READ:
+                    continue
+                while True:
+                    try:
+                        datagram, sender = self.sock.recvfrom(
+                            constants.MAX_DATAGRAM_SIZE
+                        )
+                    except (BlockingIOError, InterruptedError):
+                        break
+                    except OSError:
+                        # ICMP errors of earlier sends surface here on some platforms
+                        continue
+                    self.counters["datagrams_in"] += 1
+                    if not self.comms_enabled:
+                        continue
+                    packet = self._receive_datagram(datagram, sender, now)
+                    if packet is None:
+                        continue
+                    self._handle_packet(packet)
+            self._expire_reassembly(now)
+
+    def listen(self):
+        """
+        Bind non-blocking UDP socket and start listener thread.
+        """
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind((self.address, self.port))
+        self.sock.setblocking(False)
+        self.selector = selectors.DefaultSelector()
+        self.selector.register(self.sock, selectors.EVENT_READ)
+        threading.Thread(target=self._listen_thread, daemon=True).start()
@@ -1,27 +1,21 @@
 import networkx as nx
 import matplotlib.pyplot as plt
 from constants import NODES, MINIMUM_NEIGHBORS
-from node import euclidean_distance
+from spatial_index import GridIndex
 from pprint import pprint
 
 graph = nx.Graph()
 
 neighbor_dict = {}
 
+node_index = GridIndex.from_nodes(NODES)
+
 # add nodes to graph and calculate knn
 for node_id in NODES:
     graph.add_node(node_id)
 
-    knn_candidates = []
-    for nei_id in NODES:
-        if node_id != nei_id:
-            d = euclidean_distance(NODES[node_id]["xy"], NODES[nei_id]["xy"])
-            knn_candidates.append((nei_id, d))
-
-    knn = [nei[0] for nei in sorted(knn_candidates, key=lambda x: x[1])][
-        :MINIMUM_NEIGHBORS
-    ]
-    neighbor_dict[node_id] = knn
+    knn = node_index.nearest(NODES[node_id]["xy"], MINIMUM_NEIGHBORS, exclude=(node_id,))
+    neighbor_dict[node_id] = [nei_id for nei_id, _ in knn]
 
 pprint(neighbor_dict)
 
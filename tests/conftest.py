@@ -0,0 +1,58 @@
+import os
+import sys
+
+import pytest
+
+NDN_APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "ndn_app")
+sys.path.insert(0, NDN_APP)
+
+
+@pytest.fixture
+def ndn_app_dir(monkeypatch):
+    """
+    Run from ndn_app, key paths in constants are relative to it.
+    """
+    monkeypatch.chdir(NDN_APP)
+    return NDN_APP
+
+
+@pytest.fixture
+def simulation(ndn_app_dir):
+    """
+    Factory for in-process simulations (no sockets, virtual clock).
+    """
+    from simulator import Simulation
+
+    def create(num_nodes, **kwargs):
+        return Simulation(num_nodes, **kwargs)
+
+    return create
+
+
+@pytest.fixture
+def node(ndn_app_dir):
+    """
+    Node 0 of a two node topology, not started (no sockets, no process).
+    """
+    import queue
+
+    import constants
+    import crypto
+    from node import Node
+    from simulator import simulated_nodes
+
+    all_nodes = simulated_nodes(2, constants.COORDINATE_SEED)
+    return Node(
+        *all_nodes[0]["xy"],
+        0,
+        "/data/0/",
+        all_nodes[0]["server_ip"],
+        all_nodes[0]["server_port"],
+        all_nodes,
+        1,
+        constants.HELLO_DELAY,
+        None,
+        constants.MEMBER_KEY_PATH,
+        mgmt_replies=queue.Queue(),
+        node_keys=crypto.generate_keys(2048),
+    )
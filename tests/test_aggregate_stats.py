@@ -0,0 +1,143 @@
+import json
+import os
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from aggregate_stats import StatsAggregator, StatsRequestHandler
+from state_export import StateExporter
+
+
+@pytest.fixture
+def aggregator(tmp_path):
+    return StatsAggregator(str(tmp_path), 100)
+
+
+def exporter(aggregator, label, sink=True):
+    return StateExporter(
+        os.path.join(aggregator.directory, str(label)),
+        label,
+        sink=aggregator.handle_record if sink else None,
+    )
+
+
+def state(hello_count, **extra):
+    return dict(
+        {
+            "fib": [{"label": 1, "hello_count": hello_count}],
+            # big enough that a few deltas don't outgrow the snapshot
+            "pit": [{"data_address": f"/data/{label}/heartrate"} for label in range(20)],
+        },
+        **extra,
+    )
+
+
+def merged(aggregator):
+    return json.loads(aggregator.snapshot()[1])
+
+
+def test_snapshots_and_deltas_are_merged(aggregator):
+    node_0, node_1 = exporter(aggregator, 0), exporter(aggregator, 1)
+    node_0.export(state(1))
+    node_1.export(state(1))
+    node_0.export(state(2, routing={"seq": 1}))
+    node_0.export(state(3))
+
+    assert merged(aggregator) == {"0": state(3), "1": state(1)}
+    assert aggregator.stats()["snapshots"] == 2
+    assert aggregator.stats()["deltas"] == 2
+
+
+def test_gap_reloads_state_from_file(aggregator):
+    node = exporter(aggregator, 0)
+    node.export(state(1))
+    # lost datagram
+    node.sink = None
+    node.export(state(2))
+    node.sink = aggregator.handle_record
+    node.export(state(3))
+
+    assert merged(aggregator) == {"0": state(3)}
+    assert aggregator.counters["recovered"] == 1
+
+
+def test_stale_invalid_and_restarted_nodes(aggregator):
+    node = exporter(aggregator, 0)
+    for hello_count in range(1, 4):
+        node.export(state(hello_count))
+    aggregator.handle_record(b'{"label":0,"version":2,"set":[],"del":[]}')
+    aggregator.handle_record(b"not json")
+
+    restarted = exporter(aggregator, 0)
+    restarted.export(state(7))
+
+    assert merged(aggregator) == {"0": state(7)}
+    assert aggregator.counters["stale"] == 1
+    assert aggregator.counters["invalid"] == 1
+
+
+def test_load_existing_stats_files(aggregator):
+    node = exporter(aggregator, 4, sink=False)
+    node.export(state(1))
+    node.export(state(2))
+
+    aggregator.load()
+
+    assert merged(aggregator) == {"4": state(2)}
+
+
+def test_wait_events(aggregator):
+    node = exporter(aggregator, 0)
+    node.export(state(1))
+    node.export(state(2))
+
+    events = aggregator.wait_events(0, 0)
+    assert [(sequence, event) for sequence, event, _ in events] == [(1, "node"), (2, "delta")]
+    assert aggregator.wait_events(2, 0.01) == []
+    # sequence of an earlier aggregator run
+    assert aggregator.wait_events(50, 0) is None
+
+    small = StatsAggregator(aggregator.directory, 1)
+    small.handle_record(events[0][2].encode("utf-8"))
+    small.handle_record(events[1][2].encode("utf-8"))
+    # first event already left the history
+    assert small.wait_events(0, 0) is None
+
+
+@pytest.fixture
+def server(aggregator):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StatsRequestHandler)
+    server.daemon_threads = True
+    server.aggregator = aggregator
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_http_state_and_event_stream(aggregator, server):
+    node = exporter(aggregator, 0)
+    node.export(state(1))
+
+    with urllib.request.urlopen(f"{server}/state", timeout=5) as response:
+        assert json.load(response) == {"0": state(1)}
+
+    with urllib.request.urlopen(f"{server}/events", timeout=5) as response:
+        assert response.headers["Content-Type"] == "text/event-stream"
+        assert response.readline() == b"id: 1\n"
+        assert response.readline() == b"event: snapshot\n"
+        assert json.loads(response.readline()[len("data: ") :]) == {"0": state(1)}
+        response.readline()
+
+        node.export(state(2))
+        assert response.readline() == b"id: 2\n"
+        assert response.readline() == b"event: delta\n"
+
+
+def test_http_unknown_path(server):
+    with pytest.raises(urllib.error.HTTPError) as error:
+        urllib.request.urlopen(f"{server}/missing", timeout=5)
+    assert error.value.code == 404
@@ -0,0 +1,82 @@
+import base64
+
+from capture import PacketCapture
+from node import DataMessage, InterestMessage
+
+
+def interest(index, data_address="/data/1/heartrate"):
+    return InterestMessage(data_address, 2, f"r{index}", 0)
+
+
+def test_ring_keeps_most_recent_records():
+    capture = PacketCapture(3)
+    for index in range(5):
+        capture.record("in", "interest", interest(index))
+
+    assert [record["request_id"] for record in capture.view()] == ["r2", "r3", "r4"]
+    assert [record["request_id"] for record in capture.view(limit=2)] == ["r3", "r4"]
+    assert capture.stats() == {"size": 3, "captured": 5, "sample_every": 1}
+
+
+def test_records_are_formatted_when_viewed():
+    capture = PacketCapture(4)
+    message = DataMessage(1, "/data/1/heartrate", "r1", 2, "72")
+    capture.record("out", "data_fwd", message, b"\x00\x01", neighbor=5)
+    capture.record("in", "hello", object(), 300)
+
+    data, hello = capture.view()
+
+    assert data["neighbor"] == 5
+    assert (data["name"], data["request_id"], data["retry_index"]) == ("/data/1/heartrate", "r1", 2)
+    assert data["plain"] == message.get_string()
+    assert data["plain_size"] == len(message.get_string())
+    assert (data["wire"], data["wire_size"]) == (base64.b64encode(b"\x00\x01").decode(), 2)
+    assert (hello["plain"], hello["wire"], hello["wire_size"]) == (None, None, 300)
+
+
+def test_filters_and_sampling():
+    capture = PacketCapture(10)
+    capture.configure(
+        sample_every=2, packet_types=["interest"], directions=["in"], name_prefix="/data/1/"
+    )
+    for index in range(6):
+        capture.record("in", "interest", interest(index))
+    capture.record("out", "interest", interest(6))
+    capture.record("in", "data", interest(7))
+    capture.record("in", "interest", interest(8, "/data/2/gps"))
+
+    assert [record["request_id"] for record in capture.view()] == ["r0", "r2", "r4"]
+
+
+def test_name_prefix_matches_whole_components():
+    capture = PacketCapture(10, name_prefix="/data/1")
+    for index, name in enumerate(("/data/1", "/data/1/heartrate", "/data/10/gps", "/data/1x")):
+        capture.record("in", "interest", interest(index, name))
+
+    assert [record["name"] for record in capture.view()] == ["/data/1", "/data/1/heartrate"]
+
+
+def test_empty_and_disabled_ring():
+    assert PacketCapture(3).view() == []
+
+    disabled = PacketCapture(0)
+    disabled.record("in", "interest", interest(0))
+    assert disabled.view() == []
+    assert disabled.stats()["captured"] == 0
+
+
+def test_network_captures_forwarded_packets(simulation):
+    sim = simulation(2, k=1, routing=False)
+    for network in sim.networks.values():
+        network.send_hellos()
+    sim.clock.run_until(sim.clock.now + 1)
+    sim.issue_interest(0, "/data/1/heartrate")
+    sim.clock.run_until(sim.clock.now + 1)
+
+    records = sim.networks[0].capture.view()
+    types = [(record["direction"], record["type"]) for record in records]
+    assert ("out", "interest_org") in types
+    sent = records[types.index(("out", "interest_org"))]
+    assert sent["name"] == "/data/1/heartrate"
+    assert sent["neighbor"] == 1
+    assert sent["wire_size"] > sent["plain_size"]
@@ -0,0 +1,75 @@
+import socket
+
+import pytest
+
+from connection_pool import ConnectionPool, PeerHealth
+
+
+@pytest.fixture
+def pool():
+    pool = ConnectionPool(1, 1, 60, 0.5, 4)
+    yield pool
+    pool.close_all()
+
+
+@pytest.fixture
+def server():
+    listener = socket.create_server(("127.0.0.1", 0))
+    yield listener
+    listener.close()
+
+
+def free_port():
+    with socket.create_server(("127.0.0.1", 0)) as listener:
+        return listener.getsockname()[1]
+
+
+def test_connection_is_reused(pool, server):
+    dest = server.getsockname()
+
+    assert pool.send(dest, b"first")
+    assert pool.send(dest, b"second")
+
+    connection, _ = server.accept()
+    with connection:
+        received = b""
+        while len(received) < len(b"firstsecond"):
+            received += connection.recv(64)
+    assert received == b"firstsecond"
+    assert pool.counters["miss"] == 1
+    assert pool.counters["hit"] == 1
+    assert pool.get_health(dest).healthy
+
+
+def test_unreachable_destination_backs_off(pool):
+    dest = ("127.0.0.1", free_port())
+
+    assert not pool.send(dest, b"data")
+    assert not pool.send(dest, b"data")
+
+    assert pool.counters["failed"] == 1
+    assert pool.counters["backoff_skip"] == 1
+    assert pool.get_health(dest).failures == 1
+
+
+def test_backoff_grows_exponentially_up_to_max():
+    health = PeerHealth()
+    backoffs = []
+    for _ in range(5):
+        health.mark_failure(100, 0.5, 4)
+        backoffs.append(health.backoff_until - 100)
+
+    assert backoffs == [0.5, 1, 2, 4, 4]
+    assert health.in_backoff(103)
+    health.mark_success(104)
+    assert health.healthy and not health.in_backoff(104)
+
+
+def test_idle_connections_are_evicted(server):
+    pool = ConnectionPool(1, 1, 0, 0.5, 4)
+    pool.send(server.getsockname(), b"data")
+
+    pool.evict_idle()
+
+    assert pool.connections == {}
+    assert pool.counters["evicted"] == 1
@@ -0,0 +1,96 @@
+from content_store import ContentStore
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_least_recently_used_entry_is_evicted():
+    store = ContentStore(2, 1000, 10)
+    store.insert("/data/1/a", "1")
+    store.insert("/data/1/b", "2")
+
+    assert store.lookup("/data/1/a") == "1"
+    store.insert("/data/1/c", "3")
+
+    assert store.lookup("/data/1/b") is None
+    assert store.lookup("/data/1/a") == "1"
+    assert store.lookup("/data/1/c") == "3"
+    assert store.counters["evicted"] == 1
+
+
+def test_byte_limit_evicts_until_it_fits():
+    store = ContentStore(10, 30, 10)
+    for name in ("/a", "/b", "/c"):
+        store.insert(name, "x" * 8)
+
+    store.insert("/d", "x" * 18)
+
+    assert store.stats()["bytes"] == 30
+    assert [name for name in ("/a", "/b", "/c", "/d") if store.lookup(name)] == ["/c", "/d"]
+
+
+def test_oversized_data_is_not_cached():
+    store = ContentStore(10, 20, 10)
+    store.insert("/a", "x" * 18)
+    store.insert("/b", "x" * 19)
+
+    assert store.lookup("/b") is None
+    assert store.lookup("/a") is not None
+
+
+def test_ttl_of_longest_prefix():
+    clock = Clock()
+    store = ContentStore(10, 1000, 5, {"/data": 2, "/data/1/gps": 0.5, "/live": 0}, clock)
+    for name in ("/other", "/data/1/heartrate", "/data/1/gps", "/live/1"):
+        store.insert(name, "x")
+
+    assert store.lookup("/live/1") is None
+    clock.now = 1
+    assert store.lookup("/data/1/gps") is None
+    assert store.lookup("/data/1/heartrate") == "x"
+    clock.now = 3
+    assert store.lookup("/data/1/heartrate") is None
+    assert store.lookup("/other") == "x"
+
+    assert store.counters["stale"] == 2
+    assert len(store) == 1
+
+
+def test_reinsert_refreshes_entry():
+    clock = Clock()
+    store = ContentStore(10, 1000, 5, clock=clock)
+    store.insert("/a", "old")
+    clock.now = 4
+    store.insert("/a", "new")
+    clock.now = 8
+
+    assert store.lookup("/a") == "new"
+    assert store.stats()["bytes"] == len("/a") + len("new")
+
+
+def test_only_requested_data_is_cached(simulation):
+    from node import DataMessage
+
+    sim = simulation(2, k=1, routing=False)
+    for network in sim.networks.values():
+        network.send_hellos()
+    sim.clock.run_until(sim.clock.now + 1)
+    network = sim.networks[0]
+
+    # Data no interest asked for
+    network.data_handler(1, DataMessage(1, "/data/1/heartrate", "r1", 0, "forged"))
+
+    assert network.content_store.lookup("/data/1/heartrate") is None
+    assert network.packet_counters["in"]["data_unsolicited"] == 1
+
+    sim.issue_interest(0, "/data/1/heartrate")
+    sim.clock.run_until(sim.clock.now + 1)
+
+    assert sim.results["satisfied"] == 1
+    assert network.content_store.lookup("/data/1/heartrate").startswith("1:heartrate:")
+    assert network.packet_counters["in"]["data_unsolicited"] == 1
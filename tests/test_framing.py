@@ -0,0 +1,67 @@
+import pytest
+
+from framing import FrameError, FrameReader, encode_frame
+
+
+def frames(reader):
+    return [bytes(frame) for frame in reader.frames()]
+
+
+def test_frames_split_across_reads():
+    stream = encode_frame(b"hello") + encode_frame(b"") + encode_frame(b"world!")
+    reader = FrameReader(1024, buffer_size=8)
+
+    received = []
+    for i in range(0, len(stream), 3):
+        reader.feed(stream[i : i + 3])
+        received += frames(reader)
+
+    assert received == [b"hello", b"", b"world!"]
+    assert reader.start == reader.end == 0
+
+
+def test_frame_bigger_than_buffer_grows_it():
+    payload = bytes(range(256)) * 40
+    reader = FrameReader(1 << 20, buffer_size=16)
+
+    reader.feed(encode_frame(payload)[:100])
+    assert frames(reader) == []
+    reader.feed(encode_frame(payload)[100:])
+
+    assert frames(reader) == [payload]
+
+
+def test_oversized_frame_is_rejected():
+    reader = FrameReader(10)
+    reader.feed(encode_frame(b"x" * 11))
+
+    with pytest.raises(FrameError):
+        frames(reader)
+
+
+class Connection:
+    """
+    Socket stand-in returning chunks of data from recv_into.
+    """
+
+    def __init__(self, data, chunk):
+        self.data = data
+        self.chunk = chunk
+
+    def recv_into(self, view):
+        size = min(len(view), self.chunk, len(self.data))
+        view[:size] = self.data[:size]
+        self.data = self.data[size:]
+        return size
+
+
+def test_recv_from_socket():
+    payloads = [bytes([i]) * i for i in range(1, 30)]
+    connection = Connection(b"".join(encode_frame(p) for p in payloads), chunk=7)
+    reader = FrameReader(1024, buffer_size=32)
+
+    received = []
+    while reader.recv_from(connection):
+        received += frames(reader)
+
+    assert received == payloads
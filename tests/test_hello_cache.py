@@ -0,0 +1,75 @@
+import pytest
+
+import constants
+import crypto
+from hello_cache import HelloVerificationCache
+from node import HelloMessage
+
+
+def test_digest_separates_parts():
+    digest = HelloVerificationCache.digest
+
+    assert digest("ab", "c") != digest("a", "bc")
+    assert digest("ab", b"c") == digest(b"ab", memoryview(b"c"))
+
+
+def test_lookup_hit_and_miss():
+    cache = HelloVerificationCache(4)
+    assert cache.lookup(b"d1") is None
+
+    cache.insert(1, b"d1", "keys of 1", 0.01)
+
+    assert cache.lookup(b"d1") == "keys of 1"
+    stats = cache.stats()
+    assert (stats["hit"], stats["miss"], stats["hit_ratio"]) == (1, 1, 0.5)
+    assert stats["saved_ms"] == 10.0
+
+
+def test_new_hello_of_same_label_replaces_entry():
+    cache = HelloVerificationCache(4)
+    cache.insert(1, b"old", "old keys", 0)
+    cache.insert(1, b"new", "new keys", 0)
+
+    assert cache.lookup(b"old") is None
+    assert cache.lookup(b"new") == "new keys"
+    assert len(cache) == 1
+    assert cache.counters["invalidated"] == 1
+
+
+def test_least_recently_used_is_evicted_and_invalidate():
+    cache = HelloVerificationCache(2)
+    cache.insert(1, b"d1", 1, 0)
+    cache.insert(2, b"d2", 2, 0)
+    cache.lookup(b"d1")
+    cache.insert(3, b"d3", 3, 0)
+
+    assert cache.lookup(b"d2") is None
+    assert cache.counters["evicted"] == 1
+
+    cache.invalidate(1)
+    cache.invalidate(1)
+    assert cache.lookup(b"d1") is None
+    assert len(cache) == 1
+    assert cache.counters["invalidated"] == 1
+
+
+@pytest.mark.parametrize("use_tlv", [False, True])
+def test_repeated_hello_is_verified_once(simulation, use_tlv):
+    network = simulation(2, k=1).networks[0]
+    received = []
+    network.register_handler(constants.HELLO_ID, lambda *args: received.append(args))
+    private_key, public_key = crypto.generate_keys(2048)
+    message = HelloMessage(label=1, ip="10.0.0.1", port=5000, cert="ULTRA_CERT")
+    message.public_key = public_key
+    message.wire_versions = network.hello_message.wire_versions
+    packet = message.get_packet(
+        use_tlv=use_tlv, private_key=private_key, member_private_key=network.member_private_key
+    )
+
+    for _ in range(3):
+        network.dispatch_packet(packet)
+
+    assert len(received) == 3
+    assert network.hello_cache.counters["verified"] == 1
+    assert network.hello_cache.counters["hit"] == 2
+    assert crypto.same_public_key(received[-1][1].public_key, public_key)
@@ -0,0 +1,81 @@
+import pytest
+
+import constants
+import crypto
+from node import HelloMessage
+
+
+@pytest.fixture
+def keys():
+    return crypto.generate_keys(2048), crypto.generate_keys(2048)
+
+
+@pytest.fixture
+def signatures(monkeypatch):
+    """
+    Signed data of all RSA signatures, text signatures go through sign_bytes too.
+    """
+    calls = []
+    sign_bytes = crypto.sign_bytes
+
+    def counting_sign_bytes(private_key, data):
+        calls.append(data)
+        return sign_bytes(private_key, data)
+
+    monkeypatch.setattr(crypto, "sign_bytes", counting_sign_bytes)
+    return calls
+
+
+def hello(keys):
+    message = HelloMessage(label=1, ip="10.0.0.1", port=5000, cert="ULTRA_CERT")
+    message.public_key = keys[0][1]
+    message.wire_versions = (1,)
+    return message
+
+
+def packet(message, keys, ack=False, use_tlv=False):
+    return message.get_packet(ack, use_tlv, keys[0][0], keys[1][0])
+
+
+@pytest.mark.parametrize("use_tlv", [False, True])
+def test_packet_is_built_once(keys, signatures, use_tlv):
+    message = hello(keys)
+
+    first = packet(message, keys, use_tlv=use_tlv)
+
+    assert packet(message, keys, use_tlv=use_tlv) is first
+    assert packet(message, keys, ack=True, use_tlv=use_tlv) != first
+    # node and member signature, shared by hello and ack
+    assert len(signatures) == 2
+
+
+def test_changed_fields_rebuild_packet(keys, signatures):
+    message = hello(keys)
+    first = packet(message, keys)
+
+    message.set_session_key(1, crypto.generate_session_keys()[1])
+    with_session_key = packet(message, keys)
+    message.port = 5001
+    moved = packet(message, keys)
+
+    assert len({first, with_session_key, moved}) == 3
+    assert b"[5001]" in moved
+    assert len(signatures) == 6
+
+
+@pytest.mark.parametrize("use_tlv", [False, True])
+def test_neighbor_decodes_cached_packet(simulation, keys, use_tlv):
+    network = simulation(2, k=1).networks[0]
+    # signed with the membership key of the network
+    keys = (keys[0], (network.member_private_key, None))
+    message = hello(keys)
+    message.set_session_key(4, crypto.generate_session_keys()[1])
+    received = []
+    network.register_handler(constants.HELLO_ACK_ID, lambda *args: received.append(args))
+
+    network.dispatch_packet(packet(message, keys, ack=True, use_tlv=use_tlv))
+
+    decoded = received[0][1]
+    assert (decoded.label, decoded.ip, decoded.port) == (1, "10.0.0.1", 5000)
+    assert decoded.session_epoch == 4
+    assert crypto.same_public_key(decoded.session_public_key, message.session_public_key)
@@ -0,0 +1,74 @@
+import os
+import stat
+import threading
+
+import pytest
+
+import crypto
+from key_store import KeyStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    # small keys, the store does not care about the size
+    return KeyStore(str(tmp_path / "keys"), key_size=1024)
+
+
+def test_keys_are_generated_once_and_loaded_after(store):
+    private_key, public_key = store.get(3)
+    reopened = KeyStore(store.path, key_size=1024)
+    loaded_private_key, loaded_public_key = reopened.get(3)
+
+    assert crypto.same_public_key(public_key, loaded_public_key)
+    assert crypto.same_public_key(private_key.public_key(), loaded_private_key.public_key())
+    assert store.counters == {"loaded": 0, "generated": 1}
+    assert reopened.counters == {"loaded": 1, "generated": 0}
+    assert stat.S_IMODE(os.stat(store.key_path(3)).st_mode) == 0o600
+    assert os.listdir(store.path) == ["node-3.pem"]
+
+
+def test_loaded_keys_sign_and_verify(store):
+    store.get(0)
+    private_key, public_key = KeyStore(store.path).get(0)
+
+    signature = crypto.sign_bytes(private_key, b"hello")
+
+    assert crypto.verify_bytes(public_key, b"hello", signature)
+
+
+def test_fill_generates_missing_keys(store):
+    store.get(1)
+
+    assert store.missing(range(4)) == [0, 2, 3]
+    store.fill(range(4))
+
+    assert store.missing(range(4)) == []
+    assert store.counters["generated"] == 4
+    assert store.filler is None
+
+
+def test_background_fill_meets_get_calls(store):
+    labels = range(6)
+    store.fill(labels, background=True)
+    keys = {label: store.get(label) for label in labels}
+    store.filler.join()
+
+    # every label got exactly one key, whoever generated it
+    assert store.counters["generated"] == 6
+    for label in labels:
+        on_disk = crypto.load_private_key_from_disk(store.key_path(label))
+        assert crypto.same_public_key(on_disk.public_key(), keys[label][1])
+
+
+def test_concurrent_gets_share_one_key(store):
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(store.get(7))) for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert store.counters == {"loaded": 3, "generated": 1}
+    assert all(crypto.same_public_key(results[0][1], keys[1]) for keys in results)
@@ -0,0 +1,89 @@
+import metrics
+from metrics import Histogram, Metrics, render_prometheus
+
+BOUNDS = {metrics.STAGE_SECONDS: [0.001, 0.01, 0.1], metrics.RTT_SECONDS: [0.1, 1]}
+DECODE = (("stage", "decode"), ("packet", "interest"))
+
+
+def test_histogram_buckets():
+    histogram = Histogram([0.001, 0.01, 0.1])
+    for value in (0.0005, 0.001, 0.002, 0.05, 0.5, 2):
+        histogram.observe(value)
+
+    # bounds are inclusive upper bounds
+    assert histogram.counts == [2, 1, 1, 2]
+    assert histogram.count == 6
+    assert round(histogram.sum, 4) == 2.5535
+
+
+def test_stats_per_series():
+    registry = Metrics(True, BOUNDS)
+    registry.observe(metrics.STAGE_SECONDS, DECODE, 0.005)
+    with registry.time(metrics.STAGE_SECONDS, (("stage", "encrypt"), ("packet", "data"))):
+        pass
+    registry.observe(metrics.RTT_SECONDS, (("prefix", "/data/1"),), 0.2)
+
+    stats = registry.stats()
+
+    assert stats[metrics.STAGE_SECONDS]["bounds"] == BOUNDS[metrics.STAGE_SECONDS]
+    assert stats[metrics.STAGE_SECONDS]["series"]["decode|interest"] == {
+        "labels": {"stage": "decode", "packet": "interest"},
+        "count": 1,
+        "sum": 0.005,
+        "buckets": [0, 1, 0, 0],
+    }
+    assert stats[metrics.STAGE_SECONDS]["series"]["encrypt|data"]["buckets"] == [1, 0, 0, 0]
+    assert stats[metrics.RTT_SECONDS]["series"]["/data/1"]["buckets"] == [0, 1, 0]
+
+
+def test_disabled_metrics_record_nothing():
+    registry = Metrics(False, BOUNDS)
+    registry.observe(metrics.STAGE_SECONDS, DECODE, 0.005)
+
+    assert registry.time(metrics.STAGE_SECONDS, DECODE) is metrics.NULL_TIMER
+    assert registry.stats() == {}
+    assert metrics.DISABLED.stats() == {}
+
+
+def test_prometheus_exposition_is_cumulative():
+    registry = Metrics(True, BOUNDS)
+    for value in (0.0005, 0.05, 5):
+        registry.observe(metrics.STAGE_SECONDS, DECODE, value)
+
+    text = render_prometheus([({"node": 3}, registry.stats()), ({"node": 4}, {})])
+
+    assert text.splitlines() == [
+        "# TYPE ndn_stage_seconds histogram",
+        'ndn_stage_seconds_bucket{node="3",stage="decode",packet="interest",le="0.001"} 1',
+        'ndn_stage_seconds_bucket{node="3",stage="decode",packet="interest",le="0.01"} 1',
+        'ndn_stage_seconds_bucket{node="3",stage="decode",packet="interest",le="0.1"} 2',
+        'ndn_stage_seconds_bucket{node="3",stage="decode",packet="interest",le="+Inf"} 3',
+        'ndn_stage_seconds_sum{node="3",stage="decode",packet="interest"} 5.0505',
+        'ndn_stage_seconds_count{node="3",stage="decode",packet="interest"} 3',
+    ]
+
+
+def test_label_values_are_escaped():
+    registry = Metrics(True, BOUNDS)
+    registry.observe(metrics.RTT_SECONDS, (("prefix", 'a"b\\c\nd'),), 0.5)
+
+    text = render_prometheus([({}, registry.stats())])
+
+    assert 'ndn_rtt_seconds_count{prefix="a\\"b\\\\c\\nd"} 1' in text.splitlines()
+
+
+def test_node_observes_pipeline_stages(simulation):
+    sim = simulation(2, k=1, routing=False)
+    for network in sim.networks.values():
+        network.send_hellos()
+    sim.clock.run_until(sim.clock.now + 1)
+    sim.issue_interest(0, "/data/1/heartrate")
+    sim.clock.run_until(sim.clock.now + 1)
+
+    stats = sim.networks[1].metrics.stats()
+    series = stats[metrics.STAGE_SECONDS]["series"]
+    assert series["decode|interest"]["count"] == 1
+    assert series["encrypt|data"]["count"] == 1
+    assert sum(series["sensor_lookup|interest"]["buckets"]) == 1
+    # sends through the simulated transport
+    assert sum(entry["count"] for entry in stats[metrics.SEND_SECONDS]["series"].values()) > 0
@@ -0,0 +1,95 @@
+import json
+import queue
+import threading
+
+import pytest
+
+import constants
+import crypto
+from mgmt import MgmtClient, MgmtError, MgmtTimeout
+from node import HelloMessage
+
+
+def responder(label, requests, replies, delay=None):
+    """
+    Node stand-in answering "echo" calls and failing others, each reply after delay seconds.
+    """
+
+    def serve():
+        while True:
+            task = requests.get()
+            if delay is not None:
+                threading.Event().wait(delay)
+            if task["call"] == "echo":
+                reply = {"result": [label, *task["args"]]}
+            else:
+                reply = {"error": f"ValueError: unknown call {task['call']}"}
+            replies.put(dict(reply, id=task["id"], label=label))
+
+    threading.Thread(target=serve, daemon=True).start()
+
+
+@pytest.fixture
+def client():
+    queues = {label: queue.Queue() for label in range(3)}
+    replies = queue.Queue()
+    responder(0, queues[0], replies)
+    responder(1, queues[1], replies)
+    # answers only after the client gave up
+    responder(2, queues[2], replies, delay=0.3)
+    return MgmtClient(queues, replies, timeout=0.2)
+
+
+def test_broadcast_collects_results_and_timeouts(client):
+    results, errors = client.broadcast("echo", "x")
+
+    assert results == {0: [0, "x"], 1: [1, "x"]}
+    assert list(errors) == [2]
+    assert isinstance(errors[2], MgmtTimeout)
+
+
+def test_call_raises_error_of_node(client):
+    assert client.call(1, "echo", 5) == [1, 5]
+    with pytest.raises(MgmtError, match="unknown call"):
+        client.call(0, "missing")
+    with pytest.raises(MgmtTimeout):
+        client.call(2, "echo")
+
+
+def test_late_reply_is_dropped(client):
+    with pytest.raises(MgmtTimeout):
+        client.call(2, "echo", "first")
+    threading.Event().wait(0.2)
+
+    assert client.call(0, "echo", "second") == [0, "second"]
+
+
+def test_node_answers_mgmt_calls(node):
+    calls = [("fib", ()), ("knn", ()), ("stop_comms", ()), ("missing", ()), ("fib", (1,))]
+    for request_id, (call, args) in enumerate(calls):
+        node.handle_mgmt_task({"id": request_id, "call": call, "args": args})
+
+    answers = [node.mgmt_replies.get_nowait() for _ in calls]
+    assert [answer["id"] for answer in answers] == list(range(len(calls)))
+    assert {answer["label"] for answer in answers} == {0}
+    assert answers[0]["result"] == []
+    assert answers[1]["result"] == [
+        {"label": 1, "ip": "10.0.0.1", "port": constants.STARTING_SERVER_PORT}
+    ]
+    assert answers[2]["result"] is False and not node.ndn.comm.comms_enabled
+    assert answers[3]["error"] == "ValueError: unknown call missing"
+    assert answers[4]["error"].startswith("TypeError")
+    json.dumps(answers)
+
+
+def test_state_lists_fib_rows(node):
+    _, public_key = crypto.generate_keys(2048)
+    hello = HelloMessage(1, "10.0.0.1", 5000, "ULTRA_CERT", public_key=public_key)
+    node.ndn.neighbor_table.received_hello(hello)
+
+    state = node.get_state()
+
+    assert state["ndn"]["fib"] == [
+        {"label": 1, "hello_count": 1, "session_epoch": None, "link_failures": 0}
+    ]
+    json.dumps(state)
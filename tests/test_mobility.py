@@ -0,0 +1,113 @@
+import random
+
+import pytest
+
+from mobility import NeighborTracker, RandomWaypoint, TraceMobility, create_mobility
+from spatial_index import GridIndex
+
+GRID = (1000, 1000)
+
+
+def random_nodes(count, seed=2):
+    rng = random.Random(seed)
+    return {
+        label: {"xy": (rng.randint(0, GRID[0]), rng.randint(0, GRID[1]))} for label in range(count)
+    }
+
+
+def full_recompute(index, k):
+    return {
+        label: [neighbor for neighbor, _ in index.nearest(xy, k, exclude=(label,))]
+        for label, xy in index.points.items()
+    }
+
+
+def assert_consistent(tracker):
+    assert tracker.nearest == full_recompute(tracker.index, tracker.k)
+    for label in tracker.nearest:
+        assert tracker.reverse[label] == {
+            other for other, nearest in tracker.nearest.items() if label in nearest
+        }
+
+
+@pytest.mark.parametrize("k", [1, 3])
+def test_tracker_matches_full_recompute_while_moving(k):
+    nodes = random_nodes(150)
+    tracker = NeighborTracker(GridIndex.from_nodes(nodes), k)
+    mobility = RandomWaypoint(nodes, GRID, (20, 60), 2, seed=1, mobile=set(range(15)))
+
+    for tick in range(1, 40):
+        before = dict(tracker.nearest)
+        changed = tracker.update(mobility.positions(tick))
+
+        assert_consistent(tracker)
+        for label, added in changed.items():
+            assert added == set(tracker.nearest[label]) - set(before[label])
+    # initial computation plus the neighborhoods of the moving nodes
+    assert tracker.counters["recomputed"] < 150 + 150 * 39 / 2
+    assert tracker.counters["changed"] > 0
+
+
+def test_tracker_with_fewer_nodes_than_k():
+    nodes = random_nodes(3)
+    tracker = NeighborTracker(GridIndex.from_nodes(nodes), 5)
+
+    assert tracker.unbounded == {0, 1, 2}
+    changed = tracker.update({0: (5000, 5000)})
+
+    assert changed == {}
+    assert_consistent(tracker)
+
+
+def test_trace_jump_into_a_neighborhood():
+    nodes = {0: {"xy": (0, 0)}, 1: {"xy": (10, 0)}, 2: {"xy": (20, 0)}, 3: {"xy": (900, 900)}}
+    tracker = NeighborTracker(GridIndex.from_nodes(nodes), 1)
+
+    changed = tracker.update({3: (1, 0)})
+
+    # 1 had 0 and 2 at the same distance
+    assert changed == {0: {3}, 1: {3}, 3: {0}}
+    assert tracker.reverse[3] == {0, 1}
+    assert_consistent(tracker)
+
+
+def test_random_waypoint_is_deterministic_and_on_the_grid():
+    nodes = random_nodes(20)
+    first = RandomWaypoint(nodes, GRID, (1, 5), 10, seed=4)
+    second = RandomWaypoint(nodes, GRID, (1, 5), 10, seed=4)
+    partial = RandomWaypoint(nodes, GRID, (1, 5), 10, seed=4, mobile={3})
+
+    for now in (0.5, 7, 60, 61, 300):
+        moves = first.positions(now)
+        assert moves == second.positions(now)
+        assert partial.positions(now) == ({3: moves[3]} if 3 in moves else {})
+        for x, y in moves.values():
+            assert 0 <= x <= GRID[0] and 0 <= y <= GRID[1]
+    # nobody moved since the last call
+    assert first.positions(300) == {}
+
+
+def test_trace_mobility(tmp_path):
+    path = tmp_path / "trace.csv"
+    path.write_text("# time,label,x,y\n0,1,5,5\n2.5,2,10,20\n2.5,1,6,6\n\n4,1,7,7\n")
+    trace = create_mobility(str(path), {}, GRID, (1, 1), 0, 1)
+
+    assert isinstance(trace, TraceMobility)
+    assert trace.positions(0) == {1: (5.0, 5.0)}
+    assert trace.positions(3) == {2: (10.0, 20.0), 1: (6.0, 6.0)}
+    assert trace.positions(3.5) == {}
+    assert trace.positions(10) == {1: (7.0, 7.0)}
+    assert create_mobility(None, {}, GRID, (1, 1), 0, 1) is None
+
+
+def test_simulation_follows_moving_nodes(simulation):
+    sim = simulation(30, k=2, routing=False, mobility="random_waypoint")
+
+    report = sim.run(30)
+
+    assert report["mobility"]["ticks"] == 30
+    assert report["mobility"]["new_links"] > 0
+    assert sim.tracker.nearest == full_recompute(sim.tracker.index, 2)
+    for label, network in sim.networks.items():
+        assert (network.x, network.y) == sim.nodes[label]["xy"]
+        assert set(network.k_nearest) == set(sim.tracker.nearest[label])
@@ -0,0 +1,71 @@
+import json
+
+from name_trie import NameTrie, join_name, split_name
+from sensor_data import MedicalSensorSystem
+
+
+def test_split_and_join():
+    assert split_name("/data/3/heartrate/ecg/") == ("data", "3", "heartrate", "ecg")
+    assert split_name(("data", "3")) == ("data", "3")
+    assert join_name(("heartrate", "ecg")) == "heartrate/ecg"
+
+
+def test_longest_prefix_match_is_component_wise():
+    trie = NameTrie()
+    trie.insert("/data/1/", 1)
+    trie.insert("/data/1/heartrate", 2)
+    trie.insert("/data", 0)
+
+    assert trie.longest_prefix_match("/data/1/heartrate/ecg") == (("data", "1", "heartrate"), 2)
+    assert trie.longest_prefix_match("/data/1/gps") == (("data", "1"), 1)
+    assert trie.longest_prefix_match("/data/11/heartrate") == (("data",), 0)
+    assert trie.longest_prefix_match("/other") is None
+
+
+def test_exact_match_and_contains():
+    trie = NameTrie()
+    trie.insert("/data/1/heartrate", "x")
+
+    assert trie.exact_match("/data/1/heartrate") == "x"
+    assert trie.exact_match("/data/1", "missing") == "missing"
+    assert "/data/1/heartrate" in trie
+    assert "/data/1" not in trie
+
+
+def test_remove_prunes_empty_branches():
+    trie = NameTrie()
+    trie.insert("/data/1/heartrate", 1)
+    trie.insert("/data/1", 2)
+    trie.insert("/data/2/gps", 3)
+
+    assert trie.remove("/data/1/heartrate")
+    assert not trie.remove("/data/1/heartrate")
+    assert not trie.remove("/data/2")
+    assert "heartrate" not in trie.root.children["data"].children["1"].children
+    assert trie.remove("/data/2/gps")
+    assert list(trie.root.children["data"].children) == ["1"]
+
+    assert len(trie) == 1
+    assert list(trie.items()) == [(("data", "1"), 2)]
+
+
+def test_producer_with_longest_prefix_serves_interest(simulation):
+    network = simulation(2, k=1).networks[0]
+    network.register_producer("/data/5/", lambda suffix: f"node {suffix}")
+    network.register_producer("/data/5/camera", lambda suffix: f"camera {suffix}")
+
+    assert network.produce("/data/5/heartrate/ecg") == "node heartrate/ecg"
+    assert network.produce("/data/5/camera/front") == "camera front"
+    assert network.produce("/data/55/heartrate") is None
+
+
+def test_sensor_data_subtrees_are_indexed():
+    sensors = MedicalSensorSystem()
+
+    assert json.loads(sensors.generate_json_string("heartrate")) == sensors.sensor_data["heartrate"]
+    assert json.loads(sensors.generate_json_string("bloodpressure/invasive/mmHg")) == (
+        sensors.sensor_data["bloodpressure"]["invasive"]["mmHg"]
+    )
+    assert json.loads(sensors.generate_json_string("heartrate/none")) == {
+        "message": "Data not found!"
+    }
@@ -0,0 +1,55 @@
+from node import PIT
+
+NAME = "/data/1/heartrate"
+
+
+def test_first_interest_is_forwarded_others_aggregated():
+    pit = PIT()
+
+    assert pit.add_interest(NAME, 2, "r1", 0) == PIT.FORWARD
+    assert pit.add_interest(NAME, 3, "r2", 0) == PIT.AGGREGATED
+    assert pit.add_interest(NAME, 4, "r3", 0) == PIT.AGGREGATED
+    assert pit.add_interest("/data/1/gps", 2, "r4", 0) == PIT.FORWARD
+
+    assert len(pit) == 2
+    assert pit.satisfy(NAME) == {2: {"r1": 0}, 3: {"r2": 0}, 4: {"r3": 0}}
+    assert pit.satisfy(NAME) == {}
+
+
+def test_looped_interest_is_duplicate_retry_is_forwarded():
+    pit = PIT()
+    pit.add_interest(NAME, 2, "r1", 0)
+
+    # same request back over another face
+    assert pit.add_interest(NAME, 3, "r1", 0) == PIT.DUPLICATE
+    assert pit.add_interest(NAME, 2, "r1", 1) == PIT.FORWARD
+    assert pit.add_interest(NAME, 3, "r1", 1) == PIT.DUPLICATE
+
+    assert pit.satisfy(NAME) == {2: {"r1": 1}}
+
+
+def test_expire_and_rows():
+    pit = PIT()
+    pit.add_interest(NAME, 2, "r1", 0)
+    pit.add_interest(NAME, 3, "r2", 1)
+
+    assert sorted(pit.rows()) == [(NAME, 2, "r1", 0), (NAME, 3, "r2", 1)]
+    assert pit.expire(NAME)
+    assert not pit.expire(NAME)
+    assert pit.rows() == []
+
+
+def test_data_skips_faces_no_longer_in_fib(simulation):
+    sim = simulation(2, k=1, routing=False)
+    for network in sim.networks.values():
+        network.send_hellos()
+    sim.clock.run_until(sim.clock.now + 1)
+    network = sim.networks[0]
+    network.pit.add_interest(NAME, 1, "r1", 0)
+    # neighbor which aged out while the interest was pending
+    network.pit.add_interest(NAME, 7, "r2", 0)
+
+    network.forward_data(NAME, "72")
+
+    assert network.packet_counters["out"]["data_fwd"] == 1
+    assert len(network.pit) == 0
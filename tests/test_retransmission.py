@@ -0,0 +1,108 @@
+import pytest
+
+import constants
+from node import PIT
+from rtt_estimator import RttEstimator
+
+NAME = "/data/1/heartrate"
+
+
+def test_first_sample_sets_srtt_and_rto():
+    rtt = RttEstimator(1.0, 0.2, 8.0, 10)
+    assert rtt.rto("/data/1") == 1.0
+
+    rtt.add_sample("/data/1", 0.1)
+
+    state = rtt.prefixes["/data/1"]
+    assert (state.srtt, state.rttvar) == (0.1, 0.05)
+    # 0.1 + 4 * 0.05 = 0.3
+    assert rtt.rto("/data/1") == pytest.approx(0.3)
+
+
+def test_rto_is_clamped_and_backed_off():
+    rtt = RttEstimator(1.0, 0.2, 8.0, 10)
+    rtt.add_sample("/data/1", 0.01)
+
+    assert rtt.rto("/data/1") == 0.2
+    assert rtt.rto("/data/1", retries=2) == 0.8
+    assert rtt.rto("/data/2", retries=5) == 8.0
+
+
+def test_retransmitted_samples_only_count_for_latency():
+    rtt = RttEstimator(1.0, 0.2, 8.0, 10)
+    rtt.add_sample("/data/1", 0.5)
+    rtt.add_sample("/data/1", 3.0, retransmitted=True)
+
+    assert rtt.prefixes["/data/1"].srtt == 0.5
+    assert rtt.percentiles((50, 100)) == {"p50": 500.0, "p100": 3000.0}
+
+
+@pytest.fixture
+def node(node):
+    """
+    Node recording the retry index of every interest it sends.
+    """
+    node.sent = []
+
+    def originate_interest(data_address, retry_index, request_id="r1"):
+        # retry indexes the network would have sent, no neighbors needed
+        node.sent.append(retry_index)
+        return request_id
+
+    node.ndn.originate_interest = originate_interest
+    return node
+
+
+def test_retransmissions_use_increasing_retry_index(node):
+    request_id = node.originate_interest(NAME, 0)
+    key = ("client_requests", (NAME, request_id))
+
+    for _ in range(constants.MAX_RETRIES + 1):
+        node.client_request_expired(key)
+
+    assert node.sent == list(range(constants.MAX_RETRIES + 1))
+    assert node.retransmission_counters["retries"] == constants.MAX_RETRIES
+    assert node.retransmission_counters["timeouts"] == 1
+    assert node.client_requests == {}
+
+
+def test_retransmission_is_not_a_duplicate_upstream(node):
+    pit = PIT()
+    request_id = node.originate_interest(NAME, 1)
+    node.client_request_expired(("client_requests", (NAME, request_id)))
+
+    actions = [pit.add_interest(NAME, 0, request_id, retry) for retry in node.sent]
+
+    assert node.sent == [1, 2]
+    assert actions == [PIT.FORWARD, PIT.FORWARD]
+
+
+def test_answered_request_is_not_retransmitted(node):
+    request_id = node.originate_interest(NAME, 0)
+    node.originator_handler(NAME, request_id, "72")
+
+    node.client_request_expired(("client_requests", (NAME, request_id)))
+
+    assert node.sent == [0]
+    assert node.retransmission_counters["answered"] == 1
+    assert node.client_requests == {}
+
+
+def test_data_racing_the_request_expiry(node):
+    request_id = node.originate_interest(NAME, 0)
+
+    class ExpiringRequests(dict):
+        # scheduler thread expires the request right after it was looked up
+        def __contains__(self, key):
+            found = super().__contains__(key)
+            self.pop(key, None)
+            return found
+
+    node.client_requests = ExpiringRequests(node.client_requests)
+    assert node.originator_handler(NAME, request_id, "72")
+    assert node.retransmission_counters["answered"] == 1
+
+    # expiry and a late copy after the entry is gone
+    node.client_requests.clear()
+    node.client_request_expired(("client_requests", (NAME, request_id)))
+    assert not node.originator_handler(NAME, request_id, "72")
@@ -0,0 +1,98 @@
+from routing import LSA, LinkStateRouting
+
+
+def install(routing, links, prefixes=None):
+    """
+    Install an LSA for every node of the undirected links, origin label serves /data/<label>/.
+    """
+    neighbors = {}
+    for a, b in links:
+        neighbors.setdefault(a, set()).add(b)
+        neighbors.setdefault(b, set()).add(a)
+    for label, labels in neighbors.items():
+        served = prefixes.get(label, []) if prefixes else [f"/data/{label}/"]
+        routing.install(LSA(label, 1, labels, served))
+
+
+def test_shortest_path_keeps_equal_cost_next_hops():
+    routing = LinkStateRouting(0)
+    # diamond 0-1-3, 0-2-3 and a longer path 0-4-5-3
+    install(routing, [(0, 1), (0, 2), (1, 3), (2, 3), (0, 4), (4, 5), (5, 3)])
+
+    assert routing.routes[3] == (2, {1, 2})
+    assert routing.next_hops("/data/3/heartrate") == {1, 2}
+    assert routing.next_hops("/data/5/heartrate") == {4}
+    assert routing.next_hops("/data/9/heartrate") is None
+
+
+def test_link_needs_both_ends():
+    routing = LinkStateRouting(0)
+    install(routing, [(0, 1)])
+    # 2 claims a link to 1, 1 doesn't list it
+    routing.install(LSA(2, 1, [1], ["/data/2/"]))
+
+    assert 2 not in routing.routes
+    assert routing.next_hops("/data/2/gps") is None
+
+
+def test_nearest_producer_of_longest_prefix():
+    routing = LinkStateRouting(0)
+    install(
+        routing,
+        [(0, 1), (1, 2), (0, 3)],
+        {2: ["/data/", "/data/2/"], 3: ["/data/"]},
+    )
+
+    assert routing.next_hops("/data/7/heartrate") == {3}
+    assert routing.next_hops("/data/2/heartrate") == {1}
+
+
+def test_stale_lsa_is_ignored_and_removal_drops_routes():
+    routing = LinkStateRouting(0)
+    install(routing, [(0, 1), (1, 2)])
+    spf_runs = routing.counters["spf_runs"]
+
+    assert not routing.install(LSA(2, 1, [], []))
+    assert routing.install(LSA(2, 2, [1], ["/data/2/", "/data/2/camera"]))
+    # only prefixes changed, no new shortest path tree
+    assert routing.counters["spf_runs"] == spf_runs
+    assert routing.next_hops("/data/2/camera/front") == {1}
+
+    assert routing.remove(2)
+    assert not routing.remove(2)
+    assert 2 not in routing.routes
+    assert routing.next_hops("/data/2/camera") is None
+
+
+def test_lsa_string_round_trip():
+    lsa = LSA(3, 7, [5, 1], ["/data/3/"], member_sign="c2lnbg==")
+    packet = lsa.get_string(sender=4)
+
+    parsed = LSA.from_fields(packet[1:-1].split("][")[1:])
+
+    assert (parsed.origin, parsed.seq, parsed.sender) == (3, 7, 4)
+    assert parsed.neighbors == {1, 5}
+    assert parsed.prefixes == {"/data/3/"}
+    assert parsed.member_sign == "c2lnbg=="
+    assert LSA.from_fields(LSA(3, 1, [], []).get_string(3)[1:-1].split("][")[1:]).neighbors == set()
+
+
+def test_interest_follows_route(simulation):
+    sim = simulation(12, k=2, routing=True)
+    # neighbors and routing converge without a workload
+    sim.run(20, rate=0)
+    consumer = 0
+    producer = next(
+        label
+        for label, (distance, _) in sorted(sim.networks[consumer].routing.routes.items())
+        if distance >= 2
+    )
+    counters = sim.networks[consumer].routing.counters
+    routed, flooded = counters["routed_interests"], counters["flooded_interests"]
+
+    sim.issue_interest(consumer, f"/data/{producer}/heartrate")
+    sim.clock.run_until(sim.clock.now + 1)
+
+    assert sim.results["satisfied"] == 1
+    assert counters["routed_interests"] == routed + 1
+    assert counters["flooded_interests"] == flooded
@@ -0,0 +1,93 @@
+from scheduler import Scheduler
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_periodic_and_one_shot_timers():
+    clock = Clock()
+    scheduler = Scheduler(clock)
+    runs = []
+    scheduler.call_every(1, lambda: runs.append(("hello", clock.now)), "hello")
+    scheduler.call_later(1.5, lambda: runs.append(("once", clock.now)), "once")
+
+    for now in (0, 1, 1.5, 2):
+        clock.now = now
+        scheduler.run_due()
+
+    assert runs == [("hello", 0), ("hello", 1), ("once", 1.5), ("hello", 2)]
+    assert scheduler.time_until_next() == 1
+
+
+def test_missed_runs_are_skipped():
+    clock = Clock()
+    scheduler = Scheduler(clock)
+    runs = []
+    scheduler.call_every(1, lambda: runs.append(clock.now), "aging", first_delay=1)
+
+    clock.now = 4.5
+    scheduler.run_due()
+
+    assert runs == [4.5]
+    assert scheduler.time_until_next() == 1
+    assert scheduler.stats()["timers"]["aging"]["lag_max_ms"] == 3500
+
+
+def test_cancelled_timer_does_not_run():
+    clock = Clock()
+    scheduler = Scheduler(clock)
+    runs = []
+    timer = scheduler.call_every(1, lambda: runs.append(clock.now), "export")
+    scheduler.cancel(timer)
+
+    assert scheduler.time_until_next() is None
+    clock.now = 3
+    scheduler.run_due()
+    assert runs == []
+
+
+def test_events_and_utilization():
+    clock = Clock()
+    scheduler = Scheduler(clock)
+
+    def busy(seconds):
+        clock.now += seconds
+
+    scheduler.call_later(0, lambda: busy(1), "work")
+    scheduler.run_due()
+    scheduler.run_event(busy, 1)
+    clock.now = 10
+
+    stats = scheduler.stats()
+    assert stats["utilization"] == 0.2
+    assert stats["events"] == 1
+    assert stats["timers"]["work"]["busy_ms"] == 1000
+
+
+def test_run_waits_until_next_deadline():
+    clock = Clock()
+    scheduler = Scheduler(clock)
+    events = iter([None, "mgmt", None])
+    timeouts, handled, runs = [], [], []
+    scheduler.call_every(2, lambda: runs.append(clock.now), "hello", first_delay=2)
+
+    def wait(timeout):
+        timeouts.append(timeout)
+        # external event arrives after 1 s, timeouts elapse fully
+        event = next(events)
+        clock.now += 1 if event else timeout
+        return event
+
+    try:
+        scheduler.run(wait, handled.append)
+    except StopIteration:
+        pass
+
+    assert timeouts == [2, 2, 1, 2]
+    assert handled == ["mgmt"]
+    assert runs == [2, 4]
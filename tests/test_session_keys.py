@@ -0,0 +1,132 @@
+import pytest
+
+import constants
+import crypto
+from node import FIB, HelloMessage, Network
+
+
+def session_key():
+    return crypto.generate_session_keys()[1]
+
+
+@pytest.fixture
+def row():
+    return FIB.FIB_Row("10.0.0.1", 5000, "ULTRA_CERT", None)
+
+
+def test_keeps_latest_and_previous_epoch(row):
+    keys = [session_key() for _ in range(3)]
+    for epoch, key in enumerate(keys):
+        row.update_session_key(epoch, key)
+
+    assert row.session_epoch == 2
+    assert row.session_public_keys == {1: keys[1], 2: keys[2]}
+
+
+def test_same_key_again_keeps_derived_keys(row):
+    key = session_key()
+    row.update_session_key(0, key)
+    row.session_keys[(True, "0.0")] = b"derived"
+
+    row.update_session_key(0, key)
+
+    assert row.session_keys == {(True, "0.0"): b"derived"}
+
+
+def test_lower_epoch_after_restart_replaces_keys(row):
+    for epoch in range(8):
+        row.update_session_key(epoch, session_key())
+    restarted = session_key()
+
+    row.update_session_key(0, restarted)
+
+    assert row.session_epoch == 0
+    assert row.session_public_keys == {0: restarted}
+    assert row.session_keys == {}
+
+
+def test_new_key_for_known_epoch_replaces_keys(row):
+    row.update_session_key(0, session_key())
+    row.update_session_key(1, session_key())
+    restarted = session_key()
+
+    row.update_session_key(0, restarted)
+
+    assert row.session_epoch == 0
+    assert row.session_public_keys == {0: restarted}
+
+
+def test_new_rsa_key_resets_session():
+    fib = FIB()
+    _, public_key = crypto.generate_keys(2048)
+    hello = HelloMessage(1, "10.0.0.1", 5000, "ULTRA_CERT", public_key=public_key)
+    hello.session_epoch, hello.session_public_key = 3, session_key()
+    fib.received_hello(hello)
+
+    _, new_public_key = crypto.generate_keys(2048)
+    hello = HelloMessage(1, "10.0.0.1", 5000, "ULTRA_CERT", public_key=new_public_key)
+    new_neighbor, row = fib.received_hello(hello)
+
+    assert not new_neighbor
+    assert row.public_key is new_public_key
+    assert row.session_epoch is None
+
+
+def hellos(sim, seconds):
+    """
+    Hello rounds of all nodes (looked up on every round, nodes may be replaced).
+    """
+    for _ in range(seconds):
+        for label in sim.networks:
+            sim.networks[label].send_hellos()
+        sim.clock.run_until(sim.clock.now + constants.HELLO_DELAY)
+
+
+def satisfied(sim, consumer, producer, count=3):
+    before = sim.results["satisfied"]
+    for _ in range(count):
+        sim.issue_interest(consumer, f"/data/{producer}/heartrate")
+    sim.clock.run_until(sim.clock.now + 1)
+    return sim.results["satisfied"] - before
+
+
+def restart(sim, label):
+    old = sim.networks[label]
+    address = (old.comm.address, old.comm.port)
+    network = Network(
+        label,
+        sim.nodes,
+        1,
+        old.comm,
+        constants.HELLO_DELAY,
+        HelloMessage(label=label, ip=address[0], port=address[1], cert="ULTRA_CERT"),
+        constants.MEMBER_KEY_PATH,
+        False,
+        None,
+        None,
+        clock=sim.clock,
+        node_keys=(old.private_key, old.public_key),
+        member_private_key=old.member_private_key,
+    )
+    network.routing_enabled = False
+    sim._instrument(label, network)
+    sim.networks[label] = network
+
+
+def test_interests_after_rotation_and_restart(simulation):
+    sim = simulation(2, k=1, routing=False)
+    hellos(sim, 2)
+    assert satisfied(sim, 0, 1) == 3
+
+    for _ in range(7):
+        sim.networks[1].rotate_session_key()
+        hellos(sim, 2)
+    assert sim.networks[0].neighbor_table.table[1].session_epoch == 7
+    assert satisfied(sim, 0, 1) == 3
+
+    # same RSA keys (key store), session epochs start from 0 again
+    restart(sim, 1)
+    hellos(sim, 2)
+    assert sim.networks[0].neighbor_table.table[1].session_epoch == 0
+    assert satisfied(sim, 0, 1) == 3
+    assert satisfied(sim, 1, 0) == 3
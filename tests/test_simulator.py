@@ -0,0 +1,72 @@
+import constants
+from simulator import VirtualClock, percentile, simulated_nodes
+
+
+def without_wall_time(report):
+    return {
+        key: value
+        for key, value in report.items()
+        if key not in ("wall_seconds", "setup_seconds")
+    }
+
+
+def test_virtual_clock_runs_events_in_order():
+    clock = VirtualClock()
+    calls = []
+    clock.call_at(2, calls.append, "b")
+    clock.call_at(1, calls.append, "a")
+    # same time, in scheduling order
+    clock.call_at(2, calls.append, "c")
+    clock.call_every(1.5, lambda: calls.append(clock()), first_delay=0.5)
+
+    clock.run_until(3)
+
+    assert calls == [0.5, "a", "b", "c", 2.0]
+    assert clock.now == 3
+    assert clock.events == 5
+
+
+def test_simulated_nodes_keep_configured_coordinates():
+    nodes = simulated_nodes(300, 7)
+
+    assert nodes == simulated_nodes(300, 7)
+    for label, node in constants.NODES.items():
+        assert nodes[label]["xy"] == node["xy"]
+    assert len({(node["server_ip"], node["server_port"]) for node in nodes.values()}) == 300
+    assert nodes[258]["server_ip"] == "10.0.1.2"
+
+
+def test_percentile():
+    assert percentile([], 0.5) is None
+    assert percentile([3, 1, 2], 0.5) == 2
+    assert percentile([3, 1, 2], 1) == 3
+
+
+def test_run_converges_and_satisfies_interests(simulation):
+    report = simulation(20, k=2).run(20, rate=5)
+
+    assert report["nodes"] == 20
+    assert report["convergence"]["neighbors"] is not None
+    assert report["convergence"]["routing"] is not None
+    interests = report["interests"]
+    assert interests["issued"] > 0
+    assert interests["satisfied"] == interests["reachable"]
+    assert interests["hops_max"] >= 1
+    assert report["load"]["dropped"] == 0
+    assert report["packets_out"]["data_org"] == interests["satisfied"]
+
+
+def test_runs_are_deterministic_for_a_seed(simulation):
+    first = simulation(15, k=2, seed=3).run(15, rate=5)
+    second = simulation(15, k=2, seed=3).run(15, rate=5)
+    other = simulation(15, k=2, seed=4).run(15, rate=5)
+
+    assert without_wall_time(first) == without_wall_time(second)
+    assert without_wall_time(first) != without_wall_time(other)
+
+
+def test_lossy_links_drop_packets(simulation):
+    report = simulation(10, k=2, routing=False, loss=0.3).run(15, rate=5)
+
+    assert report["load"]["dropped"] > 0
+    assert report["interests"]["satisfied"] < report["interests"]["issued"]
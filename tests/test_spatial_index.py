@@ -0,0 +1,90 @@
+import random
+
+import pytest
+
+from spatial_index import GridIndex, euclidean_distance
+
+
+def brute_force(points, xy, k, exclude=()):
+    """
+    k nearest by sorting all points, ties in insertion order.
+    """
+    ranked = sorted(
+        (euclidean_distance(xy, point), order, label)
+        for order, (label, point) in enumerate(points.items())
+        if label not in exclude
+    )
+    return [(label, distance) for distance, _, label in ranked[:k]]
+
+
+def random_points(rng, count, size=1000):
+    return {label: (rng.randint(0, size), rng.randint(0, size)) for label in range(count)}
+
+
+@pytest.mark.parametrize("count", [1, 5, 200])
+def test_nearest_matches_brute_force(count):
+    rng = random.Random(count)
+    points = random_points(rng, count)
+    index = GridIndex.from_points(points)
+
+    for label, xy in points.items():
+        for k in (1, 3, 8):
+            assert index.nearest(xy, k, exclude=(label,)) == brute_force(
+                points, xy, k, exclude=(label,)
+            )
+    # query points outside the indexed area
+    for xy in ((-500, -500), (1500, 300)):
+        assert index.nearest(xy, 4) == brute_force(points, xy, 4)
+
+
+def test_ties_follow_insertion_order():
+    points = {3: (1, 0), 1: (0, 1), 2: (-1, 0), 0: (0, -1)}
+    index = GridIndex(1)
+    for label, xy in points.items():
+        index.insert(label, xy)
+
+    assert [label for label, _ in index.nearest((0, 0), 3)] == [3, 1, 2]
+
+
+def test_clustered_and_duplicate_points():
+    rng = random.Random(5)
+    points = {label: (rng.randint(0, 3), rng.randint(0, 3)) for label in range(50)}
+    points.update({50: (900, 900), 51: (900, 900)})
+    index = GridIndex.from_points(points)
+
+    assert index.nearest((900, 900), 5, exclude=(50,)) == brute_force(
+        points, (900, 900), 5, exclude=(50,)
+    )
+    assert index.nearest((0, 0), 10) == brute_force(points, (0, 0), 10)
+
+
+def test_move_keeps_tie_order_and_results():
+    rng = random.Random(9)
+    points = random_points(rng, 100)
+    index = GridIndex.from_points(points)
+
+    for _ in range(200):
+        label = rng.randrange(100)
+        points[label] = (rng.randint(-100, 1100), rng.randint(-100, 1100))
+        index.move(label, points[label])
+
+    assert sorted(index.cells) == sorted({index.cell(xy) for xy in points.values()})
+    for xy in random_points(rng, 20).values():
+        assert index.nearest(xy, 6) == brute_force(points, xy, 6)
+
+
+def test_insert_remove_and_edge_cases():
+    index = GridIndex.from_points({})
+    assert index.nearest((0, 0), 3) == []
+
+    index.insert("a", (0, 0))
+    index.insert("b", (10, 0))
+    index.insert("a", (20, 0))
+    assert len(index) == 2
+    assert index.nearest((0, 0), 5) == [("b", 10), ("a", 20)]
+    assert index.nearest((0, 0), 0) == []
+
+    index.remove("b")
+    assert "b" not in index
+    assert index.nearest((0, 0), 5) == [("a", 20)]
+    assert index.nearest((0, 0), 5, exclude=("a",)) == []
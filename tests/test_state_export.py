@@ -0,0 +1,138 @@
+import json
+import os
+
+import pytest
+
+from state_export import StateExporter, apply_delta, read_state
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "0")
+
+
+def state(hello_count=1, **extra):
+    return dict(
+        {
+            "label": 0,
+            "tables": {"pit": 0, "fib": 1},
+            "fib": [{"label": 1, "hello_count": hello_count}],
+            "timings": {"decode_ms": 0.5},
+            # big enough that a few deltas don't outgrow the snapshot
+            "pit": [{"data_address": f"/data/{label}/heartrate"} for label in range(20)],
+        },
+        **extra,
+    )
+
+
+def test_unchanged_state_is_not_written(path):
+    exporter = StateExporter(path, 0, volatile=("timings",))
+
+    assert exporter.export(state())
+    assert not exporter.export(dict(state(), timings={"decode_ms": 9.9}))
+
+    assert exporter.counters["snapshots"] == 1
+    assert exporter.counters["unchanged"] == 1
+    assert not os.path.exists(f"{path}.delta")
+
+
+def test_deltas_rebuild_state(path):
+    records = []
+    exporter = StateExporter(path, 0, volatile=("timings",), sink=records.append)
+    exporter.export(state())
+
+    exporter.export(state(hello_count=2))
+    exporter.export(state(hello_count=2, routing={"seq": 4}))
+    changed = state(hello_count=2)
+    del changed["tables"]["pit"]
+    exporter.export(changed)
+
+    label, version, current = read_state(path)
+    assert (label, version) == (0, 4)
+    # volatile keys as of the snapshot
+    assert current == dict(changed, timings=state()["timings"])
+    assert exporter.counters["deltas"] == 3
+    assert len(records) == 4
+    assert json.loads(records[1]) == {
+        "label": 0,
+        "version": 2,
+        "set": [[["fib"], [{"label": 1, "hello_count": 2}]]],
+        "del": [],
+    }
+    assert sorted(json.loads(records[3])["del"]) == [["routing", "seq"], ["tables", "pit"]]
+
+
+def test_snapshot_once_delta_log_outgrows_it(path):
+    exporter = StateExporter(path, 0)
+    exporter.export(state())
+
+    hello_count = 1
+    while exporter.counters["snapshots"] == 1:
+        hello_count += 1
+        exporter.export(state(hello_count))
+
+    assert not os.path.exists(f"{path}.delta")
+    assert read_state(path)[1:] == (hello_count, state(hello_count))
+
+
+def test_periodic_snapshot_only_refreshes_changed_volatile_keys(path):
+    # interval always passed
+    exporter = StateExporter(path, 0, volatile=("timings",), snapshot_interval=0)
+    exporter.export(state())
+
+    assert not exporter.export(state())
+    refreshed = dict(state(), timings={"decode_ms": 9.9})
+    assert exporter.export(refreshed)
+    assert not exporter.export(refreshed)
+
+    assert exporter.counters["snapshots"] == 2
+    assert exporter.counters["deltas"] == 0
+    assert read_state(path)[2] == refreshed
+
+
+def test_snapshots_only_without_deltas(path):
+    exporter = StateExporter(path, 0, deltas=False)
+    exporter.export(state())
+    exporter.export(state(hello_count=2))
+
+    assert exporter.counters["snapshots"] == 2
+    assert read_state(path) == (0, 2, state(hello_count=2))
+
+
+def test_reader_skips_incomplete_and_foreign_deltas(path):
+    exporter = StateExporter(path, 0)
+    exporter.export(state())
+    exporter.export(state(hello_count=2))
+    with open(f"{path}.delta", "a") as file:
+        file.write('{"label":0,"version":3,"set":[[["fib"],[]]')
+
+    assert read_state(path) == (0, 2, state(hello_count=2))
+
+    # log left from an earlier run is removed with the first snapshot
+    restarted = StateExporter(path, 0)
+    restarted.export(state(hello_count=5))
+    assert read_state(path) == (0, 1, state(hello_count=5))
+
+
+def test_apply_delta_creates_and_removes_nested_keys():
+    current = {"a": {"b": 1}, "c": 2, "d": {"e": {"f": 1}, "g": 1}}
+
+    apply_delta(
+        current,
+        {"set": [[["a", "x", "y"], 3], [["c"], {}]], "del": [["a", "b"], ["d", "e", "f"], ["z", "y"]]},
+    )
+
+    # "d", "e" left empty by the delete
+    assert current == {"a": {"x": {"y": 3}}, "c": {}, "d": {"g": 1}}
+
+
+def test_emptied_dict_round_trip(path):
+    exporter = StateExporter(path, 0)
+    exporter.export(state(routing={"seq": 4, "lsdb": {"1": 2}}))
+
+    exporter.export(state(routing={"seq": 4, "lsdb": {}}))
+    assert read_state(path)[2]["routing"] == {"seq": 4, "lsdb": {}}
+    exporter.export(state())
+
+    assert exporter.counters["deltas"] == 2
+    assert read_state(path) == (0, 3, state())
@@ -0,0 +1,139 @@
+import constants
+
+from timer_wheel import TimerWheel
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_timers_expire_at_their_deadline():
+    clock = Clock()
+    wheel = TimerWheel(0.25, 8, clock)
+    fired = []
+    wheel.schedule("a", 0.3, fired.append)
+    wheel.schedule("b", 1, fired.append)
+
+    clock.now = 0.4
+    assert wheel.advance() == []
+    clock.now = 0.5
+    assert wheel.advance() == ["a"]
+    clock.now = 1
+    assert wheel.advance() == ["b"]
+
+    assert fired == ["a", "b"]
+    assert len(wheel) == 0
+
+
+def test_timer_longer_than_one_revolution_waits_for_its_deadline():
+    clock = Clock()
+    wheel = TimerWheel(0.1, 4, clock)
+    wheel.schedule("long", 1.0)
+
+    for step in range(1, 10):
+        clock.now = step / 10
+        assert wheel.advance() == []
+    clock.now = 1.0
+    assert wheel.advance() == ["long"]
+
+
+def test_long_pause_expires_everything_due():
+    clock = Clock()
+    wheel = TimerWheel(0.1, 4, clock)
+    for i in range(10):
+        wheel.schedule(i, 0.1 * (i + 1))
+    wheel.schedule("later", 100)
+
+    clock.now = 50
+    assert sorted(wheel.advance(), key=str) == list(range(10))
+    assert "later" in wheel
+
+
+def test_cancel_and_reschedule():
+    clock = Clock()
+    wheel = TimerWheel(0.25, 8, clock)
+    wheel.schedule("a", 0.5)
+    wheel.schedule("b", 0.5)
+
+    assert wheel.cancel("a")
+    assert not wheel.cancel("a")
+    # same key again replaces the timer
+    wheel.schedule("b", 1.5)
+
+    clock.now = 1
+    assert wheel.advance() == []
+    clock.now = 1.5
+    assert wheel.advance() == ["b"]
+    assert wheel.counters == {"scheduled": 3, "cancelled": 1, "expired": 1}
+
+
+def test_callback_can_schedule_again():
+    clock = Clock()
+    wheel = TimerWheel(0.1, 8, clock)
+
+    def again(key):
+        if key < 3:
+            wheel.schedule(key + 1, 0.1, again)
+
+    wheel.schedule(0, 0.1, again)
+    expired = []
+    for step in range(1, 6):
+        clock.now = step / 10
+        expired += wheel.advance()
+
+    assert expired == [0, 1, 2, 3]
+
+
+def test_unanswered_interest_expires_from_pit(simulation):
+    sim = simulation(2, k=1, routing=False)
+    sim.clock.call_every(constants.TIMER_TICK, sim._advance_timers)
+    for network in sim.networks.values():
+        network.send_hellos()
+    sim.clock.run_until(sim.clock.now + 1)
+    forwarder = sim.networks[1]
+
+    # no producer for the name
+    sim.networks[0].originate_interest("/data/7/heartrate", 0)
+    sim.clock.run_until(sim.clock.now + 1)
+    assert len(forwarder.pit) == 1
+
+    sim.clock.run_until(sim.clock.now + constants.INTEREST_LIFETIME)
+    assert len(forwarder.pit) == 0
+    assert forwarder.expiry_counters["pit"] == 1
+    assert ("pit", "/data/7/heartrate") not in forwarder.timers
+
+
+def test_gateway_reply_after_gpit_expiry(simulation):
+    sim = simulation(2, k=1, routing=False)
+    for network in sim.networks.values():
+        network.send_hellos()
+    sim.clock.run_until(sim.clock.now + 1)
+    gateway = sim.networks[0]
+    gateway.gateway = True
+    gateway._decode_gateway_packet = lambda packet: ("EG_REPLY", "/ext/1/heartrate", "72")
+    gateway.gpit["/ext/1/heartrate"] = {"request_id": "r1", "retry_index": 0, "neighbor_label": 1}
+    gateway.timers.schedule(("gpit", "/ext/1/heartrate"), 1, gateway._expire_entry)
+
+    gateway.gateway_handler(b"EG_REPLY")
+    assert gateway.packet_counters["out"]["data_fwd"] == 1
+    assert ("gpit", "/ext/1/heartrate") not in gateway.timers
+
+    class ExpiringTable(dict):
+        # timer thread expires the entry right after it was looked up
+        def __contains__(self, key):
+            found = super().__contains__(key)
+            gateway._expire_entry(("gpit", key))
+            return found
+
+    gateway.gpit = ExpiringTable(
+        {"/ext/1/heartrate": {"request_id": "r2", "retry_index": 0, "neighbor_label": 1}}
+    )
+    gateway.gateway_handler(b"EG_REPLY")
+    # already expired on the second reply
+    gateway.gateway_handler(b"EG_REPLY")
+    assert gateway.packet_counters["out"]["data_fwd"] == 2
+    assert gateway.packet_counters["in"]["data_unsolicited"] == 1
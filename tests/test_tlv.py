@@ -0,0 +1,95 @@
+import pytest
+
+import constants
+import tlv
+
+
+@pytest.mark.parametrize("number", [0, 255, 256, 65535, 65536, 2**32 - 1, 2**32, 2**64 - 1])
+def test_number_round_trip(number):
+    assert tlv.decode_number(tlv.encode_number(number)) == number
+
+
+@pytest.mark.parametrize("size", [0, 252, 253, 65535, 65536])
+def test_elements_round_trip(size):
+    content = bytes(range(256)) * (size // 256) + bytes(size % 256)
+    encoded = tlv.encode_elements(
+        ((tlv.NAME, "/data/1/heartrate"), (tlv.RETRY_INDEX, 300), (tlv.CONTENT, content))
+    )
+
+    elements = tlv.decode_elements(encoded)
+
+    assert tlv.get_string(elements, tlv.NAME) == "/data/1/heartrate"
+    assert tlv.get_number(elements, tlv.RETRY_INDEX) == 300
+    assert bytes(elements[tlv.CONTENT]) == content
+
+
+@pytest.mark.parametrize("size", [10, 300])
+def test_packet_round_trip(size):
+    elements = ((tlv.LABEL, 3), (tlv.PAYLOAD, b"x" * size))
+    packet = tlv.encode_packet(constants.INTEREST_ID, elements)
+
+    # already encoded elements give the same packet
+    assert tlv.encode_packet(constants.INTEREST_ID, tlv.encode_elements(elements)) == packet
+    packet_id, value = tlv.decode_packet(packet)
+    assert packet_id == constants.INTEREST_ID
+    assert bytes(tlv.decode_elements(value)[tlv.PAYLOAD]) == b"x" * size
+    assert tlv.is_tlv(packet) and not tlv.is_gateway_packet(packet)
+
+
+@pytest.mark.parametrize(
+    "packet",
+    [
+        b"\x00\x01\x02",
+        b"\x00\x09\x02\x00",
+        tlv.encode_packet(constants.DATA_ID, ((tlv.NAME, "/a"),))[:-1],
+        tlv.encode_packet(constants.DATA_ID, ((tlv.NAME, "/a"),)) + b"\x00",
+    ],
+)
+def test_malformed_packet_raises(packet):
+    with pytest.raises(tlv.TLVError):
+        tlv.decode_packet(packet)
+
+
+@pytest.mark.parametrize("value", [b"\x0c", b"\x0c\x05abc", b"\x0c\xfd\x01"])
+def test_truncated_elements_raise(value):
+    with pytest.raises(tlv.TLVError):
+        tlv.decode_elements(value)
+
+
+def test_gateway_packets_in_both_formats():
+    assert tlv.is_gateway_packet(tlv.encode_packet(constants.EG_ID, ((tlv.NAME, "/a"),)))
+    assert tlv.is_gateway_packet(b"EG_REPLY[...]")
+    assert not tlv.is_gateway_packet(b"[2][1][x]")
+
+
+def satisfied_interests(sim):
+    for network in sim.networks.values():
+        network.send_hellos()
+    sim.clock.run_until(sim.clock.now + 1)
+    for _ in range(3):
+        sim.issue_interest(0, "/data/1/heartrate")
+    sim.clock.run_until(sim.clock.now + 1)
+    return sim.results["satisfied"]
+
+
+@pytest.mark.parametrize("wire_format", ["tlv", "text"])
+def test_interests_in_wire_format(simulation, monkeypatch, wire_format):
+    monkeypatch.setattr(constants, "WIRE_FORMAT", wire_format)
+    sim = simulation(2, k=1, routing=False)
+
+    assert satisfied_interests(sim) == 3
+    counters = sim.networks[0].wire_counters
+    assert counters[wire_format] > 0
+    if wire_format == "text":
+        assert counters["tlv"] == 0
+
+
+def test_text_fallback_for_neighbor_without_tlv(simulation):
+    sim = simulation(2, k=1, routing=False)
+    network = sim.networks[1]
+    network.wire_tlv = False
+    network.hello_message.wire_versions = ()
+
+    assert satisfied_interests(sim) == 3
+    assert sim.networks[0].wire_counters["tlv"] == 0
+    assert sim.networks[1].wire_counters["tlv"] == 0
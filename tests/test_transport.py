@@ -0,0 +1,173 @@
+import socket
+import threading
+
+import pytest
+
+import constants
+from framing import encode_frame
+from node import create_comm
+from udp_comm import FRAGMENT_HEADER, FRAGMENT_VERSION
+
+
+def free_port():
+    with socket.create_server(("127.0.0.1", 0)) as listener:
+        return listener.getsockname()[1]
+
+
+class Receiver:
+    """
+    Packet callback collecting packets until count arrived. Packets starting with "bad" raise
+    like a packet failing to decode.
+    """
+
+    def __init__(self, count) -> None:
+        self.packets = []
+        self.count = count
+        self.done = threading.Event()
+
+    def __call__(self, data):
+        data = bytes(data)
+        if data.startswith(b"bad"):
+            raise ValueError(data)
+        self.packets.append(data)
+        if len(self.packets) == self.count:
+            self.done.set()
+
+
+def asyncio_connection(receiver):
+    """
+    Client socket connected to a listening asyncio engine.
+    """
+    port = free_port()
+    comm = create_comm("127.0.0.1", port, "asyncio")
+    comm.packet_callback = receiver
+    comm.listen()
+    return comm, socket.create_connection(("127.0.0.1", port))
+
+
+def thread_connection(receiver):
+    """
+    Client socket connected to the per-connection handler of the thread engine. Uses a socket
+    pair instead of listen(), the listener thread would keep the test process alive.
+    """
+    comm = create_comm("127.0.0.1", free_port(), "thread")
+    comm.packet_callback = receiver
+    client, server = socket.socketpair()
+    threading.Thread(
+        target=comm._handle_incoming_packet, args=(server, None), daemon=True
+    ).start()
+    return comm, client
+
+
+@pytest.fixture
+def connection():
+    connections = []
+
+    def connect(engine, receiver):
+        connect_engine = {"thread": thread_connection, "asyncio": asyncio_connection}
+        comm, client = connect_engine[engine](receiver)
+        connections.append(client)
+        return comm, client
+
+    yield connect
+    for client in connections:
+        client.close()
+
+
+@pytest.mark.parametrize("engine", ["thread", "asyncio"])
+def test_packets_arrive_in_order(connection, engine):
+    receiver = Receiver(50)
+    _, client = connection(engine, receiver)
+
+    for i in range(50):
+        client.sendall(encode_frame(f"[2][{i}][x]".encode()))
+
+    assert receiver.done.wait(5)
+    assert receiver.packets == [f"[2][{i}][x]".encode() for i in range(50)]
+
+
+@pytest.mark.parametrize("engine", ["thread", "asyncio"])
+def test_failing_packet_does_not_end_connection(connection, engine):
+    receiver = Receiver(1)
+    comm, client = connection(engine, receiver)
+
+    client.sendall(encode_frame(b"bad packet") + encode_frame(b"[2][1][x]"))
+
+    assert receiver.done.wait(5)
+    assert receiver.packets == [b"[2][1][x]"]
+    assert comm.counters["packet_errors"] == 1
+
+
+@pytest.fixture
+def udp():
+    """
+    Listening UDP transport and a plain socket to send datagrams to it.
+    """
+    receiver = Receiver(1)
+    comm = create_comm("127.0.0.1", free_port(), None, "udp")
+    comm.packet_callback = receiver
+    comm.listen()
+    client = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    yield comm, receiver, client
+    client.close()
+    comm.sock.close()
+
+
+def test_udp_fragments_are_reassembled(udp):
+    comm, receiver, client = udp
+    packet = bytes(range(256)) * 20
+    fragments = comm._fragment(packet)
+    assert len(fragments) > 1
+
+    # out of order, with a duplicate before the message is complete
+    for fragment in fragments[:0:-1] + fragments[1:2] + fragments[:1]:
+        client.sendto(fragment, ("127.0.0.1", comm.port))
+
+    assert receiver.done.wait(5)
+    assert receiver.packets == [packet]
+    assert comm.counters["reassembled"] == 1
+    assert comm.counters["duplicate_fragments"] == 1
+
+
+def test_udp_failing_packet_does_not_stop_listener(udp):
+    comm, receiver, client = udp
+
+    for packet in (b"bad packet", b"[2][1][x]"):
+        for fragment in comm._fragment(packet):
+            client.sendto(fragment, ("127.0.0.1", comm.port))
+
+    assert receiver.done.wait(5)
+    assert receiver.packets == [b"[2][1][x]"]
+    assert comm.counters["packet_errors"] == 1
+
+
+def fragment(message_id, index, count):
+    return FRAGMENT_HEADER.pack(FRAGMENT_VERSION, message_id, index, count) + b"x"
+
+
+def test_udp_reassembly_is_bounded(monkeypatch):
+    monkeypatch.setattr(constants, "MAX_REASSEMBLIES_PER_SENDER", 2)
+    monkeypatch.setattr(constants, "MAX_REASSEMBLIES", 3)
+    comm = create_comm("127.0.0.1", free_port(), None, "udp")
+    a, b = ("10.0.0.1", 5000), ("10.0.0.2", 5000)
+
+    # more fragments than the biggest frame has
+    assert comm._receive_datagram(fragment(1, 0, comm.max_fragments + 1), a, 0) is None
+    assert comm.counters["oversized_dropped"] == 1
+    assert comm.reassembly == {}
+
+    for message_id in range(3):
+        comm._receive_datagram(fragment(message_id, 0, 2), a, 0)
+    comm._receive_datagram(fragment(0, 0, 2), b, 0)
+    # total limit reached
+    comm._receive_datagram(fragment(1, 0, 2), b, 0)
+    assert comm.counters["reassembly_limit_dropped"] == 2
+    assert sorted(comm.reassembly) == [(a, 0), (a, 1), (b, 0)]
+
+    # completed and expired messages free their slots
+    assert comm._receive_datagram(fragment(0, 1, 2), a, 0) == b"xx"
+    comm._receive_datagram(fragment(3, 0, 2), a, 0)
+    comm._expire_reassembly(constants.REASSEMBLY_TIMEOUT)
+    assert comm.reassembly == {}
+    assert comm.sender_reassemblies == {}
+    assert comm.counters["incomplete_dropped"] == 3